@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, TestGroup, ColumnMapping, AnswerKey, Student, StudentAnswer
+from .models import Course, TestGroup, ColumnMapping, AnswerKey, Student, StudentAnswer, ScanBatch, ScanJob
 
 
 admin.site.register(Course)
@@ -8,4 +8,5 @@ admin.site.register(ColumnMapping)
 admin.site.register(AnswerKey)
 admin.site.register(Student)
 admin.site.register(StudentAnswer)
-
+admin.site.register(ScanBatch)
+admin.site.register(ScanJob)
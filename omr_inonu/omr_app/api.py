@@ -0,0 +1,52 @@
+from typing import Dict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    İmleç tabanlı sayfalama. Mevcut istemciler (Android uygulaması) düz liste beklediğinden
+    yalnızca 'cursor' veya 'page_size' parametresi gönderildiğinde devreye girer.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = 'pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class QueryFilterMixin:
+    """
+    Liste uç noktalarına sorgu parametresiyle filtreleme ekler. 'filter_params', parametre
+    adını ORM aramasına eşler; '__startswith' ile biten aramalar önek eşleşmesi yapar,
+    diğerleri birincil anahtar (tam sayı) bekler. Çok değerli ilişkiler üzerinden filtrelenen
+    görünümlerde 'filter_distinct' tekrarlanan satırları engeller.
+    """
+    filter_params: Dict[str, str] = {}
+    filter_distinct = False
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        filtered = False
+        for param, lookup in self.filter_params.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            if not lookup.endswith('__startswith'):
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValidationError({param: "Geçerli bir tam sayı olmalıdır."})
+            queryset = queryset.filter(**{lookup: value})
+            filtered = True
+        if filtered and self.filter_distinct:
+            queryset = queryset.distinct()
+        return queryset
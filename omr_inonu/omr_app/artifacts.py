@@ -0,0 +1,275 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import queue
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from multiprocessing.util import Finalize
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Görüntü türü -> (açma bayrağı, klasör anahtarı); ikisi de config.yaml 'output' bölümündedir
+ARTIFACT_KINDS = {
+    'debug': ('save_debug_images', 'debug_images_directory'),
+    'roi': ('save_rois', 'rois_directory'),
+    'visualization': ('save_visualization', 'visualization_directory'),
+}
+
+
+def get_artifact_settings(config: Dict) -> Dict:
+    artifacts = config.get('output', {}).get('artifacts') or {}
+    return {
+        'sample_every': int(artifacts.get('sample_every', 1)),
+        'low_confidence_only': bool(artifacts.get('low_confidence_only', False)),
+        'confidence_threshold': float(artifacts.get('confidence_threshold', 0.15)),
+        'queue_size': int(artifacts.get('queue_size', 8)),
+        'max_sheets': artifacts.get('max_sheets', 200),
+        'max_age_days': artifacts.get('max_age_days', 7),
+    }
+
+
+def new_sheet_id() -> str:
+    """
+    Eşzamanlı isteklerin birbirinin dosyalarının üzerine yazmaması için form başına benzersiz ad.
+    Tarih-saat ile başladığından ada göre sıralama oluşturulma sırasını verir.
+    """
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+SHEET_ID_PATTERN = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}$')
+
+
+def prune_artifacts(root: str, max_sheets: Optional[int], max_age_days: Optional[float]) -> int:
+    """
+    Kök klasördeki form klasörlerinden en yeni 'max_sheets' tanesini tutar ve 'max_age_days'
+    günden eski olanları siler (None: sınır yok). Yalnızca form kimliği biçimindeki klasörlere
+    dokunulur. Silinen klasör sayısını döner.
+    """
+    try:
+        sheets = sorted(
+            (entry for entry in os.scandir(root) if entry.is_dir() and SHEET_ID_PATTERN.match(entry.name)),
+            key=lambda entry: entry.name
+        )
+    except FileNotFoundError:
+        return 0
+    expired = set()
+    if max_sheets is not None and len(sheets) > max_sheets:
+        expired.update(entry.path for entry in sheets[:len(sheets) - max(0, int(max_sheets))])
+    if max_age_days is not None:
+        cutoff = time.time() - float(max_age_days) * 86400
+        expired.update(entry.path for entry in sheets if entry.stat().st_mtime < cutoff)
+    for path in expired:
+        shutil.rmtree(path, ignore_errors=True)
+    return len(expired)
+
+
+class ArtifactWriter:
+    """
+    Hata ayıklama görüntülerini arka plandaki bir iş parçacığında diske yazar. Kuyruk form
+    başına bir öğe tutar ve sınırlıdır; dolduğunda formun tüm görüntüleri birlikte atlanır,
+    böylece yazım istek süresine hiç eklenmez ve yarım form klasörü oluşmaz. Her formdan sonra
+    eski form klasörleri saklama sınırlarına göre silinir.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 8,
+        max_sheets: Optional[int] = 200,
+        max_age_days: Optional[float] = 7
+    ):
+        self.queue: "queue.Queue[Optional[List[Tuple[str, np.ndarray]]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self.max_sheets = max_sheets
+        self.max_age_days = max_age_days
+        self.pid = os.getpid()
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+        self.thread.start()
+        # atexit yerine: ProcessPoolExecutor işçileri de çıkışta kuyruğu boşaltır
+        Finalize(self, ArtifactWriter.close, args=(self.queue, self.thread), exitpriority=10)
+
+    def submit(self, images: List[Tuple[str, np.ndarray]]) -> bool:
+        """
+        Bir formun (yol, görüntü) listesini kuyruğa verir; kuyruk doluysa hepsini atlar.
+        """
+        try:
+            self.queue.put_nowait(images)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Görüntü yazım kuyruğu dolu; formun {len(images)} görüntüsü atlandı.")
+            return False
+
+    def _run(self):
+        while True:
+            images = self.queue.get()
+            try:
+                if images is None:
+                    return
+                self._write_sheet(images)
+            except Exception as e:
+                logger.error(f"Görüntü yazılırken hata: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write_sheet(self, images: List[Tuple[str, np.ndarray]]):
+        roots = set()
+        for path, image in images:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if cv2.imwrite(path, image):
+                logger.debug(f"Görüntü kaydedildi: {path}")
+            else:
+                logger.error(f"Görüntü kaydedilemedi: {path}")
+            roots.add(os.path.dirname(os.path.dirname(path)))
+        self.written += 1
+        for root in roots:
+            prune_artifacts(root, self.max_sheets, self.max_age_days)
+
+    def flush(self):
+        """
+        Kuyruktaki tüm formlar yazılana kadar bekler.
+        """
+        self.queue.join()
+
+    @staticmethod
+    def close(write_queue: queue.Queue, thread: threading.Thread, timeout: float = 5.0):
+        try:
+            write_queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Görüntü yazım kuyruğu kapanışta boşaltılamadı.")
+            return
+        thread.join(timeout)
+
+
+_writer: Optional[ArtifactWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_artifact_writer(config: Dict) -> ArtifactWriter:
+    """
+    Süreç başına tek yazıcı. Çatallanan (fork) işçi süreçler ana sürecin iş parçacığını
+    devralmadığından kendi yazıcılarını oluşturur.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            options = get_artifact_settings(config)
+            _writer = ArtifactWriter(options['queue_size'], options['max_sheets'], options['max_age_days'])
+        return _writer
+
+
+class SheetArtifacts:
+    """
+    Bir formun işlenmesi sırasında üretilen görüntüler. Form bitene kadar bellekte tutulur ve
+    örnekleme kararına göre topluca yazıcıya verilir ya da atılır.
+    """
+
+    def __init__(self, config: Dict, sampled: Optional[bool]):
+        self.config = config
+        self.sheet_id = new_sheet_id()
+        # None: karar form sonucuna (düşük güven) göre verilecek
+        self.sampled = sampled
+        self.items: List[Tuple[str, str, np.ndarray]] = []
+
+    def add(self, kind: str, name: str, image: np.ndarray):
+        self.items.append((kind, name, image))
+
+    def paths(self) -> List[Tuple[str, np.ndarray]]:
+        paths = []
+        for kind, name, image in self.items:
+            directory = os.path.join(settings.BASE_DIR, self.config['output'][ARTIFACT_KINDS[kind][1]])
+            paths.append((os.path.join(directory, self.sheet_id, f"{name}.jpg"), image))
+        return paths
+
+
+_current_sheet: ContextVar[Optional[SheetArtifacts]] = ContextVar('current_sheet_artifacts', default=None)
+_sheet_counter = itertools.count()
+
+
+def artifacts_enabled(config: Dict, kind: str) -> bool:
+    """
+    Bu türdeki görüntü konfigürasyonda açık mı ve geçerli form örneklemeden elenmedi mi.
+    Görüntüyü üretmek de maliyetli olduğunda (ör. görselleştirme) çağıran önce bunu kontrol eder.
+    """
+    if not config['output'].get(ARTIFACT_KINDS[kind][0]):
+        return False
+    sheet = _current_sheet.get()
+    return sheet is None or sheet.sampled is not False
+
+
+def save_artifact(config: Dict, kind: str, name: str, image: np.ndarray):
+    """
+    Görüntüyü geçerli formun dosyalarına ekler. Bir form bağlamı dışında (ör. yardımcı fonksiyon
+    doğrudan çağrıldığında) görüntü benzersiz bir klasörle hemen kuyruğa verilir.
+    """
+    if not artifacts_enabled(config, kind):
+        return
+    sheet = _current_sheet.get()
+    if sheet is not None:
+        sheet.add(kind, name, image)
+        return
+    standalone = SheetArtifacts(config, sampled=True)
+    standalone.add(kind, name, image)
+    get_artifact_writer(config).submit(standalone.paths())
+
+
+def is_low_confidence(results: Dict, threshold: float) -> bool:
+    """
+    Hatalı sonuçlar, okunamayan öğrenci numarası/test grubu veya güveni eşiğin altında kalan
+    alanlar düşük güvenli sayılır.
+    """
+    if 'error' in results:
+        return True
+    confidence = results.get('confidence') or {}
+    student_number = confidence.get('student_number') or []
+    if not student_number or min(student_number) < threshold:
+        return True
+    return results.get('test_group') in (None, "Belirsiz") or confidence.get('test_group', 0.0) < threshold
+
+
+@contextmanager
+def collecting_artifacts(config: Dict, always: bool = False) -> Iterator[SheetArtifacts]:
+    """
+    Bloğun ürettiği görüntüleri tek bir forma ait olarak toplar. 'sample_every' ile N formdan
+    yalnızca biri baştan seçilir; 'low_confidence_only' açıksa karar commit_artifacts'ta verilir.
+    """
+    options = get_artifact_settings(config)
+    if always:
+        sampled = True
+    elif options['sample_every'] < 1 or next(_sheet_counter) % options['sample_every']:
+        sampled = False
+    else:
+        sampled = None if options['low_confidence_only'] else True
+    sheet = SheetArtifacts(config, sampled)
+    token = _current_sheet.set(sheet)
+    try:
+        yield sheet
+    finally:
+        _current_sheet.reset(token)
+
+
+def commit_artifacts(sheet: SheetArtifacts, results: Dict) -> Optional[str]:
+    """
+    Formun görüntülerini örnekleme kararına göre tek bir öğe olarak yazıcı kuyruğuna verir.
+    Kuyruğa alındıysa formun görüntü klasörü adını döner.
+    """
+    if not sheet.items or sheet.sampled is False:
+        return None
+    if sheet.sampled is None:
+        threshold = get_artifact_settings(sheet.config)['confidence_threshold']
+        if not is_low_confidence(results, threshold):
+            return None
+    if not get_artifact_writer(sheet.config).submit(sheet.paths()):
+        return None
+    return sheet.sheet_id
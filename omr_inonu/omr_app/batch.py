@@ -0,0 +1,154 @@
+import os
+import glob
+import logging
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Container, Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections
+
+from .scanner import process_image, get_template_features
+
+logger = logging.getLogger(__name__)
+
+# Toplu işlemde kabul edilen görüntü uzantıları
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+
+def is_image_name(name: str) -> bool:
+    """
+    Dosya adının desteklenen bir görüntü uzantısına sahip olup olmadığını kontrol eder.
+    """
+    base_name = os.path.basename(name)
+    if not base_name or base_name.startswith('.') or '__MACOSX' in name:
+        return False
+    return base_name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def zip_image_entries(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    ZIP arşivindeki görüntü dosyalarının kayıtlarını içerikleri okunmadan döner.
+    """
+    return [info for info in archive.infolist() if not info.is_dir() and is_image_name(info.filename)]
+
+
+def close_connections_before_fork():
+    """
+    Alt süreçlerin ana sürecin veritabanı bağlantılarını paylaşmaması için bağlantıları kapatır.
+    Alt süreçler (ör. run_worker_pool işçileri) ihtiyaç duyduklarında kendi bağlantılarını açar.
+    Açık bir işlem (atomic blok) içindeki bağlantı kapatılırsa işlem bozulacağından ona dokunulmaz.
+    """
+    for conn in connections.all(initialized_only=True):
+        if conn.in_atomic_block:
+            logger.warning(f"'{conn.alias}' bağlantısı açık bir işlem içinde; işçi süreçler öncesinde kapatılmadı.")
+        else:
+            conn.close()
+
+
+def iter_scan_images(source: str, skip: Container[str] = ()) -> Iterator[Tuple[str, bytes]]:
+    """
+    Bir klasördeki (alt klasörler dahil), glob desenine uyan veya ZIP/TAR arşivindeki görüntüleri
+    ad sırasıyla (ad, içerik) çiftleri olarak tek tek okur; tümü belleğe alınmaz.
+    'skip' içindeki adlar okunmadan atlanır (kaldığı yerden devam için).
+    """
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+        )
+        for path in paths:
+            name = os.path.relpath(path, source)
+            if is_image_name(name) and name not in skip:
+                with open(path, 'rb') as image_file:
+                    yield name, image_file.read()
+    elif os.path.isfile(source) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                if not info.is_dir() and is_image_name(info.filename) and info.filename not in skip:
+                    yield info.filename, archive.read(info)
+    elif os.path.isfile(source) and tarfile.is_tarfile(source):
+        # Sıkıştırılmış TAR arşivleri sırayla okunur; üyeler arşivdeki sırayla döner
+        with tarfile.open(source, 'r:*') as archive:
+            for member in archive:
+                if member.isfile() and is_image_name(member.name) and member.name not in skip:
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        paths = sorted(glob.glob(source, recursive=True))
+        if not paths and not glob.has_magic(source):
+            raise FileNotFoundError(f"Kaynak bulunamadı: {source}")
+        for path in paths:
+            if os.path.isfile(path) and is_image_name(path) and path not in skip:
+                with open(path, 'rb') as image_file:
+                    yield path, image_file.read()
+
+
+def get_batch_workers(config: Dict, image_count: Optional[int] = None) -> int:
+    """
+    Konfigürasyona ve görüntü sayısına göre kullanılacak işçi süreç sayısını belirler.
+    Görüntü sayısı bilinmiyorsa (akış halinde okunan kaynaklar) yalnızca konfigürasyon kullanılır.
+    """
+    max_workers = int(config.get('batch', {}).get('max_workers') or os.cpu_count() or 1)
+    if image_count is not None:
+        max_workers = min(max_workers, image_count)
+    return max(1, max_workers)
+
+
+def process_sheet(name: str, data: bytes, config: Dict) -> Dict:
+    """
+    Tek bir form görüntüsünü bellekten çözerek işler. İşçi süreçlerde çalışır; veritabanına yazmaz.
+    """
+    try:
+        return process_image(data, config, save_to_db=False)
+    except Exception as e:
+        logger.error(f"Toplu işlemde '{name}' işlenirken hata oluştu: {e}")
+        return {"error": "İşlem sırasında bir hata oluştu."}
+
+
+def scan_images(
+    images: Iterator[Tuple[str, bytes]],
+    config: Dict,
+    workers: int = 1,
+    max_in_flight: Optional[int] = None
+) -> Iterator[Tuple[str, Dict]]:
+    """
+    Görüntüleri işçi süreç havuzunda işler ve (ad, sonuç) çiftlerini tamamlandıkça döner.
+    Aynı anda en fazla 'max_in_flight' görüntü bellekte/kuyrukta tutulur; kaynak ancak bir iş
+    bittiğinde okunmaya devam eder. Sonuçlar veritabanına yazılmaz.
+    """
+    if workers <= 1:
+        for name, data in images:
+            yield name, process_sheet(name, data, config)
+        return
+
+    max_in_flight = max(workers, max_in_flight or workers * 2)
+    get_template_features(config)
+    close_connections_before_fork()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=get_template_features,
+        initargs=(config,)
+    ) as executor:
+        pending = {}
+        images = iter(images)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    name, data = next(images)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(process_sheet, name, data, config)] = name
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"İşçi süreç '{name}' için hata verdi: {e}")
+                    result = {"error": "İşçi süreç hatası."}
+                yield name, result
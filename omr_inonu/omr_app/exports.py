@@ -0,0 +1,127 @@
+import csv
+import codecs
+import logging
+import tempfile
+from typing import Iterable, Iterator, List, Tuple
+
+from openpyxl import Workbook
+
+from .models import Course, Student
+
+logger = logging.getLogger(__name__)
+
+# Veritabanından tek seferde okunan öğrenci sayısı
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """
+    csv.writer için yazılanı olduğu gibi döndüren sahte dosya nesnesi.
+    """
+    def write(self, value):
+        return value
+
+
+def export_course_codes() -> List[str]:
+    """
+    Dışa aktarımda sütun olarak yer alacak ders kodlarını birincil anahtar sırasıyla döner.
+    """
+    return list(Course.objects.order_by('pk').values_list('code', flat=True))
+
+
+def header_row(course_codes: List[str]) -> List[str]:
+    header = ['Öğrenci Numarası', 'Doğru Sayısı', 'Yanlış Sayısı', 'Genel Puan']
+    for code in course_codes:
+        header.extend([f'{code} Doğru', f'{code} Yanlış', f'{code} Puan'])
+    return header
+
+
+def iter_students(students=None) -> Iterator[Student]:
+    """
+    Öğrencileri tamamını belleğe almadan, parça parça okuyarak döner.
+    """
+    if students is None:
+        students = Student.objects.all()
+    return students.order_by('pk').only(
+        'student_number', 'results', 'total_correct', 'total_incorrect', 'overall_score'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def student_rows(course_codes: List[str], students=None) -> Iterator[List]:
+    """
+    Her öğrenci için kayıtlı toplamları ve ders bazında doğru/yanlış/puan sütunlarını içeren
+    satırlar üretir. Sonucu olmayan dersler boş bırakılır.
+    """
+    for student in iter_students(students):
+        results = student.results or {}
+        row = [student.student_number, student.total_correct, student.total_incorrect, student.overall_score]
+        for code in course_codes:
+            overall = results.get(code, {}).get('overall')
+            if overall is None:
+                row.extend(['', '', ''])
+            else:
+                row.extend([overall.get('correct', 0), overall.get('incorrect', 0), overall.get('score', 0)])
+        yield row
+
+
+def stream_csv(students=None) -> Iterator[bytes]:
+    """
+    CSV içeriğini satır satır üretir. Excel'in Türkçe karakterleri doğru açması için
+    yalnızca başa bir UTF-8 BOM eklenir.
+    """
+    course_codes = export_course_codes()
+    writer = csv.writer(Echo())
+    yield codecs.BOM_UTF8
+    yield writer.writerow(header_row(course_codes)).encode('utf-8')
+    for row in student_rows(course_codes, students):
+        yield writer.writerow(row).encode('utf-8')
+
+
+def stream_txt(students=None) -> Iterator[bytes]:
+    """
+    Öğrenci başına bir blok olacak şekilde düz metin içeriğini üretir.
+    """
+    course_codes = export_course_codes()
+    for row in student_rows(course_codes, students):
+        lines = [
+            f"Öğrenci Numarası: {row[0]}",
+            f"Doğru Sayısı: {row[1]}",
+            f"Yanlış Sayısı: {row[2]}",
+            f"Genel Puan: {row[3]}",
+        ]
+        course_lines = [
+            f"  {code}: Doğru {correct}, Yanlış {incorrect}, Puan {score}"
+            for code, (correct, incorrect, score) in zip(course_codes, _course_cells(row))
+            if correct != ''
+        ]
+        lines.append("Notlar:" if course_lines else "Notlar: Eksik Notlar")
+        lines.extend(course_lines)
+        yield ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def _course_cells(row: List) -> Iterable[Tuple]:
+    cells = row[4:]
+    return (tuple(cells[i:i + 3]) for i in range(0, len(cells), 3))
+
+
+def write_xlsx(students=None):
+    """
+    Çalışma kitabını yalnızca-yazma kipinde, satırları belleğe toplamadan geçici bir
+    dosyaya yazar ve başa sarılmış dosyayı döner.
+    """
+    course_codes = export_course_codes()
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Notlar')
+    sheet.append(header_row(course_codes))
+    count = 0
+    for row in student_rows(course_codes, students):
+        sheet.append([None if cell == '' else cell for cell in row])
+        count += 1
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(output)
+    output.seek(0)
+    logger.info(f"XLSX dışa aktarımı hazırlandı: {count} öğrenci.")
+    return output
@@ -0,0 +1,248 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, OuterRef, Q, Subquery
+
+from .models import AnswerKey, ColumnMapping, Course, Student, StudentAnswer
+
+logger = logging.getLogger(__name__)
+
+# Tek seferde puanlanan öğrenci sayısı (bellek ve SQL parametre sınırı için)
+GRADING_CHUNK_SIZE = 1000
+
+
+def refresh_correctness(answers=None) -> int:
+    """
+    Cevapların is_correct alanını cevap anahtarıyla tek bir UPDATE sorgusunda yeniden hesaplar.
+    Anahtarı olmayan sorular için is_correct NULL olur. Güncellenen satır sayısını döner.
+    """
+    if answers is None:
+        answers = StudentAnswer.objects.all()
+    correct_answer = AnswerKey.objects.filter(
+        test_group=OuterRef('test_group'),
+        course=OuterRef('course'),
+        question_id=OuterRef('question_id')
+    ).values('correct_answer')[:1]
+    return answers.update(is_correct=ExpressionWrapper(
+        Q(selected_answer=Subquery(correct_answer)),
+        output_field=BooleanField()
+    ))
+
+
+def summarize_results(results: Dict) -> Tuple[int, int, float]:
+    """
+    Student.results sözlüğünden toplam doğru, toplam yanlış ve genel puanı (ders puanlarının
+    ortalaması) hesaplar.
+    """
+    total_correct = 0
+    total_incorrect = 0
+    scores = []
+    for details in (results or {}).values():
+        overall = details.get('overall', {})
+        total_correct += overall.get('correct', 0)
+        total_incorrect += overall.get('incorrect', 0)
+        scores.append(overall.get('score', 0))
+    overall_score = round(sum(scores) / len(scores), 2) if scores else 0.0
+    return total_correct, total_incorrect, overall_score
+
+
+def course_question_totals(course_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """
+    Her ders için eşleştirilmiş test gruplarının toplam soru sayısını tek sorguda döner.
+    """
+    mappings = ColumnMapping.objects.values_list(
+        'course_id', 'test_group_id', 'test_group__total_questions'
+    ).distinct()
+    if course_ids is not None:
+        mappings = mappings.filter(course_id__in=course_ids)
+
+    totals = {}
+    for course_id, _, total_questions in mappings:
+        totals[course_id] = totals.get(course_id, 0) + total_questions
+    return totals
+
+
+def compute_student_results(
+    student_ids: List[int],
+    course_ids: Optional[Iterable[int]] = None,
+    question_totals: Optional[Dict[int, int]] = None
+) -> Dict[int, Dict]:
+    """
+    Verilen öğrencilerin ders bazında doğru/yanlış sayılarını tek bir gruplanmış sorguyla
+    hesaplar ve Student.results biçiminde sonuç sözlüklerini döner.
+    """
+    if question_totals is None:
+        question_totals = course_question_totals(course_ids)
+    course_codes = dict(
+        Course.objects.filter(pk__in=question_totals.keys()).order_by('pk').values_list('pk', 'code')
+    )
+
+    answers = StudentAnswer.objects.filter(student_id__in=student_ids, course_id__in=course_codes.keys())
+    counts = answers.values('student_id', 'course_id').annotate(
+        correct=Count('id', filter=Q(is_correct=True)),
+        incorrect=Count('id', filter=Q(is_correct=False))
+    )
+
+    course_counts = {}
+    for row in counts:
+        if row['correct'] > 0 or row['incorrect'] > 0:
+            course_counts[(row['student_id'], row['course_id'])] = (row['correct'], row['incorrect'])
+
+    results = {}
+    for student_id in student_ids:
+        student_results = {}
+        # Dersler, Student.results içinde birincil anahtar sırasıyla yer alır
+        for course_id, code in course_codes.items():
+            total_questions = question_totals.get(course_id, 0)
+            if total_questions == 0 or (student_id, course_id) not in course_counts:
+                continue
+            correct, incorrect = course_counts[(student_id, course_id)]
+            student_results[code] = {
+                'overall': {
+                    'score': round((correct / total_questions) * 100, 2),
+                    'correct': correct,
+                    'incorrect': incorrect
+                }
+            }
+        results[student_id] = student_results
+    return results
+
+
+def grade_students(
+    student_ids: Optional[Iterable[int]] = None,
+    course_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Öğrenci sonuçlarını küme tabanlı sorgularla yeniden hesaplar ve bulk_update ile yazar.
+    student_ids verilmezse tüm öğrenciler puanlanır. course_ids verilirse yalnızca bu
+    derslerin sonuçları güncellenir, diğer derslerin sonuçları korunur.
+    Güncellenen öğrenci sayısını döner.
+    """
+    course_ids = list(course_ids) if course_ids is not None else None
+    students = Student.objects.order_by('pk')
+    if student_ids is not None:
+        students = students.filter(pk__in=list(student_ids))
+    pks = list(students.values_list('pk', flat=True))
+
+    question_totals = course_question_totals(course_ids)
+    graded_codes = set(
+        Course.objects.filter(pk__in=course_ids).values_list('code', flat=True)
+    ) if course_ids is not None else None
+
+    with transaction.atomic():
+        for start in range(0, len(pks), GRADING_CHUNK_SIZE):
+            chunk = list(Student.objects.filter(pk__in=pks[start:start + GRADING_CHUNK_SIZE]).only('pk', 'results'))
+            _grade_chunk(chunk, course_ids, question_totals, graded_codes)
+
+    logger.info(f"{len(pks)} öğrencinin sonuçları yeniden hesaplandı.")
+    return len(pks)
+
+
+def _grade_chunk(
+    students: List[Student],
+    course_ids: Optional[List[int]],
+    question_totals: Dict[int, int],
+    graded_codes: Optional[set]
+):
+    """
+    Bir grup öğrencinin sonuçlarını hesaplayıp tek bir bulk_update ile yazar.
+    """
+    results = compute_student_results([student.pk for student in students], course_ids, question_totals)
+    for student in students:
+        if graded_codes is None:
+            student.set_results(results[student.pk])
+        else:
+            # Yalnızca puanlanan derslerin sonuçları değiştirilir
+            merged = {code: value for code, value in (student.results or {}).items() if code not in graded_codes}
+            merged.update(results[student.pk])
+            student.set_results(merged)
+    Student.objects.bulk_update(students, Student.RESULT_FIELDS)
+
+
+def answer_key_filter(keys: Iterable[Tuple[int, int, int]]) -> Q:
+    """
+    (test_group_id, course_id, question_id) üçlülerini, (test grubu, ders) başına tek bir
+    question_id__in koşulu içeren bir Q ifadesine dönüştürür.
+    """
+    questions = {}
+    for test_group_id, course_id, question_id in keys:
+        questions.setdefault((test_group_id, course_id), set()).add(question_id)
+
+    condition = Q(pk__in=[])
+    for (test_group_id, course_id), question_ids in questions.items():
+        condition |= Q(test_group_id=test_group_id, course_id=course_id, question_id__in=sorted(question_ids))
+    return condition
+
+
+def apply_answer_key_changes(keys: Iterable[Tuple[int, int, int]]) -> int:
+    """
+    Değişen cevap anahtarı girdileri için yalnızca etkilenen cevapların is_correct alanını
+    tek bir UPDATE ile yeniden hesaplar ve etkilenen öğrencilerin sonuçlarına yalnızca
+    doğru/yanlış farklarını uygular. Sonucu değişen öğrenci sayısını döner.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+    condition = answer_key_filter(keys)
+
+    correct_answers = {
+        (test_group_id, course_id, question_id): correct_answer
+        for test_group_id, course_id, question_id, correct_answer in AnswerKey.objects.filter(condition).values_list(
+            'test_group_id', 'course_id', 'question_id', 'correct_answer'
+        )
+    }
+    affected = StudentAnswer.objects.filter(condition)
+
+    # (öğrenci, ders) başına [doğru farkı, yanlış farkı]
+    deltas = {}
+    for student_id, test_group_id, course_id, question_id, selected_answer, was_correct in affected.values_list(
+        'student_id', 'test_group_id', 'course_id', 'question_id', 'selected_answer', 'is_correct'
+    ):
+        correct_answer = correct_answers.get((test_group_id, course_id, question_id))
+        is_correct = None if correct_answer is None else selected_answer == correct_answer
+        if is_correct == was_correct:
+            continue
+        delta = deltas.setdefault((student_id, course_id), [0, 0])
+        if was_correct is not None:
+            delta[0 if was_correct else 1] -= 1
+        if is_correct is not None:
+            delta[0 if is_correct else 1] += 1
+
+    if not deltas:
+        return 0
+
+    with transaction.atomic():
+        refresh_correctness(affected)
+
+        course_ids = {course_id for _, course_id in deltas}
+        question_totals = course_question_totals(course_ids)
+        course_codes = dict(Course.objects.filter(pk__in=course_ids).values_list('pk', 'code'))
+        students = list(Student.objects.filter(pk__in={student_id for student_id, _ in deltas}).only('pk', 'results'))
+
+        for student in students:
+            results = dict(student.results or {})
+            for course_id in course_ids:
+                delta = deltas.get((student.pk, course_id))
+                total_questions = question_totals.get(course_id, 0)
+                if delta is None or total_questions == 0:
+                    continue
+                code = course_codes[course_id]
+                overall = results.get(code, {}).get('overall', {'correct': 0, 'incorrect': 0})
+                correct = overall['correct'] + delta[0]
+                incorrect = overall['incorrect'] + delta[1]
+                if correct > 0 or incorrect > 0:
+                    results[code] = {
+                        'overall': {
+                            'score': round((correct / total_questions) * 100, 2),
+                            'correct': correct,
+                            'incorrect': incorrect
+                        }
+                    }
+                else:
+                    results.pop(code, None)
+            student.set_results(results)
+        Student.objects.bulk_update(students, Student.RESULT_FIELDS)
+
+    logger.info(f"Cevap anahtarı değişikliği: {len(keys)} anahtar, {len(students)} öğrenci yeniden puanlandı.")
+    return len(students)
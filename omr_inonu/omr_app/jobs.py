@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import socket
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .batch import close_connections_before_fork
+from .metrics import MetricsServer
+from .models import ScanBatch, ScanJob
+from .scanner import get_template_features, process_image
+
+logger = logging.getLogger(__name__)
+
+
+def get_job_settings(config: Dict) -> Dict:
+    """
+    'scan_jobs' konfigürasyon bölümünü varsayılanlarla birlikte döner.
+    """
+    job_config = config.get('scan_jobs', {}) or {}
+    return {
+        'poll_interval': job_config.get('poll_interval', 1.0),
+        'stale_after': job_config.get('stale_after', 300),
+        'max_attempts': job_config.get('max_attempts', 3),
+        'keep_images': job_config.get('keep_images', False),
+    }
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def json_safe(value):
+    """
+    Sonuçtaki NumPy türlerini JSONField'a yazılabilir Python türlerine çevirir.
+    """
+    def convert(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        raise TypeError(f"JSON'a çevrilemeyen tür: {type(obj).__name__}")
+    return json.loads(json.dumps(value, default=convert))
+
+
+def enqueue_scan(image_file, batch: Optional[ScanBatch] = None) -> ScanJob:
+    """
+    Yüklenen form görüntüsünü benzersiz bir adla kaydeder ve bekleyen bir iş oluşturur.
+    Toplu yüklemede iş verilen gruba bağlanır.
+    """
+    job = ScanJob(original_name=os.path.basename(image_file.name or '')[:255], batch=batch)
+    job.image.save(os.path.basename(image_file.name or 'scan.jpg'), image_file, save=False)
+    try:
+        job.save()
+    except Exception:
+        job.image.delete(save=False)
+        raise
+    logger.info(f"Tarama işi kuyruğa alındı: {job.pk} ({job.original_name})")
+    return job
+
+
+def discard_image(job: ScanJob, config: Dict):
+    """
+    Tamamlanan (başarılı veya başarısız) işin görüntüsünü 'keep_images' kapalıysa siler.
+    """
+    if job.image and not get_job_settings(config)['keep_images']:
+        job.image.delete(save=False)
+        job.save(update_fields=['image'])
+
+
+def batch_report(batch: ScanBatch) -> Dict:
+    """
+    Gruptaki işlerin durum sayılarını ve iş başına sonucu/hatayı tek bir raporda toplar.
+    Bekleyen veya işlenen iş kalmadığında 'finished' True olur.
+    """
+    counts = dict.fromkeys((ScanJob.PENDING, ScanJob.PROCESSING, ScanJob.DONE, ScanJob.FAILED), 0)
+    counts.update(batch.jobs.values_list('status').annotate(count=Count('pk')).order_by())
+
+    sheets = []
+    for job_id, name, job_status, result, error in batch.jobs.order_by('pk').values_list(
+        'pk', 'original_name', 'status', 'result', 'error'
+    ).iterator():
+        sheet = {"job_id": job_id, "file": name, "status": job_status}
+        if job_status == ScanJob.DONE:
+            sheet["result"] = result
+        elif job_status == ScanJob.FAILED:
+            sheet["error"] = error
+        sheets.append(sheet)
+
+    return {
+        "batch_id": batch.pk,
+        "created_at": batch.created_at,
+        "total": len(sheets),
+        "finished": not counts[ScanJob.PENDING] and not counts[ScanJob.PROCESSING],
+        **counts,
+        "sheets": sheets
+    }
+
+
+def claim_next_job(worker_name: str) -> Optional[ScanJob]:
+    """
+    Sıradaki bekleyen işi koşullu bir UPDATE ile sahiplenir. Aynı işi birden fazla
+    işçinin alması engellenir; başka bir işçi önce davranırsa sonraki iş denenir.
+    """
+    while True:
+        job_id = ScanJob.objects.filter(status=ScanJob.PENDING).order_by('created_at', 'pk').values_list(
+            'pk', flat=True
+        ).first()
+        if job_id is None:
+            return None
+        claimed = ScanJob.objects.filter(pk=job_id, status=ScanJob.PENDING).update(
+            status=ScanJob.PROCESSING,
+            started_at=timezone.now(),
+            worker=worker_name[:100],
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ScanJob.objects.get(pk=job_id)
+
+
+def requeue_stale_jobs(config: Dict) -> int:
+    """
+    'stale_after' saniyeden uzun süredir işlenen (işçisi çökmüş) işleri yeniden kuyruğa alır;
+    deneme hakkı biten işler başarısız olarak işaretlenir.
+    """
+    job_settings = get_job_settings(config)
+    cutoff = timezone.now() - timedelta(seconds=job_settings['stale_after'])
+    stale = ScanJob.objects.filter(status=ScanJob.PROCESSING, started_at__lt=cutoff)
+
+    exhausted = list(stale.filter(attempts__gte=job_settings['max_attempts']))
+    failed = ScanJob.objects.filter(pk__in=[job.pk for job in exhausted], status=ScanJob.PROCESSING).update(
+        status=ScanJob.FAILED,
+        error="İşçi süreç zaman aşımına uğradı.",
+        finished_at=timezone.now()
+    )
+    for job in exhausted:
+        discard_image(job, config)
+    requeued = stale.update(status=ScanJob.PENDING, started_at=None, worker='')
+    if failed or requeued:
+        logger.warning(f"Takılan işler: {requeued} yeniden kuyruğa alındı, {failed} başarısız.")
+    return requeued
+
+
+def run_job(job: ScanJob, config: Dict) -> ScanJob:
+    """
+    Sahiplenilmiş bir işi işler, sonucu ve zaman bilgisini kaydeder.
+    """
+    try:
+        # Depolama arka ucundan bağımsız okunur ve bellekte çözülür
+        with job.image.open('rb') as image_file:
+            data = image_file.read()
+        result = process_image(data, config)
+    except Exception as e:
+        logger.error(f"Tarama işi {job.pk} işlenirken hata oluştu: {e}")
+        result = {"error": "İşlem sırasında bir hata oluştu."}
+
+    job.finished_at = timezone.now()
+    if 'error' in result:
+        job.status = ScanJob.FAILED
+        job.error = result['error']
+    else:
+        job.status = ScanJob.DONE
+        job.result = json_safe(result)
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+
+    discard_image(job, config)
+
+    logger.info(f"Tarama işi {job.pk}: {job.status} ({job.processing_seconds} sn)")
+    return job
+
+
+def run_worker(
+    config: Dict,
+    worker_name: Optional[str] = None,
+    once: bool = False,
+    max_jobs: Optional[int] = None
+) -> int:
+    """
+    Kuyruktaki işleri sırayla işler. once True ise kuyruk boşalınca döner.
+    İşlenen iş sayısını döner.
+    """
+    worker_name = worker_name or default_worker_name()
+    poll_interval = get_job_settings(config)['poll_interval']
+    processed = 0
+    logger.info(f"Tarama işçisi başlatıldı: {worker_name}")
+
+    while max_jobs is None or processed < max_jobs:
+        requeue_stale_jobs(config)
+        job = claim_next_job(worker_name)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job, config)
+        processed += 1
+
+    logger.info(f"Tarama işçisi durdu: {worker_name}, {processed} iş işlendi.")
+    return processed
+
+
+def run_worker_process(
+    config: Dict,
+    worker_name: str,
+    once: bool = False,
+    max_jobs: Optional[int] = None,
+    metrics_port: Optional[int] = None
+) -> int:
+    """
+    İşçi havuzundaki bir süreçte run_worker'ı çalıştırır; istenirse sürecin metriklerini sunar.
+    """
+    metrics_server = MetricsServer(port=metrics_port).start() if metrics_port is not None else None
+    try:
+        return run_worker(config, worker_name=worker_name, once=once, max_jobs=max_jobs)
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
+def run_worker_pool(
+    config: Dict,
+    processes: int,
+    worker_name: Optional[str] = None,
+    once: bool = False,
+    max_jobs: Optional[int] = None,
+    metrics_port: Optional[int] = None
+) -> int:
+    """
+    Kuyruğu 'processes' işçi süreçle paralel işler; her süreç işleri claim_next_job ile
+    sahiplendiğinden aynı iş iki kez işlenmez. max_jobs ve metrik portu süreç başınadır
+    (i. süreç metrikleri metrics_port + i portunda sunar). Toplam işlenen iş sayısını döner.
+    """
+    worker_name = worker_name or default_worker_name()
+    # Şablon öznitelikleri önceden hesaplanır; çatallanan süreçler önbelleği devralır
+    get_template_features(config)
+    close_connections_before_fork()
+    logger.info(f"Tarama işçi havuzu başlatılıyor: {processes} süreç.")
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                run_worker_process, config, f"{worker_name}-{index}", once, max_jobs,
+                metrics_port + index if metrics_port is not None else None
+            )
+            for index in range(processes)
+        ]
+        return sum(future.result() for future in futures)
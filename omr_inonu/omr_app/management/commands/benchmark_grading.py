@@ -0,0 +1,238 @@
+import json
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from omr_app.grading import grade_students
+from omr_app.models import AnswerKey, ColumnMapping, Course, Student, StudentAnswer, TestGroup, deferred_scoring
+from omr_app.scanner import save_results_to_db
+
+CHOICES = 'ABCDE'
+# Toplu yüklemede aynı ertelenmiş puanlama bloğunda işlenen form sayısı
+INGEST_BATCH_SIZE = 100
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper ile çalıştırılan sorguları sayar (sorgu günlüğü sınırına takılmaz).
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def measure(report: dict, name: str, items: int = 1):
+    """
+    Bloğun süresini ve sorgu sayısını rapora 'name' adıyla ekler.
+    """
+    counter = QueryCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        yield
+    elapsed = time.perf_counter() - start
+    report[name] = {
+        'seconds': round(elapsed, 3),
+        'items': items,
+        'per_second': round(items / elapsed, 1) if elapsed else 0.0,
+        'queries': counter.count,
+        'queries_per_item': round(counter.count / items, 2) if items else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Geçici bir test veritabanında dersler, test grupları, cevap anahtarları ve öğrenciler oluşturur; "
+        "cevap kaydetme hızını, yeniden puanlama süresini, liste uç noktası gecikmesini ve dışa aktarma "
+        "süresini sorgu sayılarıyla birlikte raporlar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=4, help="Ders (form sütunu) sayısı.")
+        parser.add_argument('--groups', type=int, default=4, help="Test grubu sayısı.")
+        parser.add_argument('--questions', type=int, default=25, help="Ders başına soru sayısı.")
+        parser.add_argument('--students', type=int, default=2000, help="Taranan form (öğrenci) sayısı.")
+        parser.add_argument('--api-answers', type=int, default=200,
+                            help="Tek tek StudentAnswer.save ile kaydedilecek cevap sayısı.")
+        parser.add_argument('--repeat', type=int, default=5, help="Uç nokta isteklerinin tekrar sayısı.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', default=None, help="Raporu bu dosyaya JSON olarak yaz.")
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['courses'] < 1 or options['groups'] < 1:
+            raise CommandError("--students, --courses ve --groups en az 1 olmalıdır.")
+
+        # Görünümler ve ORM varsayılan bağlantıyı kullandığından, test çalıştırıcısı gibi
+        # geçici bir veritabanı oluşturulur; gerçek veritabanına dokunulmaz.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Rapor yazıldı: {options['json_path']}")
+
+    def benchmark(self, options) -> dict:
+        rng = random.Random(options['seed'])
+        report = {'options': {
+            key: options[key] for key in ('courses', 'groups', 'questions', 'students', 'api_answers', 'seed')
+        }}
+        timings = report['timings'] = {}
+
+        groups = self.seed(options, rng)
+        self.stdout.write(
+            f"{options['courses']} ders, {len(groups)} test grubu, "
+            f"{AnswerKey.objects.count()} cevap anahtarı girdisi oluşturuldu."
+        )
+
+        sheets = [self.random_sheet(index, groups, options, rng) for index in range(options['students'])]
+        with measure(timings, 'ingest (save_results_to_db)', len(sheets)):
+            for start in range(0, len(sheets), INGEST_BATCH_SIZE):
+                with deferred_scoring():
+                    for sheet in sheets[start:start + INGEST_BATCH_SIZE]:
+                        save_results_to_db(sheet)
+
+        self.ingest_single_answers(timings, options, groups, rng)
+
+        with measure(timings, 'regrade (grade_students)', Student.objects.count()):
+            grade_students()
+
+        key = AnswerKey.objects.order_by('pk').first()
+        key.correct_answer = CHOICES[(CHOICES.index(key.correct_answer) + 1) % len(CHOICES)]
+        with measure(timings, 'answer key change (1 key)'):
+            key.save()
+
+        course = Course.objects.order_by('pk').first()
+        endpoints = {
+            'GET students (page_size=100)': reverse('student-list') + '?page_size=100',
+            'GET studentanswers (page_size=100)': reverse('studentanswer-list') + '?page_size=100',
+            'GET studentanswers (course filter)': reverse('studentanswer-list') + f'?course={course.pk}&page_size=100',
+            'GET answerkeys (full list)': reverse('answerkey-list'),
+            'GET courses (full list)': reverse('course-list'),
+            'export csv': reverse('export-grades', kwargs={'export_format': 'csv'}),
+            'export xlsx': reverse('export-grades', kwargs={'export_format': 'xlsx'}),
+        }
+        report['endpoints'] = {name: self.time_endpoint(url, options['repeat']) for name, url in endpoints.items()}
+        report['rows'] = {
+            'students': Student.objects.count(),
+            'student_answers': StudentAnswer.objects.count(),
+        }
+        return report
+
+    def seed(self, options, rng: random.Random):
+        """
+        Dersleri, test gruplarını, sütun eşleşmelerini ve cevap anahtarlarını oluşturur.
+        Her test grubunda n. sütun n. derse eşlenir.
+        """
+        courses = Course.objects.bulk_create(
+            Course(name=f"Ders {index}", code=f"D{index}", total_questions=options['questions'])
+            for index in range(1, options['courses'] + 1)
+        )
+        groups = TestGroup.objects.bulk_create(
+            TestGroup(name=chr(64 + index) if index <= 26 else f"G{index}", total_questions=options['questions'])
+            for index in range(1, options['groups'] + 1)
+        )
+        ColumnMapping.objects.bulk_create(
+            ColumnMapping(test_group=group, column_number=column, course=course)
+            for group in groups
+            for column, course in enumerate(courses, start=1)
+        )
+        # bulk_create AnswerKey.save'i çağırmaz; henüz cevap olmadığından yeniden puanlama gerekmez
+        AnswerKey.objects.bulk_create(
+            AnswerKey(test_group=group, course=course, question_id=question, correct_answer=rng.choice(CHOICES))
+            for group in groups
+            for course in courses
+            for question in range(1, options['questions'] + 1)
+        )
+        return groups
+
+    def random_sheet(self, index: int, groups, options, rng: random.Random) -> dict:
+        """
+        process_image çıktısı biçiminde rastgele bir form sonucu üretir (%5 boş cevap).
+        """
+        return {
+            'student_number': f"{20240000000 + index}",
+            'test_group': rng.choice(groups).name,
+            'answers': {
+                str(column): {
+                    str(question): None if rng.random() < 0.05 else rng.choice(CHOICES)
+                    for question in range(1, options['questions'] + 1)
+                }
+                for column in range(1, options['courses'] + 1)
+            }
+        }
+
+    def ingest_single_answers(self, timings, options, groups, rng: random.Random):
+        """
+        REST uç noktasının kullandığı yol: her cevap StudentAnswer.save ile tek tek kaydedilir.
+        """
+        count = options['api_answers']
+        if count < 1:
+            return
+        courses = list(Course.objects.order_by('pk'))
+        slots = [(course, question) for course in courses for question in range(1, options['questions'] + 1)]
+        with measure(timings, 'ingest (StudentAnswer.save)', count):
+            for index in range(count):
+                if index % len(slots) == 0:
+                    student = Student.objects.create(student_number=f"api-{index}")
+                    group = rng.choice(groups)
+                course, question = slots[index % len(slots)]
+                StudentAnswer.objects.create(
+                    student=student, test_group=group, course=course,
+                    question_id=question, selected_answer=rng.choice(CHOICES)
+                )
+
+    def time_endpoint(self, url: str, repeat: int) -> dict:
+        client = Client()
+        durations = []
+        counter = QueryCounter()
+        status = None
+        size = 0
+        for _ in range(max(1, repeat)):
+            counter.count = 0
+            start = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = client.get(url)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+            durations.append((time.perf_counter() - start) * 1000)
+            status = response.status_code
+            size = len(content)
+        return {
+            'median_ms': round(statistics.median(durations), 2),
+            'max_ms': round(max(durations), 2),
+            'queries': counter.count,
+            'status': status,
+            'bytes': size,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING("Puanlama ve kalıcılık kıyaslaması"))
+        self.stdout.write(
+            f"{report['rows']['students']} öğrenci, {report['rows']['student_answers']} cevap satırı"
+        )
+        for name, timing in report['timings'].items():
+            self.stdout.write(
+                f"{name:<36} {timing['seconds']:>8.3f} sn  {timing['per_second']:>10.1f}/sn  "
+                f"{timing['queries']:>7} sorgu ({timing['queries_per_item']}/öğe)"
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING("Uç noktalar (medyan)"))
+        for name, timing in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<36} {timing['median_ms']:>9.2f} ms  {timing['queries']:>4} sorgu  "
+                f"{timing['bytes']:>10} bayt  HTTP {timing['status']}"
+            )
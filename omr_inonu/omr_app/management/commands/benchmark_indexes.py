@@ -0,0 +1,183 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Q
+
+from omr_app.models import AnswerKey, ColumnMapping, Course, Student, StudentAnswer, TestGroup
+
+# Sentetik veri: her öğrenci tek bir test grubunda, her dersten QUESTIONS_PER_COURSE soru cevaplar
+COURSE_COUNT = 4
+GROUP_COUNT = 4
+QUESTIONS_PER_COURSE = 25
+CHOICES = 'ABCDE'
+
+
+class Command(BaseCommand):
+    help = (
+        "Geçici bir SQLite veritabanında sentetik StudentAnswer tablosu oluşturur ve puanlama/arama "
+        "sorgularının planlarını ve sürelerini model indeksleri olmadan ve ile karşılaştırır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Oluşturulacak cevap satırı sayısı.")
+        parser.add_argument('--repeat', type=int, default=5, help="Her sorgunun tekrar sayısı.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        settings_dict = dict(connections['default'].settings_dict, NAME=path)
+        connection = connections['default'].__class__(settings_dict, alias='benchmark')
+        # schema_editor() işlemleri bağlantıyı takma adıyla arar
+        connections['benchmark'] = connection
+        try:
+            self.create_schema(connection)
+            student_count = self.seed(connection, options['rows'], random.Random(options['seed']))
+            queries = self.build_queries(student_count)
+
+            self.stdout.write(self.style.MIGRATE_HEADING("İndeksler olmadan"))
+            before = self.measure(connection, queries, options['repeat'])
+
+            with connection.schema_editor() as editor:
+                for model in (StudentAnswer, ColumnMapping):
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            self.stdout.write(self.style.MIGRATE_HEADING("Model indeksleri ile"))
+            after = self.measure(connection, queries, options['repeat'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING("Özet (medyan, ms)"))
+            for name in queries:
+                speedup = before[name] / after[name] if after[name] else float('inf')
+                self.stdout.write(f"{name:<28} {before[name]:>9.2f} -> {after[name]:>9.2f}  ({speedup:.1f}x)")
+        finally:
+            connection.close()
+            del connections['benchmark']
+            os.remove(path)
+
+    def create_schema(self, connection):
+        """
+        Tabloları oluşturur ve karşılaştırma için Meta.indexes ile gelen indeksleri kaldırır.
+        """
+        with connection.schema_editor() as editor:
+            for model in (Course, TestGroup, Student, ColumnMapping, AnswerKey, StudentAnswer):
+                editor.create_model(model)
+        # İndeksler editör kapanırken oluşturulduğundan ayrı bir editörde kaldırılır
+        with connection.schema_editor() as editor:
+            for model in (StudentAnswer, ColumnMapping):
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def seed(self, connection, rows: int, rng: random.Random) -> int:
+        """
+        Ders, test grubu, cevap anahtarı ve yaklaşık 'rows' adet öğrenci cevabı ekler.
+        """
+        answers_per_student = COURSE_COUNT * QUESTIONS_PER_COURSE
+        student_count = max(1, rows // answers_per_student)
+        start = time.perf_counter()
+
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN')
+            cursor.executemany(
+                f'INSERT INTO {Course._meta.db_table} (id, name, code, total_questions) VALUES (%s, %s, %s, %s)',
+                [(c, f'Ders {c}', f'C{c}', QUESTIONS_PER_COURSE) for c in range(1, COURSE_COUNT + 1)]
+            )
+            cursor.executemany(
+                f'INSERT INTO {TestGroup._meta.db_table} (id, name, total_questions) VALUES (%s, %s, %s)',
+                [(g, chr(64 + g), QUESTIONS_PER_COURSE) for g in range(1, GROUP_COUNT + 1)]
+            )
+            cursor.executemany(
+                f'INSERT INTO {ColumnMapping._meta.db_table} (test_group_id, column_number, course_id) '
+                f'VALUES (%s, %s, %s)',
+                [(g, c, c) for g in range(1, GROUP_COUNT + 1) for c in range(1, COURSE_COUNT + 1)]
+            )
+            keys = {
+                (g, c, q): rng.choice(CHOICES)
+                for g in range(1, GROUP_COUNT + 1)
+                for c in range(1, COURSE_COUNT + 1)
+                for q in range(1, QUESTIONS_PER_COURSE + 1)
+            }
+            cursor.executemany(
+                f'INSERT INTO {AnswerKey._meta.db_table} (test_group_id, course_id, question_id, correct_answer) '
+                f'VALUES (%s, %s, %s, %s)',
+                [(g, c, q, answer) for (g, c, q), answer in keys.items()]
+            )
+            cursor.executemany(
+                f'INSERT INTO {Student._meta.db_table} '
+                f'(id, student_number, results, total_correct, total_incorrect, overall_score) '
+                f'VALUES (%s, %s, %s, 0, 0, 0)',
+                [(s, f'{20240000000 + s}', '{}') for s in range(1, student_count + 1)]
+            )
+
+            def answer_rows():
+                for s in range(1, student_count + 1):
+                    g = s % GROUP_COUNT + 1
+                    for c in range(1, COURSE_COUNT + 1):
+                        for q in range(1, QUESTIONS_PER_COURSE + 1):
+                            selected = rng.choice(CHOICES)
+                            yield (s, g, c, q, selected, selected == keys[(g, c, q)], '2024-01-01', '2024-01-01')
+
+            cursor.executemany(
+                f'INSERT INTO {StudentAnswer._meta.db_table} '
+                f'(student_id, test_group_id, course_id, question_id, selected_answer, is_correct, created_at, updated_at) '
+                f'VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+                answer_rows()
+            )
+            cursor.execute('COMMIT')
+            cursor.execute('ANALYZE')
+
+        self.stdout.write(
+            f"{student_count * answers_per_student} cevap satırı {time.perf_counter() - start:.1f} sn içinde oluşturuldu."
+        )
+        return student_count
+
+    def build_queries(self, student_count: int):
+        """
+        Uygulamadaki erişim yollarını temsil eden sorgular (grading.py, scanner.py ve dışa aktarma).
+        """
+        student_chunk = list(range(1, min(student_count, 1000) + 1))
+        return {
+            'puanlama (1000 öğrenci)': StudentAnswer.objects.filter(
+                student_id__in=student_chunk, course_id__in=range(1, COURSE_COUNT + 1)
+            ).values('student_id', 'course_id').annotate(
+                correct=Count('id', filter=Q(is_correct=True)),
+                incorrect=Count('id', filter=Q(is_correct=False))
+            ),
+            'anahtar değişikliği': StudentAnswer.objects.filter(
+                test_group_id=1, course_id=2, question_id__in=[3]
+            ).values_list('student_id', 'selected_answer', 'is_correct'),
+            'öğrenci ders cevapları': StudentAnswer.objects.filter(
+                student_id=student_count // 2 or 1, course_id=3
+            ).values_list('question_id', 'selected_answer', 'is_correct'),
+            'sütun eşleşmeleri': ColumnMapping.objects.filter(
+                test_group_id=2, column_number=3
+            ).values_list('course_id', flat=True),
+        }
+
+    def measure(self, connection, queries, repeat: int):
+        """
+        Her sorgunun EXPLAIN QUERY PLAN çıktısını yazar ve medyan süresini (ms) döner.
+        """
+        timings = {}
+        with connection.cursor() as cursor:
+            for name, queryset in queries.items():
+                sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = '; '.join(row[-1] for row in cursor.fetchall())
+
+                durations = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    durations.append((time.perf_counter() - start) * 1000)
+                timings[name] = statistics.median(durations)
+                self.stdout.write(f"{name:<28} {timings[name]:>9.2f} ms  {plan}")
+        return timings
@@ -0,0 +1,173 @@
+import json
+import logging
+import math
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from omr_app.ocr import LocalOCRServer
+from omr_app.scanner import load_config, process_image
+from omr_app.synthetic import heading_lines, random_distortion, random_sheet_spec, render_sheet, score_read
+
+
+def percentile(values, fraction: float) -> float:
+    """
+    En yakın sıra yöntemiyle yüzdelik değer.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Şablondan üretilen sentetik, doldurulmuş formları tüm tarama hattından geçirir ve "
+        "form/sn, aşama başına p50/p95 süreleri, bellek tepe değerini ve okuma doğruluğunu raporlar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sheets', type=int, default=50, help="Ölçülecek form sayısı.")
+        parser.add_argument('--warmup', type=int, default=2, help="Ölçüme dahil edilmeyen ısınma formu sayısı.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--rotation', type=float, default=1.5, help="En fazla dönme (derece, ±).")
+        parser.add_argument('--scale-jitter', type=float, default=0.03, help="Ölçek sapması (ör. 0.03 = ±%%3).")
+        parser.add_argument('--blur', type=int, default=0, help="Gauss bulanıklığı çekirdek boyutu (0: yok).")
+        parser.add_argument('--noise', type=float, default=0.0, help="Gauss gürültüsü standart sapması.")
+        parser.add_argument('--jpeg-quality', type=int, default=85)
+        parser.add_argument('--blank-rate', type=float, default=0.1, help="Boş bırakılan soru oranı.")
+        parser.add_argument('--ocr-stub', action='store_true',
+                            help="Başlıkları yerel sahte OCR sunucusuyla bul (locator: ocr).")
+        parser.add_argument('--no-artifacts', action='store_true',
+                            help="Hata ayıklama görüntüsü, ROI ve görselleştirme yazımını kapat.")
+        parser.add_argument('--json', dest='json_path', default=None, help="Raporu bu dosyaya JSON olarak yaz.")
+
+    def handle(self, *args, **options):
+        if options['sheets'] < 1:
+            raise CommandError("--sheets en az 1 olmalıdır.")
+        config = load_config(os.path.join(settings.BASE_DIR, 'config.yaml'))
+        config['logging']['level'] = 'WARNING'
+        # Kıyaslama çalıştırmalarının günlüğü kaynak ağacındaki işlem günlüğüne karışmaz
+        log_directory = tempfile.TemporaryDirectory()
+        config['logging']['log_file'] = os.path.join(log_directory.name, 'benchmark_scanner.log')
+        if options['no_artifacts']:
+            for key in ('save_debug_images', 'save_visualization', 'save_rois', 'save_results_json'):
+                config['output'][key] = False
+        template = cv2.imread(os.path.join(settings.BASE_DIR, config['template_matching']['template_path']))
+        if template is None:
+            raise CommandError("Şablon görüntü yüklenemedi.")
+
+        rng = random.Random(options['seed'])
+        total = options['warmup'] + options['sheets']
+        start = time.perf_counter()
+        sheets = []
+        for index in range(total):
+            spec = random_sheet_spec(rng, config, options['blank_rate'])
+            distortion = random_distortion(
+                rng, options['rotation'], options['scale_jitter'],
+                options['blur'], options['noise'], options['jpeg_quality']
+            )
+            sheets.append((spec, render_sheet(template, config, spec, distortion, seed=options['seed'] + index)))
+        self.stdout.write(f"{total} sentetik form {time.perf_counter() - start:.1f} sn içinde üretildi.")
+
+        ocr_server = None
+        if options['ocr_stub']:
+            ocr_server = LocalOCRServer(heading_lines(config)).start()
+            config['dynamic_roi']['locator'] = 'ocr'
+            config['ocr']['backend'] = 'local_http'
+            config['ocr']['local_http'] = {'url': ocr_server.url, 'timeout': 5}
+        try:
+            report = self.run(sheets, config, options['warmup'])
+        finally:
+            if ocr_server is not None:
+                ocr_server.stop()
+            # setup_logging'in geçici klasöre açtığı dosya handler'ı kapatılıp kaldırılır
+            root_logger = logging.getLogger()
+            for handler in list(root_logger.handlers):
+                if getattr(handler, 'baseFilename', '').startswith(log_directory.name):
+                    root_logger.removeHandler(handler)
+                    handler.close()
+            log_directory.cleanup()
+
+        report['options'] = {
+            key: options[key] for key in (
+                'sheets', 'seed', 'rotation', 'scale_jitter', 'blur', 'noise',
+                'jpeg_quality', 'blank_rate', 'ocr_stub', 'no_artifacts'
+            )
+        }
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Rapor yazıldı: {options['json_path']}")
+
+    def run(self, sheets, config, warmup: int):
+        for spec, data in sheets[:warmup]:
+            process_image(data, config, save_to_db=False)
+
+        totals, stages, scores, failures = [], {}, [], 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        for spec, data in sheets[warmup:]:
+            result = process_image(data, config, save_to_db=False)
+            scores.append(score_read(spec, result))
+            if 'error' in result:
+                failures += 1
+                continue
+            trace = result['trace']
+            totals.append(trace['wall_ms'])
+            for name, stage in trace['stages'].items():
+                stages.setdefault(name, []).append(stage['wall_ms'])
+        elapsed = time.perf_counter() - start
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        count = len(sheets) - warmup
+        return {
+            'sheets': count,
+            'failures': failures,
+            'elapsed_seconds': round(elapsed, 3),
+            'sheets_per_second': round(count / elapsed, 3) if elapsed else 0.0,
+            'latency_ms': {'p50': percentile(totals, 0.5), 'p95': percentile(totals, 0.95)},
+            'stages_ms': {
+                name: {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95)}
+                for name, values in stages.items()
+            },
+            'accuracy': {
+                field: round(sum(score[field] for score in scores) / len(scores), 4)
+                for field in ('answers', 'student_number', 'test_group')
+            },
+            'memory': {
+                'python_peak_mb': round(traced_peak / 1024 / 1024, 1),
+                # Linux'ta ru_maxrss KB cinsindendir; süreç ömrü boyunca en yüksek değer
+                'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            },
+        }
+
+    def print_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING("Tarama kıyaslaması"))
+        self.stdout.write(
+            f"{report['sheets']} form, {report['failures']} hata, {report['elapsed_seconds']} sn, "
+            f"{report['sheets_per_second']} form/sn"
+        )
+        self.stdout.write(
+            f"Form süresi: p50 {report['latency_ms']['p50']:.1f} ms, p95 {report['latency_ms']['p95']:.1f} ms"
+        )
+        for name, values in sorted(report['stages_ms'].items(), key=lambda item: -item[1]['p50']):
+            self.stdout.write(f"  {name:<16} p50 {values['p50']:>9.2f} ms   p95 {values['p95']:>9.2f} ms")
+        accuracy = report['accuracy']
+        self.stdout.write(
+            f"Doğruluk: cevaplar %{accuracy['answers'] * 100:.2f}, öğrenci numarası "
+            f"%{accuracy['student_number'] * 100:.2f}, test grubu %{accuracy['test_group'] * 100:.2f}"
+        )
+        self.stdout.write(
+            f"Bellek: Python tepe {report['memory']['python_peak_mb']} MB, "
+            f"süreç RSS tepe {report['memory']['max_rss_mb']} MB"
+        )
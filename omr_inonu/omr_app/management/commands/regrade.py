@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from omr_app.grading import grade_students, refresh_correctness
+from omr_app.models import Course, Student, StudentAnswer
+
+
+class Command(BaseCommand):
+    help = "Öğrenci sonuçlarını küme tabanlı sorgularla yeniden hesaplar (ör. cevap anahtarı düzeltmesinden sonra)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', dest='courses', metavar='KOD',
+                            help="Yalnızca bu dersi puanla (birden fazla verilebilir).")
+        parser.add_argument('--student', action='append', dest='students', metavar='NUMARA',
+                            help="Yalnızca bu öğrenciyi puanla (birden fazla verilebilir).")
+        parser.add_argument('--refresh-correctness', action='store_true',
+                            help="Önce cevapların doğruluğunu cevap anahtarından yeniden hesapla.")
+
+    def handle(self, *args, **options):
+        course_ids = None
+        if options['courses']:
+            course_ids = list(Course.objects.filter(code__in=options['courses']).values_list('pk', flat=True))
+            if len(course_ids) != len(set(options['courses'])):
+                raise CommandError("Ders kodlarından en az biri bulunamadı.")
+
+        student_ids = None
+        if options['students']:
+            students = dict(
+                Student.objects.filter(student_number__in=options['students']).values_list('student_number', 'pk')
+            )
+            missing = sorted(set(options['students']) - set(students))
+            if missing:
+                raise CommandError(f"Öğrenci numaraları bulunamadı: {', '.join(missing)}")
+            student_ids = list(students.values())
+
+        start = time.perf_counter()
+        if options['refresh_correctness']:
+            answers = StudentAnswer.objects.all()
+            if course_ids is not None:
+                answers = answers.filter(course_id__in=course_ids)
+            if student_ids is not None:
+                answers = answers.filter(student_id__in=student_ids)
+            refreshed = refresh_correctness(answers)
+            self.stdout.write(f"{refreshed} cevabın doğruluğu güncellendi.")
+
+        graded = grade_students(student_ids, course_ids)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"{graded} öğrenci {elapsed:.2f} sn içinde yeniden puanlandı."))
@@ -0,0 +1,58 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from omr_app.batch import get_batch_workers
+from omr_app.jobs import run_worker, run_worker_pool
+from omr_app.metrics import MetricsServer
+from omr_app.scanner import load_config
+
+
+class Command(BaseCommand):
+    help = "Veritabanı kuyruğundaki form tarama işlerini işleyen işçi süreçlerini başlatır."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Kuyruk boşalınca çık.")
+        parser.add_argument('--max-jobs', type=int, default=None,
+                            help="Her işçi süreç bu kadar iş işledikten sonra çıkar.")
+        parser.add_argument('--name', default=None, help="İşçi adı (varsayılan: makine:pid).")
+        parser.add_argument('--processes', type=int, default=None,
+                            help="Paralel işçi süreç sayısı (varsayılan: batch.max_workers veya CPU sayısı).")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Prometheus metriklerini bu portta /metrics adresinden sun "
+                                 "(birden fazla süreçte süreç başına ardışık portlar).")
+
+    def handle(self, *args, **options):
+        config = load_config(os.path.join(settings.BASE_DIR, 'config.yaml'))
+        processes = options['processes'] or get_batch_workers(config)
+        if processes < 1:
+            raise CommandError("--processes en az 1 olmalıdır.")
+
+        if processes > 1:
+            processed = run_worker_pool(
+                config,
+                processes,
+                worker_name=options['name'],
+                once=options['once'],
+                max_jobs=options['max_jobs'],
+                metrics_port=options['metrics_port']
+            )
+            self.stdout.write(self.style.SUCCESS(f"{processes} süreçte {processed} tarama işi işlendi."))
+            return
+
+        # İşler web sürecinde değil bu süreçte işlendiğinden metrikler burada sunulur
+        metrics_server = None
+        if options['metrics_port'] is not None:
+            metrics_server = MetricsServer(port=options['metrics_port']).start()
+        try:
+            processed = run_worker(
+                config,
+                worker_name=options['name'],
+                once=options['once'],
+                max_jobs=options['max_jobs']
+            )
+        finally:
+            if metrics_server is not None:
+                metrics_server.stop()
+        self.stdout.write(self.style.SUCCESS(f"{processed} tarama işi işlendi."))
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from omr_app.batch import get_batch_workers, iter_scan_images, scan_images
+from omr_app.jobs import json_safe
+from omr_app.models import deferred_scoring
+from omr_app.scanner import load_config, save_results_to_db
+
+logger = logging.getLogger(__name__)
+
+
+def read_checkpoint(path: str) -> set:
+    """
+    Daha önce işlenmiş görüntü adlarını (satır başına bir ad) okur.
+    """
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as checkpoint_file:
+        return {line.rstrip('\n') for line in checkpoint_file if line.strip()}
+
+
+def truncate_output(path: str, done: set):
+    """
+    Çıktıdan kontrol noktasında olmayan formların satırlarını atar; çıktı yazılıp kontrol
+    noktası yazılamadan kesilen bir çalıştırma devamda yinelenen satır bırakmaz.
+    """
+    if not os.path.exists(path):
+        return
+    temporary_path = f"{path}.tmp"
+    with open(path, encoding='utf-8') as source, open(temporary_path, 'w', encoding='utf-8') as target:
+        for line in source:
+            try:
+                name = json.loads(line)['file']
+            except (ValueError, KeyError, TypeError):
+                continue
+            if name in done:
+                target.write(line)
+    os.replace(temporary_path, path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bir klasör, glob deseni veya ZIP/TAR arşivindeki taranmış formları arayüz olmadan işler. "
+        "Sonuçlar JSON Lines dosyasına yazılır ve/veya veritabanına toplu kaydedilir; "
+        "kontrol noktası dosyasıyla yarıda kalan işlem kaldığı yerden sürdürülür."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Klasör, glob deseni (ör. 'taramalar/**/*.jpg') veya ZIP/TAR arşivi.")
+        parser.add_argument('--output', default=None, help="Sonuçların yazılacağı JSON Lines dosyası.")
+        parser.add_argument('--save-db', action='store_true', help="Başarılı sonuçları veritabanına kaydet.")
+        parser.add_argument('--checkpoint', default=None,
+                            help="İşlenen görüntü adlarının tutulduğu dosya; varsa bu adlar atlanır.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="İşçi süreç sayısı (varsayılan: batch.max_workers veya CPU sayısı).")
+        parser.add_argument('--max-in-flight', type=int, default=None,
+                            help="Aynı anda bellekte tutulacak en fazla görüntü (varsayılan: batch.max_in_flight).")
+        parser.add_argument('--commit-every', type=int, default=100,
+                            help="Sonuçların ve kontrol noktasının kaç formda bir yazılacağı; --save-db ile "
+                                 "aynı ertelenmiş puanlama bloğunda kaydedilen form sayısı.")
+        parser.add_argument('--progress-every', type=float, default=10.0,
+                            help="İlerleme ve hız bilgisinin kaç saniyede bir yazılacağı.")
+
+    def handle(self, *args, **options):
+        if not options['output'] and not options['save_db']:
+            raise CommandError("--output veya --save-db seçeneklerinden en az biri verilmelidir.")
+        if options['commit_every'] < 1:
+            raise CommandError("--commit-every en az 1 olmalıdır.")
+
+        config = load_config(os.path.join(settings.BASE_DIR, 'config.yaml'))
+        batch_config = config.get('batch', {})
+        workers = options['workers'] or get_batch_workers(config)
+        max_in_flight = options['max_in_flight'] or batch_config.get('max_in_flight')
+
+        done = read_checkpoint(options['checkpoint'])
+        if done:
+            self.stdout.write(f"Kontrol noktasından devam ediliyor: {len(done)} görüntü atlanacak.")
+        images = iter_scan_images(options['source'], skip=done)
+
+        # Devam edilirken yalnızca kontrol noktasındaki formların sonuçları korunur
+        output_file = None
+        if options['output']:
+            if done:
+                truncate_output(options['output'], done)
+            output_file = open(options['output'], 'a' if done else 'w', encoding='utf-8')
+        checkpoint_file = open(options['checkpoint'], 'a', encoding='utf-8') if options['checkpoint'] else None
+
+        self.processed = self.failed = self.unsaved = 0
+        self.pending = []
+        start = last_report = time.perf_counter()
+        try:
+            for name, result in scan_images(images, config, workers, max_in_flight):
+                self.processed += 1
+                self.failed += 'error' in result
+                self.pending.append((name, result))
+                if len(self.pending) >= options['commit_every']:
+                    self.flush(options['save_db'], output_file, checkpoint_file)
+
+                now = time.perf_counter()
+                if now - last_report >= options['progress_every']:
+                    last_report = now
+                    self.stderr.write(
+                        f"{self.processed} form işlendi ({self.failed} hata), "
+                        f"{self.processed / (now - start):.2f} form/sn"
+                    )
+            self.flush(options['save_db'], output_file, checkpoint_file)
+        finally:
+            if output_file is not None:
+                output_file.close()
+            if checkpoint_file is not None:
+                checkpoint_file.close()
+
+        elapsed = time.perf_counter() - start
+        rate = self.processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.processed} form işlendi ({self.failed} hata) {elapsed:.1f} sn, {rate:.2f} form/sn."
+        ))
+        if self.unsaved:
+            self.stdout.write(self.style.WARNING(
+                f"{self.unsaved} form veritabanına kaydedilemedi; kontrol noktasına yazılmadılar, "
+                f"aynı komutla yeniden denenebilir."
+            ))
+
+    def flush(self, save_db: bool, output_file, checkpoint_file):
+        """
+        Bekleyen sonuçları (istenirse) veritabanına kaydeder, ardından kaydedilenleri (ve işlenemeyen
+        formları) aynı noktada JSON Lines çıktısına ve kontrol noktasına yazar. Veritabanına
+        yazılamayan formlar ikisine de yazılmaz; devamda yeniden işlenir.
+        """
+        committed = []
+        if save_db:
+            # Öğrenci sonuçları her form yerine blok sonunda öğrenci başına bir kez hesaplanır
+            with deferred_scoring():
+                for name, result in self.pending:
+                    if 'error' in result or save_results_to_db(result):
+                        committed.append((name, result))
+                    else:
+                        self.unsaved += 1
+                        self.failed += 1
+                        logger.error(f"'{name}' veritabanına kaydedilemedi; kontrol noktasına yazılmadı.")
+        else:
+            committed = self.pending
+        self.pending = []
+
+        if output_file is not None:
+            for name, result in committed:
+                record = json_safe(
+                    {"file": name, "status": "error", "error": result['error']} if 'error' in result
+                    else {"file": name, "status": "ok", "result": result}
+                )
+                output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output_file.flush()
+        if checkpoint_file is not None:
+            checkpoint_file.writelines(f"{name}\n" for name, _ in committed)
+            checkpoint_file.flush()
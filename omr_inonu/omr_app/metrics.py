@@ -0,0 +1,281 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Süre histogramlarının üst sınırları (saniye)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Form başına veritabanı sorgu sayısı histogramının üst sınırları
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class SheetTrace:
+    """
+    Tek bir formun işlenmesine ait yapılandırılmış iz: aşama başına duvar saati ve CPU süresi,
+    OCR çağrıları, veritabanı sorgu sayısı, hizalama ölçeği ve görüntü boyutları.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.ocr_cache_hits = 0
+        self.ocr_call_seconds: List[float] = []
+        self.db_queries = 0
+        self.alignment_scale: Optional[float] = None
+        self.image_size: Optional[Tuple[int, int]] = None
+        self.aligned_size: Optional[Tuple[int, int]] = None
+        self._started = time.perf_counter()
+        self._started_cpu = time.thread_time()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Bloğun süresini verilen aşama adına ekler. Aynı aşama birden fazla kez ölçülürse süreler toplanır.
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            stage['wall_seconds'] += time.perf_counter() - wall_start
+            stage['cpu_seconds'] += time.thread_time() - cpu_start
+
+    def record_ocr(self, seconds: float):
+        self.ocr_call_seconds.append(seconds)
+
+    def count_query(self, execute, sql, params, many, context):
+        """
+        connection.execute_wrapper ile kullanılan sorgu sayacı.
+        """
+        self.db_queries += 1
+        return execute(sql, params, many, context)
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._started
+        self.cpu_seconds = time.thread_time() - self._started_cpu
+
+    def as_dict(self) -> Dict:
+        return {
+            'wall_ms': round(self.wall_seconds * 1000, 2),
+            'cpu_ms': round(self.cpu_seconds * 1000, 2),
+            'stages': {
+                name: {
+                    'wall_ms': round(stage['wall_seconds'] * 1000, 2),
+                    'cpu_ms': round(stage['cpu_seconds'] * 1000, 2)
+                }
+                for name, stage in self.stages.items()
+            },
+            'ocr': {
+                'calls': len(self.ocr_call_seconds),
+                'cache_hits': self.ocr_cache_hits,
+                'call_ms': [round(seconds * 1000, 2) for seconds in self.ocr_call_seconds]
+            },
+            'db_queries': self.db_queries,
+            'alignment_scale': self.alignment_scale,
+            'image_size': list(self.image_size) if self.image_size else None,
+            'aligned_size': list(self.aligned_size) if self.aligned_size else None,
+        }
+
+
+_current_trace: ContextVar[Optional[SheetTrace]] = ContextVar('current_trace', default=None)
+
+
+def current_trace() -> Optional[SheetTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def tracing(trace: SheetTrace) -> Iterator[SheetTrace]:
+    """
+    İzi, alt fonksiyonların (OCR, veritabanı) erişebilmesi için geçerli iz olarak işaretler.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+
+
+class Histogram:
+    """
+    Prometheus biçiminde birikimli kovalara sahip basit histogram.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str = '') -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f'{name}_bucket{{{_join_labels(labels, le)}}} {cumulative}')
+        le = 'le="+Inf"'
+        lines.append(f'{name}_bucket{{{_join_labels(labels, le)}}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.total}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+def _join_labels(*labels: str) -> str:
+    return ','.join(label for label in labels if label)
+
+
+class MetricsRegistry:
+    """
+    Süreç içindeki form izlerini toplar ve Prometheus metin biçiminde sunar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sheets: Dict[str, int] = {}
+            self.sheet_seconds = Histogram(DURATION_BUCKETS)
+            self.stage_seconds: Dict[str, Histogram] = {}
+            self.stage_cpu_seconds: Dict[str, float] = {}
+            self.ocr_seconds = Histogram(DURATION_BUCKETS)
+            self.ocr_cache_hits = 0
+            self.db_queries = Histogram(QUERY_BUCKETS)
+            self.alignment_scales: Dict[str, int] = {}
+
+    def count_sheet(self, status: str):
+        """
+        İzi olmayan (ör. işçi süreci çöken) formları yalnızca sayaçta sayar.
+        """
+        with self._lock:
+            self.sheets[status] = self.sheets.get(status, 0) + 1
+
+    def observe(self, trace: Dict, status: str = 'ok'):
+        """
+        SheetTrace.as_dict() çıktısını (işçi süreçlerden gelenler dahil) toplam metriklere ekler.
+        """
+        with self._lock:
+            self.sheets[status] = self.sheets.get(status, 0) + 1
+            self.sheet_seconds.observe(trace['wall_ms'] / 1000)
+            for name, stage in trace['stages'].items():
+                self.stage_seconds.setdefault(name, Histogram(DURATION_BUCKETS)).observe(stage['wall_ms'] / 1000)
+                self.stage_cpu_seconds[name] = self.stage_cpu_seconds.get(name, 0.0) + stage['cpu_ms'] / 1000
+            for call_ms in trace['ocr']['call_ms']:
+                self.ocr_seconds.observe(call_ms / 1000)
+            self.ocr_cache_hits += trace['ocr']['cache_hits']
+            self.db_queries.observe(trace['db_queries'])
+            if trace['alignment_scale'] is not None:
+                scale = f"{trace['alignment_scale']:.3f}"
+                self.alignment_scales[scale] = self.alignment_scales.get(scale, 0) + 1
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                '# HELP omr_sheets_total İşlenen form sayısı.',
+                '# TYPE omr_sheets_total counter',
+            ]
+            lines += [f'omr_sheets_total{{status="{status}"}} {count}' for status, count in sorted(self.sheets.items())]
+            lines += [
+                '# HELP omr_sheet_seconds Form başına toplam işlem süresi.',
+                '# TYPE omr_sheet_seconds histogram',
+            ]
+            lines += self.sheet_seconds.lines('omr_sheet_seconds')
+            lines += [
+                '# HELP omr_stage_seconds Aşama başına duvar saati süresi.',
+                '# TYPE omr_stage_seconds histogram',
+            ]
+            for name, histogram in sorted(self.stage_seconds.items()):
+                lines += histogram.lines('omr_stage_seconds', f'stage="{name}"')
+            lines += [
+                '# HELP omr_stage_cpu_seconds_total Aşama başına toplam CPU süresi.',
+                '# TYPE omr_stage_cpu_seconds_total counter',
+            ]
+            lines += [
+                f'omr_stage_cpu_seconds_total{{stage="{name}"}} {seconds}'
+                for name, seconds in sorted(self.stage_cpu_seconds.items())
+            ]
+            lines += [
+                '# HELP omr_ocr_call_seconds OCR servis çağrısı süresi.',
+                '# TYPE omr_ocr_call_seconds histogram',
+            ]
+            lines += self.ocr_seconds.lines('omr_ocr_call_seconds')
+            lines += [
+                '# HELP omr_ocr_cache_hits_total Önbellekten karşılanan OCR istekleri.',
+                '# TYPE omr_ocr_cache_hits_total counter',
+                f'omr_ocr_cache_hits_total {self.ocr_cache_hits}',
+                '# HELP omr_sheet_db_queries Form başına veritabanı sorgu sayısı.',
+                '# TYPE omr_sheet_db_queries histogram',
+            ]
+            lines += self.db_queries.lines('omr_sheet_db_queries')
+            lines += [
+                '# HELP omr_alignment_scale_total Hizalamada kullanılan ölçeklerin dağılımı.',
+                '# TYPE omr_alignment_scale_total counter',
+            ]
+            lines += [
+                f'omr_alignment_scale_total{{scale="{scale}"}} {count}'
+                for scale, count in sorted(self.alignment_scales.items())
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Web sürecinden ayrı çalışan işçiler (ör. run_scan_worker) için metrikleri
+    '/metrics' adresinde sunan küçük HTTP sunucusu.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 0, registry: MetricsRegistry = METRICS):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrik sunucusu: {format % args}")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> 'MetricsServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Metrikler sunuluyor: {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,7 +1,76 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set, Tuple
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import transaction
-from django.db.models import Count, Q
+
+
+class PendingScoring:
+    """
+    Ertelenmiş puanlama modunda biriken işler: sonuçları yeniden hesaplanacak öğrenciler ve
+    değişen cevap anahtarı girdileri (test_group_id, course_id, question_id).
+    """
+
+    def __init__(self):
+        self.students: Set[int] = set()
+        self.answer_keys: Set[Tuple[int, int, int]] = set()
+
+
+_pending_scoring: ContextVar[Optional[PendingScoring]] = ContextVar('pending_scoring', default=None)
+
+
+@contextmanager
+def deferred_scoring() -> Iterator[PendingScoring]:
+    """
+    Blok içinde kaydedilen StudentAnswer ve AnswerKey'ler için puanlamayı erteler; bloktan
+    çıkılırken değişen anahtarlar tek seferde uygulanır ve her öğrencinin sonucu yalnızca bir
+    kez hesaplanır. İç içe kullanımda hesaplama en dıştaki blokta yapılır. Blok hata ile
+    biterse hesaplama yapılmaz.
+    """
+    pending = _pending_scoring.get()
+    if pending is not None:
+        yield pending
+        return
+
+    pending = PendingScoring()
+    token = _pending_scoring.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending_scoring.reset(token)
+
+    from .grading import apply_answer_key_changes, grade_students
+    if pending.answer_keys:
+        apply_answer_key_changes(pending.answer_keys)
+    # Öğrenciler tek tek değil, küme tabanlı sorgularla ve bulk_update ile puanlanır
+    if pending.students:
+        grade_students(pending.students)
+
+
+def schedule_results(student: 'Student'):
+    """
+    Öğrencinin sonuçlarını günceller; ertelenmiş puanlama modundaysa yalnızca sıraya ekler.
+    """
+    pending = _pending_scoring.get()
+    if pending is not None:
+        pending.students.add(student.pk)
+    else:
+        student.calculate_results()
+
+
+def schedule_answer_key_changes(*keys: Tuple[int, int, int]):
+    """
+    Değişen cevap anahtarı girdilerinden etkilenen cevapları yeniden puanlar; ertelenmiş
+    puanlama modundaysa yalnızca sıraya ekler.
+    """
+    pending = _pending_scoring.get()
+    if pending is not None:
+        pending.answer_keys.update(keys)
+    else:
+        from .grading import apply_answer_key_changes
+        apply_answer_key_changes(keys)
+
 
 class Course(models.Model):
     name = models.CharField(max_length=100, unique=True, null=False)
@@ -26,6 +95,12 @@ class ColumnMapping(models.Model):
     column_number = models.PositiveIntegerField(null=False, validators=[MinValueValidator(1), MaxValueValidator(100)])
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='course_columns')
 
+    class Meta:
+        indexes = [
+            # Form kaydında bir test grubunun sütun eşleşmelerini okumak için
+            models.Index(fields=['test_group', 'column_number'], name='omr_colmap_group_column_idx'),
+        ]
+
     def __str__(self):
         return f"Group:{self.test_group.name} Column:{self.column_number} Course:{self.course.name}"
 
@@ -43,6 +118,30 @@ class AnswerKey(models.Model):
     class Meta:
         unique_together = ('test_group', 'course', 'question_id')
 
+    @property
+    def grading_key(self) -> Tuple[int, int, int]:
+        return (self.test_group_id, self.course_id, self.question_id)
+
+    def save(self, *args, **kwargs):
+        previous = None
+        if self.pk is not None:
+            previous = AnswerKey.objects.filter(pk=self.pk).values_list(
+                'test_group_id', 'course_id', 'question_id', 'correct_answer'
+            ).first()
+        super().save(*args, **kwargs)
+
+        # Yalnızca anahtar gerçekten değiştiyse etkilenen cevaplar yeniden puanlanır
+        if previous is None:
+            schedule_answer_key_changes(self.grading_key)
+        elif previous != (*self.grading_key, self.correct_answer):
+            schedule_answer_key_changes(previous[:3], self.grading_key)
+
+    def delete(self, *args, **kwargs):
+        grading_key = self.grading_key
+        result = super().delete(*args, **kwargs)
+        schedule_answer_key_changes(grading_key)
+        return result
+
     def __str__(self):
         return f"Group:{self.test_group.name} Course:{self.course.name} Q:{self.question_id} A:{self.correct_answer}"
 
@@ -50,49 +149,49 @@ class AnswerKey(models.Model):
 class Student(models.Model):
     student_number = models.CharField(max_length=20, unique=True, null=False)
     results = models.JSONField(default=dict)  
+    # 'results' alanından türetilen, sıralama ve filtreleme için SQL'de tutulan özetler
+    total_correct = models.PositiveIntegerField(default=0, editable=False)
+    total_incorrect = models.PositiveIntegerField(default=0, editable=False)
+    overall_score = models.FloatField(default=0, editable=False)
+
+    # Sonuçlar değiştiğinde birlikte yazılması gereken alanlar
+    RESULT_FIELDS = ['results', 'total_correct', 'total_incorrect', 'overall_score']
+
+    class Meta:
+        indexes = [
+            # Sıralama listeleri ve puana göre filtreleme
+            models.Index(fields=['-overall_score', 'student_number'], name='omr_student_score_idx'),
+            models.Index(fields=['-total_correct', 'student_number'], name='omr_student_correct_idx'),
+        ]
 
     def __str__(self):
         return self.student_number
 
-    @transaction.atomic
+    def set_results(self, results: Dict):
+        """
+        Sonuçları ve türetilmiş özet alanlarını birlikte günceller (kaydetmez).
+        """
+        from .grading import summarize_results
+
+        self.results = results
+        self.total_correct, self.total_incorrect, self.overall_score = summarize_results(results)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'results' in update_fields:
+            self.set_results(self.results or {})
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.RESULT_FIELDS)
+        super().save(*args, **kwargs)
+
     def calculate_results(self):
         """
         Öğrencinin sonuçlarını hesaplar ve günceller.
         """
-        results = {}
-        courses = Course.objects.prefetch_related('course_columns__test_group')
-
-        for course in courses:
-            course_results = {}
-
-            test_groups = TestGroup.objects.filter(test_group_columns__course=course).distinct()
-            total_questions = sum(group.total_questions for group in test_groups)
-            if total_questions == 0:
-                continue
-
-            answers_agg = StudentAnswer.objects.filter(
-                student=self,
-                course=course
-            ).aggregate(
-                correct=Count('id', filter=Q(is_correct=True)),
-                incorrect=Count('id', filter=Q(is_correct=False))
-            )
-
-            correct_answers = answers_agg['correct']
-            incorrect_answers = answers_agg['incorrect']
-
-            if correct_answers > 0 or incorrect_answers > 0:
-                course_results['overall'] = {
-                    'score': round((correct_answers / total_questions) * 100, 2),
-                    'correct': correct_answers,
-                    'incorrect': incorrect_answers
-                }
-
-            if course_results:
-                results[course.code] = course_results
+        from .grading import compute_student_results
 
-        self.results = results
-        self.save()
+        self.results = compute_student_results([self.pk])[self.pk]
+        self.save(update_fields=['results'])
 
 
 class StudentAnswer(models.Model):
@@ -111,6 +210,12 @@ class StudentAnswer(models.Model):
 
     class Meta:
         unique_together = ('student', 'test_group', 'course', 'question_id')
+        indexes = [
+            # Puanlama: (öğrenci, ders) başına doğru/yanlış sayımı tablo okumadan indeksten yapılır
+            models.Index(fields=['student', 'course', 'is_correct'], name='omr_answer_student_course_idx'),
+            # Cevap anahtarı değişikliğinde etkilenen cevapların bulunması
+            models.Index(fields=['test_group', 'course', 'question_id'], name='omr_answer_key_lookup_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         answer_key = AnswerKey.objects.filter(
@@ -123,7 +228,68 @@ class StudentAnswer(models.Model):
         super().save(*args, **kwargs)
 
         if answer_key:
-            self.student.calculate_results()
+            schedule_results(self.student)
 
     def __str__(self):
         return f"Student:{self.student.student_number} Course:{self.course.name} Q:{self.question_id} A:{self.selected_answer} Correct:{self.is_correct}"
+
+
+class ScanBatch(models.Model):
+    """
+    Toplu yüklemede ('/process-batch/') birlikte kuyruğa alınan tarama işleri. İşlerin durumu
+    ve sonuçları '/batch/<id>/' adresinden tek bir rapor olarak alınır.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"ScanBatch:{self.pk}"
+
+
+class ScanJob(models.Model):
+    """
+    Kuyruğa alınmış form tarama işi. Yüklenen görüntü diske kaydedilir ve
+    'run_scan_worker' komutuyla çalışan işçi süreçler tarafından işlenir.
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Bekliyor'),
+        (PROCESSING, 'İşleniyor'),
+        (DONE, 'Tamamlandı'),
+        (FAILED, 'Başarısız'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    batch = models.ForeignKey(ScanBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    image = models.FileField(upload_to='scan_jobs/', null=True, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # İşçilerin sıradaki bekleyen işi bulması için
+            models.Index(fields=['status', 'created_at'], name='omr_scanjob_status_idx'),
+        ]
+
+    @property
+    def queue_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.created_at).total_seconds(), 3)
+
+    @property
+    def processing_seconds(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at).total_seconds(), 3)
+
+    def __str__(self):
+        return f"ScanJob:{self.pk} {self.original_name} ({self.status})"
@@ -0,0 +1,322 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OCR_SPACE_URL = 'https://apipro1.ocr.space/parse/image'
+
+
+def empty_ocr_result(error: Optional[str] = None) -> Dict:
+    """
+    Boş OCR sonucu döner. Hata mesajı verilirse sonuç önbelleğe alınmaması için işaretlenir.
+    """
+    result = {"full_text": "", "detailed_texts": []}
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def line_bounding_box(words: List[Dict]) -> List[Tuple[int, int]]:
+    """
+    Kelime kutularından (Left, Top, Width, Height) satırın köşe noktalarını üretir.
+    """
+    bounding_box = []
+    for word in words:
+        bounding_box.append((word['Left'], word['Top']))
+        bounding_box.append((word['Left'] + word['Width'], word['Top'] + word['Height']))
+    return sorted(list(set(bounding_box)), key=lambda x: (x[1], x[0]))
+
+
+def parse_ocr_space_response(result: Dict) -> Dict:
+    """
+    OCR.space API yanıtını ortak OCR sonuç biçimine dönüştürür.
+    """
+    if result.get('IsErroredOnProcessing'):
+        error_message = result.get('ErrorMessage', ['Unknown error'])[0]
+        raise Exception(f"OCR.space API Hatası: {error_message}")
+
+    parsed_results = result.get('ParsedResults', [])
+    if not parsed_results:
+        return empty_ocr_result()
+
+    parsed_text = parsed_results[0].get('ParsedText', "")
+    text_overlay = parsed_results[0].get('TextOverlay', {})
+    lines = text_overlay.get('Lines', [])
+    detailed_texts = []
+
+    for line in lines:
+        line_text = line.get('LineText', '').strip()
+        word_details = [
+            {
+                "WordText": word.get('WordText', '').strip(),
+                "Left": word.get('Left', 0),
+                "Top": word.get('Top', 0),
+                "Height": word.get('Height', 0),
+                "Width": word.get('Width', 0)
+            }
+            for word in line.get('Words', [])
+        ]
+        if word_details:
+            detailed_texts.append({
+                "description": line_text,
+                "bounding_box": line_bounding_box(word_details)
+            })
+
+    return {
+        "full_text": parsed_text,
+        "detailed_texts": detailed_texts
+    }
+
+
+class OCRBackend:
+    """
+    OCR arka uçları için temel sınıf. recognize() ortak biçimde sonuç döner:
+    {"full_text": str, "detailed_texts": [{"description": str, "bounding_box": [(x, y), ...]}]}
+    """
+    name = 'base'
+
+    def recognize(self, image: np.ndarray, config: Dict) -> Dict:
+        raise NotImplementedError
+
+
+class OCRSpaceBackend(OCRBackend):
+    """
+    OCR.space uyumlu HTTP arka ucu. Süreç genelinde paylaşılan bir requests.Session
+    (keep-alive bağlantı havuzu), zaman aşımı, üstel bekleme ile yeniden deneme ve
+    eşzamanlı istek sınırı kullanır.
+    """
+    name = 'ocr_space'
+
+    def __init__(
+        self,
+        url: str = OCR_SPACE_URL,
+        api_key: Optional[str] = None,
+        timeout: float = 15,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_concurrency: int = 4,
+        pool_size: int = 8
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def recognize(self, image: np.ndarray, config: Dict) -> Dict:
+        if not self.api_key:
+            raise ValueError("OCR_SPACE_API_KEY ayarı tanımlanmamış.")
+
+        _, img_encoded = cv2.imencode('.jpg', image)
+        files = {'file': ('image.jpg', img_encoded.tobytes(), 'image/jpeg')}
+        payload = {
+            'isOverlayRequired': True,
+            'apikey': self.api_key,
+            'language': config['ocr']['language'],
+            'detectOrientation': config['ocr']['detect_orientation']
+        }
+
+        with self.semaphore:
+            response = self.session.post(self.url, files=files, data=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_ocr_space_response(response.json())
+
+
+class TesseractBackend(OCRBackend):
+    """
+    pytesseract ile yerel Tesseract arka ucu (varsayılan dil: 'tur'). Ağ gerektirmez.
+    """
+    name = 'tesseract'
+
+    def __init__(self, command: Optional[str] = None):
+        try:
+            import pytesseract
+        except ImportError as e:
+            raise ImportError("Tesseract arka ucu için 'pytesseract' paketi gerekli.") from e
+        if command:
+            pytesseract.pytesseract.tesseract_cmd = command
+        self.pytesseract = pytesseract
+
+    def recognize(self, image: np.ndarray, config: Dict) -> Dict:
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        data = self.pytesseract.image_to_data(
+            image,
+            lang=config['ocr']['language'],
+            output_type=self.pytesseract.Output.DICT
+        )
+
+        lines = {}
+        for i, word_text in enumerate(data['text']):
+            word_text = word_text.strip()
+            if not word_text:
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append({
+                "WordText": word_text,
+                "Left": data['left'][i],
+                "Top": data['top'][i],
+                "Height": data['height'][i],
+                "Width": data['width'][i]
+            })
+
+        detailed_texts = [
+            {
+                "description": ' '.join(word['WordText'] for word in words),
+                "bounding_box": line_bounding_box(words)
+            }
+            for _, words in sorted(lines.items())
+        ]
+        return {
+            "full_text": '\n'.join(text['description'] for text in detailed_texts),
+            "detailed_texts": detailed_texts
+        }
+
+
+class LocalOCRServer:
+    """
+    Testler ve çevrimdışı geliştirme için OCR.space protokolünü taklit eden yerel HTTP sunucusu.
+    Verilen satırları (metin, (x, y, genişlik, yükseklik)) her istekte aynen döner.
+    """
+
+    def __init__(self, lines: List[Tuple[str, Tuple[int, int, int, int]]], host: str = '127.0.0.1', port: int = 0):
+        self.lines = lines
+        self.request_count = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                server.request_count += 1
+                body = json.dumps(server.response()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Yerel OCR sunucusu: {format % args}")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/parse/image"
+
+    def response(self) -> Dict:
+        lines = [
+            {
+                "LineText": text,
+                "Words": [{"WordText": text, "Left": x, "Top": y, "Width": w, "Height": h}]
+            }
+            for text, (x, y, w, h) in self.lines
+        ]
+        return {
+            "IsErroredOnProcessing": False,
+            "ParsedResults": [{
+                "ParsedText": '\n'.join(text for text, _ in self.lines),
+                "TextOverlay": {"Lines": lines}
+            }]
+        }
+
+    def start(self) -> 'LocalOCRServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'LocalOCRServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+# Arka uçlar (ve HTTP oturumları) süreç başına bir kez oluşturulur
+_BACKENDS: Dict[Tuple, OCRBackend] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def create_ocr_backend(config: Dict) -> OCRBackend:
+    """
+    Konfigürasyondaki 'ocr.backend' değerine göre OCR arka ucunu oluşturur.
+    """
+    ocr_config = config['ocr']
+    backend_name = ocr_config.get('backend', 'ocr_space')
+    backend_config = ocr_config.get(backend_name) or {}
+
+    if backend_name == 'tesseract':
+        return TesseractBackend(command=backend_config.get('command'))
+    if backend_name in ('ocr_space', 'local_http'):
+        default_url = OCR_SPACE_URL if backend_name == 'ocr_space' else None
+        url = backend_config.get('url', default_url)
+        if not url:
+            raise ValueError(f"'{backend_name}' OCR arka ucu için 'url' tanımlanmamış.")
+        api_key = getattr(settings, 'OCR_SPACE_API_KEY', None) if backend_name == 'ocr_space' else 'local'
+        return OCRSpaceBackend(
+            url=url,
+            api_key=api_key,
+            timeout=backend_config.get('timeout', 15),
+            max_retries=backend_config.get('max_retries', 3),
+            backoff_factor=backend_config.get('backoff_factor', 0.5),
+            max_concurrency=backend_config.get('max_concurrency', 4),
+            pool_size=backend_config.get('pool_size', 8)
+        )
+    raise ValueError(f"Bilinmeyen OCR arka ucu: {backend_name}")
+
+
+def get_ocr_backend(config: Dict) -> OCRBackend:
+    """
+    Konfigürasyona karşılık gelen OCR arka ucunu döner; aynı ayarlar için tek örnek paylaşılır.
+    """
+    ocr_config = config['ocr']
+    backend_name = ocr_config.get('backend', 'ocr_space')
+    backend_key = (backend_name, repr(sorted((ocr_config.get(backend_name) or {}).items())))
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(backend_key)
+        if backend is None:
+            backend = create_ocr_backend(config)
+            _BACKENDS[backend_key] = backend
+            logger.debug(f"OCR arka ucu oluşturuldu: {backend_name}")
+        return backend
+
+
+def perform_ocr(image: np.ndarray, config: Dict) -> Dict:
+    """
+    Seçili OCR arka ucuyla görüntüden metin çıkarır. Hata durumunda boş ve
+    'error' anahtarıyla işaretlenmiş sonuç döner.
+    """
+    try:
+        result = get_ocr_backend(config).recognize(image, config)
+        logger.debug("OCR işlemi başarılı.")
+        return result
+    except Exception as e:
+        logger.error(f"OCR işlemi sırasında hata: {e}")
+        return empty_ocr_result(str(e))
@@ -1,14 +1,22 @@
 import os
 import re
+import hashlib
 import logging
-from typing import Tuple, List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple, List, Dict, Optional, NamedTuple, Union
 
 import cv2
 import numpy as np
-import requests
 import yaml
 from rapidfuzz import fuzz
 from django.conf import settings
+from django.db import connection
+
+from .artifacts import artifacts_enabled, collecting_artifacts, commit_artifacts, save_artifact
+from .metrics import METRICS, SheetTrace, current_trace, tracing
+from .ocr import perform_ocr
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +28,15 @@ TURKISH_LETTERS = [
 ]
 
 
+class TemplateFeatures(NamedTuple):
+    """
+    Şablon görüntü ve önceden hesaplanmış ORB anahtar noktaları/tanımlayıcıları.
+    """
+    image: np.ndarray
+    keypoints: Tuple
+    descriptors: Optional[np.ndarray]
+
+
 def load_config(config_path: str) -> Dict:
     """
     YAML formatındaki konfigürasyon dosyasını yükler.
@@ -207,88 +224,59 @@ def preprocess_image(image: np.ndarray, config: Dict) -> Tuple[Optional[np.ndarr
     )
 
     logger.debug("Ön işleme adımları tamamlandı.")
-    if config['output']['save_debug_images']:
-        debug_dir = os.path.join(config['output']['debug_images_directory'])
-        os.makedirs(debug_dir, exist_ok=True)
-        cv2.imwrite(os.path.join(debug_dir, 'thresholded_image.jpg'), adaptive_thresh)
+    save_artifact(config, 'debug', 'thresholded_image', adaptive_thresh)
 
     return deskewed, adaptive_thresh
 
 
-def perform_ocr_space(image: np.ndarray, config: Dict) -> Dict:
-    """
-    OCR.space API kullanarak görüntüden metin çıkarır ve tüm çıktıları loglar.
-    """
-    try:
-        api_key = getattr(settings, 'OCR_SPACE_API_KEY', None)
-        if not api_key:
-            raise ValueError("OCR_SPACE_API_KEY ayarı tanımlanmamış.")
-
-        language = config['ocr']['language']
-        detect_orientation = config['ocr']['detect_orientation']
-        url = 'https://apipro1.ocr.space/parse/image'
-
-        _, img_encoded = cv2.imencode('.jpg', image)
-        files = {'file': ('image.jpg', img_encoded.tobytes(), 'image/jpeg')}
-        payload = {
-            'isOverlayRequired': True,
-            'apikey': api_key,
-            'language': language,
-            'detectOrientation': detect_orientation
-        }
+# İçerik özeti (hash) ile anahtarlanmış, boyutu sınırlı OCR sonuç önbelleği (LRU)
+_OCR_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+_OCR_CACHE_LOCK = threading.Lock()
 
-        response = requests.post(url, files=files, data=payload)
-        result = response.json()
 
-        if result.get('IsErroredOnProcessing'):
-            error_message = result.get('ErrorMessage', ['Unknown error'])[0]
-            raise Exception(f"OCR.space API Hatası: {error_message}")
-
-        parsed_results = result.get('ParsedResults', [])
-        if not parsed_results:
-            return {"full_text": "", "detailed_texts": []}
+def _ocr_cache_key(image: np.ndarray, config: Dict) -> str:
+    """
+    Görüntü içeriği ve OCR ayarlarından önbellek anahtarı üretir.
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(image).data)
+    digest.update(repr((
+        image.shape,
+        config['ocr'].get('backend', 'ocr_space'),
+        config['ocr']['language'],
+        config['ocr']['detect_orientation']
+    )).encode('utf-8'))
+    return digest.hexdigest()
 
-        parsed_text = parsed_results[0].get('ParsedText', "")
-        text_overlay = parsed_results[0].get('TextOverlay', {})
-        lines = text_overlay.get('Lines', [])
-        detailed_texts = []
 
-        for line in lines:
-            line_text = line.get('LineText', '').strip()
-            words = line.get('Words', [])
-            word_details = []
-            for word in words:
-                word_text = word.get('WordText', '').strip()
-                left = word.get('Left', 0)
-                top = word.get('Top', 0)
-                height = word.get('Height', 0)
-                width = word.get('Width', 0)
-                word_details.append({
-                    "WordText": word_text,
-                    "Left": left,
-                    "Top": top,
-                    "Height": height,
-                    "Width": width
-                })
-            if word_details:
-                bounding_box = []
-                for wd in word_details:
-                    bounding_box.append((wd['Left'], wd['Top']))
-                    bounding_box.append((wd['Left'] + wd['Width'], wd['Top'] + wd['Height']))
-                bounding_box = sorted(list(set(bounding_box)), key=lambda x: (x[1], x[0]))
-                detailed_texts.append({
-                    "description": line_text,
-                    "bounding_box": bounding_box
-                })
-
-        logger.debug("OCR işlemi başarılı.")
-        return {
-            "full_text": parsed_text,
-            "detailed_texts": detailed_texts
-        }
-    except Exception as e:
-        logger.error(f"OCR işlemi sırasında hata: {e}")
-        return {"full_text": "", "detailed_texts": []}
+def get_ocr_result(image: np.ndarray, config: Dict) -> Dict:
+    """
+    Görüntünün OCR sonucunu döner. Aynı içerikli görüntüler için OCR servisi tekrar çağrılmaz;
+    sonuçlar 'ocr.cache_size' ile sınırlı bir LRU önbellekte tutulur. Hatalı sonuçlar önbelleğe alınmaz.
+    """
+    cache_size = config['ocr'].get('cache_size', 128)
+    cache_key = _ocr_cache_key(image, config)
+    trace = current_trace()
+    with _OCR_CACHE_LOCK:
+        if cache_key in _OCR_CACHE:
+            _OCR_CACHE.move_to_end(cache_key)
+            logger.debug("OCR sonucu önbellekten alındı.")
+            if trace is not None:
+                trace.ocr_cache_hits += 1
+            return _OCR_CACHE[cache_key]
+
+    start = time.perf_counter()
+    ocr_result = perform_ocr(image, config)
+    if trace is not None:
+        trace.record_ocr(time.perf_counter() - start)
+    if 'error' in ocr_result or cache_size <= 0:
+        return ocr_result
+
+    with _OCR_CACHE_LOCK:
+        _OCR_CACHE[cache_key] = ocr_result
+        _OCR_CACHE.move_to_end(cache_key)
+        while len(_OCR_CACHE) > cache_size:
+            _OCR_CACHE.popitem(last=False)
+    return ocr_result
 
 
 def normalize_text(text: str) -> str:
@@ -302,21 +290,52 @@ def normalize_text(text: str) -> str:
     return text
 
 
+def roi_from_heading(
+    heading_coords: List[List[int]],
+    area_config: Dict,
+    image_shape: Tuple[int, ...]
+) -> List[List[int]]:
+    """
+    Başlık kutusunun sol üst köşesine göre alanın (ROI) koordinatlarını hesaplar.
+    """
+    (x_start, y_start), (x_end, y_end) = heading_coords
+    extra_width = area_config.get('extra_width', 0)
+    extra_height = area_config.get('extra_height', 0)
+    offset_x = area_config.get('offset_x', 0)
+    offset_y = area_config.get('offset_y', 0)
+    width = area_config.get('width', x_end - x_start)
+    height = area_config.get('height', y_end - y_start)
+    x_start = x_start + offset_x
+    x_end = x_start + width + extra_width
+    y_start = y_start + offset_y
+    y_end = y_start + height + extra_height
+    x_start = int(round(max(0, x_start)))
+    x_end = int(round(min(image_shape[1], x_end)))
+    y_start = int(round(max(0, y_start)))
+    y_end = int(round(min(image_shape[0], y_end)))
+    logger.debug(f"ROI Koordinatları: [{x_start}, {y_start}], [{x_end}, {y_end}]")
+    return [[x_start, y_start], [x_end, y_end]]
+
+
 def find_heading_coordinates(
     image: np.ndarray,
     heading_texts: List[str],
     config: Dict,
-    area_config: Dict
+    area_config: Dict,
+    ocr_result: Optional[Dict] = None
 ) -> Optional[List[List[int]]]:
     """
     Belirli bir başlık metninin koordinatlarını bulur. Birden fazla başlık metni destekler.
+    ocr_result verilmezse görüntü bir kez OCR'dan geçirilir ve tüm başlıklar için kullanılır.
     """
+    if ocr_result is None:
+        ocr_result = get_ocr_result(image, config)
+    texts = ocr_result.get('detailed_texts', [])
+
     for heading_text in heading_texts:
         heading_text_normalized = normalize_text(heading_text)
         min_text_length = area_config.get('min_text_length', 3)
         max_text_length = area_config.get('max_text_length', 100)
-        ocr_result = perform_ocr_space(image, config)
-        texts = ocr_result.get('detailed_texts', [])
         highest_similarity = 0
         best_match_coords = None
         best_match_text = ''
@@ -344,22 +363,7 @@ def find_heading_coordinates(
                 logger.debug(f"Metin benzerliği: '{text}' (%{similarity})")
 
             if similarity >= config['ocr']['similarity_threshold']:
-                extra_width = area_config.get('extra_width', 0)
-                extra_height = area_config.get('extra_height', 0)
-                offset_x = area_config.get('offset_x', 0)
-                offset_y = area_config.get('offset_y', 0)
-                width = area_config.get('width', x_end - x_start)
-                height = area_config.get('height', y_end - y_start)
-                x_start = x_start + offset_x
-                x_end = x_start + width + extra_width
-                y_start = y_start + offset_y
-                y_end = y_start + height + extra_height
-                x_start = int(round(max(0, x_start)))
-                x_end = int(round(min(image.shape[1], x_end)))
-                y_start = int(round(max(0, y_start)))
-                y_end = int(round(min(image.shape[0], y_end)))
-                logger.debug(f"ROI Koordinatları: [{x_start}, {y_start}], [{x_end}, {y_end}]")
-                return [[x_start, y_start], [x_end, y_end]]
+                return roi_from_heading(best_match_coords, area_config, image.shape)
 
         if best_match_coords is not None:
             logger.warning(
@@ -371,6 +375,70 @@ def find_heading_coordinates(
     return None
 
 
+def refine_heading_box(
+    image: np.ndarray,
+    template: np.ndarray,
+    heading_box: List[int],
+    config: Dict
+) -> List[List[int]]:
+    """
+    Şablondaki başlık görüntüsünü hizalanmış görüntüde küçük bir arama penceresinde
+    eşleştirerek (template matching) başlık kutusunun konumunu düzeltir.
+    Eşleşme skoru eşiğin altındaysa şablon koordinatları olduğu gibi kullanılır.
+    """
+    x, y, w, h = heading_box
+    template_coords = [[x, y], [x + w, y + h]]
+    margin = config['dynamic_roi'].get('search_margin', 20)
+    min_score = config['dynamic_roi'].get('match_threshold', 0.6)
+
+    heading_patch = template[y:y + h, x:x + w]
+    search_x_start, search_y_start = max(0, x - margin), max(0, y - margin)
+    search_area = image[search_y_start:y + h + margin, search_x_start:x + w + margin]
+    if heading_patch.size == 0 or search_area.shape[0] < h or search_area.shape[1] < w:
+        return template_coords
+    if len(search_area.shape) == 3:
+        search_area = cv2.cvtColor(search_area, cv2.COLOR_BGR2GRAY)
+
+    scores = cv2.matchTemplate(search_area, heading_patch, cv2.TM_CCOEFF_NORMED)
+    _, max_score, _, max_location = cv2.minMaxLoc(scores)
+    if max_score < min_score:
+        logger.debug(f"Başlık eşleşmesi zayıf (skor={max_score:.2f}); şablon koordinatları kullanılıyor.")
+        return template_coords
+
+    refined_x = search_x_start + max_location[0]
+    refined_y = search_y_start + max_location[1]
+    logger.debug(f"Başlık konumu düzeltildi: ({x}, {y}) -> ({refined_x}, {refined_y}), skor={max_score:.2f}")
+    return [[refined_x, refined_y], [refined_x + w, refined_y + h]]
+
+
+def locate_roi(
+    image: np.ndarray,
+    template: TemplateFeatures,
+    heading_texts: List[str],
+    config: Dict,
+    area_config: Dict,
+    ocr_result: Optional[Dict] = None
+) -> Optional[List[List[int]]]:
+    """
+    Alanın (ROI) koordinatlarını bulur.
+    Görüntü şablona hizalandığı için varsayılan olarak şablon uzayındaki başlık kutusu
+    kullanılır (ağ çağrısı yok). OCR yalnızca 'locator: ocr' seçildiğinde veya alan için
+    başlık kutusu tanımlanmadığında devreye girer.
+    """
+    heading_box = area_config.get('heading_box')
+    if config['dynamic_roi'].get('locator', 'template') == 'template' and heading_box:
+        if config['dynamic_roi'].get('refine_with_template_matching', True):
+            heading_coords = refine_heading_box(image, template.image, heading_box, config)
+        else:
+            x, y, w, h = heading_box
+            heading_coords = [[x, y], [x + w, y + h]]
+        return roi_from_heading(heading_coords, area_config, image.shape)
+
+    if heading_box is None:
+        logger.warning(f"'{heading_texts[0]}' için başlık kutusu tanımlı değil; OCR kullanılıyor.")
+    return find_heading_coordinates(image, heading_texts, config, area_config, ocr_result)
+
+
 def extract_roi(
     thresh: np.ndarray,
     coordinates: List[List[int]],
@@ -396,12 +464,7 @@ def extract_roi(
         if len(roi.shape) == 3:
             roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
 
-        if config['output']['save_rois']:
-            rois_dir = os.path.join(settings.BASE_DIR, config['output']['rois_directory'])
-            os.makedirs(rois_dir, exist_ok=True)
-            roi_path = os.path.join(rois_dir, f"{name}.jpg")
-            cv2.imwrite(roi_path, roi)
-            logger.debug(f"ROI kaydedildi: {roi_path}")
+        save_artifact(config, 'roi', name, roi)
 
         logger.debug(f"ROI çıkarıldı: {name}")
         return roi
@@ -459,10 +522,287 @@ def detect_filled_option(area: np.ndarray, num_choices: int, threshold: float) -
         return -1
 
 
+def region_fill_ratios(
+    integral: np.ndarray,
+    x_starts: np.ndarray,
+    x_ends: np.ndarray,
+    y_starts: np.ndarray,
+    y_ends: np.ndarray
+) -> np.ndarray:
+    """
+    İntegral görüntü (summed-area table) üzerinden dikdörtgen bölgelerin doluluk oranlarını
+    tek seferde hesaplar. Koordinat dizileri NumPy yayınlama (broadcasting) kurallarına uyar;
+    her bölgenin işaretli piksel sayısı O(1) ile okunur.
+    """
+    sums = (
+        integral[y_ends, x_ends] - integral[y_starts, x_ends]
+        - integral[y_ends, x_starts] + integral[y_starts, x_starts]
+    )
+    areas = (x_ends - x_starts) * (y_ends - y_starts)
+    return np.where(areas > 0, sums / np.maximum(areas, 1), 0.0)
+
+
+def binarize_bubble_area(
+    area: np.ndarray,
+    close_kernel: Optional[Tuple[int, int]] = (3, 3),
+    blur_kernel: Optional[Tuple[int, int]] = (5, 5)
+) -> np.ndarray:
+    """
+    Alanı tek geçişte bulanıklaştırıp Otsu ile eşikler ve işaretli pikselleri 1 olan
+    ikili görüntüyü döner.
+    """
+    if len(area.shape) == 3:
+        area = cv2.cvtColor(area, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(area, blur_kernel, 0) if blur_kernel is not None else area
+    _, binary = cv2.threshold(blurred, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if close_kernel is not None:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, close_kernel)
+        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    return binary
+
+
+def disk_offsets(radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Verilen yarıçaptaki dairenin içinde kalan piksellerin merkeze göre (dy, dx) ofsetlerini döner.
+    """
+    r = max(1, int(np.ceil(radius)))
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    inside = dx ** 2 + dy ** 2 <= radius ** 2
+    return dy[inside], dx[inside]
+
+
+def bubble_fill_ratios(area: np.ndarray, bubbles: 'BubbleLayout', radius_scale: float = 1.0) -> np.ndarray:
+    """
+    Her baloncuğun dairesel maske içindeki doluluk oranını tek bir indeksleme (gather)
+    işlemiyle hesaplar. Sonuç, merkez dizisinin son ekseni hariç aynı boyuttadır.
+    Alan, şablondaki ROI boyutundan farklıysa merkezler ölçeklenir. Bulanıklaştırma ve
+    kapama uygulanmaz; bunlar baloncuk içindeki baskılı harfleri şişirip boş baloncukları
+    dolu gösterir.
+    """
+    binary = binarize_bubble_area(area, close_kernel=None, blur_kernel=None)
+    h, w = binary.shape[:2]
+    template_h, template_w = bubbles.roi_shape
+    scale_x, scale_y = w / template_w, h / template_h
+    centers = bubbles.centers * np.array([scale_x, scale_y])
+    dy, dx = disk_offsets(bubbles.radius * radius_scale * min(scale_x, scale_y))
+
+    cx = np.rint(centers[..., 0]).astype(np.intp)[..., None]
+    cy = np.rint(centers[..., 1]).astype(np.intp)[..., None]
+    xs = np.clip(cx + dx, 0, w - 1)
+    ys = np.clip(cy + dy, 0, h - 1)
+    return binary[ys, xs].mean(axis=-1)
+
+
+class BubbleLayout(NamedTuple):
+    """
+    Bir alandaki baloncukların ROI'nin sol üst köşesine göre merkezleri (..., 2) [x, y],
+    yarıçapı, şablon uzayındaki ROI boyutu (yükseklik, genişlik) ve dairesel örneklemeye
+    göre ayarlanmış doluluk eşiği (None ise alanın kendi eşiği kullanılır).
+    """
+    centers: np.ndarray
+    radius: float
+    roi_shape: Tuple[int, int]
+    threshold: Optional[float] = None
+
+
+class FormLayout(NamedTuple):
+    """
+    Şablon + konfigürasyon için bir kez derlenen form geometrisi.
+    answers/answer_key: (sütun, soru, seçenek, 2), student_number: (rakam, seçenek, 2),
+    test_group: (grup, 2) boyutlu merkez dizileri.
+    """
+    answers: Optional[BubbleLayout]
+    answer_key: Optional[BubbleLayout]
+    student_number: Optional[BubbleLayout]
+    test_group: Optional[BubbleLayout]
+
+
+# Konfigürasyon özetiyle anahtarlanmış derlenmiş form geometrileri
+_FORM_LAYOUTS: Dict[str, Optional[FormLayout]] = {}
+_FORM_LAYOUTS_LOCK = threading.Lock()
+
+
+def _form_layout_key(config: Dict) -> str:
+    """
+    Form geometrisini etkileyen konfigürasyon bölümlerinin özetini (hash) üretir.
+    """
+    relevant = {
+        'template_path': config['template_matching']['template_path'],
+        'form_layout': config.get('form_layout'),
+        'dynamic_roi': config.get('dynamic_roi'),
+        'extract_answers': config.get('extract_answers'),
+        'extract_student_number': config.get('extract_student_number'),
+        'extract_test_group': config.get('extract_test_group')
+    }
+    return hashlib.sha1(repr(relevant).encode('utf-8')).hexdigest()
+
+
+def _roi_origin(area_config: Dict) -> Tuple[Tuple[float, float], Tuple[int, int]]:
+    """
+    Şablon uzayındaki başlık kutusundan ROI'nin sol üst köşesini ve boyutunu (yükseklik, genişlik) hesaplar.
+    """
+    heading_x, heading_y = area_config['heading_box'][:2]
+    origin = (heading_x + area_config.get('offset_x', 0), heading_y + area_config.get('offset_y', 0))
+    shape = (
+        area_config['height'] + area_config.get('extra_height', 0),
+        area_config['width'] + area_config.get('extra_width', 0)
+    )
+    return origin, shape
+
+
+def _grid_centers(origin: Tuple[float, float], steps: List[Tuple[int, Tuple[float, float]]]) -> np.ndarray:
+    """
+    Başlangıç merkezinden ve her eksen için (adet, (dx, dy)) adımlarından merkez ızgarasını üretir.
+    """
+    centers = np.array(origin, dtype=np.float64)
+    for axis, (count, (dx, dy)) in enumerate(steps):
+        offsets = np.arange(count)[:, None] * np.array([dx, dy])
+        centers = np.expand_dims(centers, -2) + offsets.reshape((1,) * axis + (count, 2))
+    return centers
+
+
+def build_form_layout(config: Dict) -> Optional[FormLayout]:
+    """
+    'form_layout' bölümündeki şablon uzayı ölçülerinden tüm baloncuk merkezlerini hesaplar.
+    Merkezler ilgili alanın ROI köşesine göre ifade edilir; ROI'yi bulan adımdaki kayma
+    merkezlere de otomatik olarak yansır.
+    """
+    layout_config = config.get('form_layout')
+    if not layout_config:
+        return None
+    dynamic_roi = config['dynamic_roi']
+
+    def relative(area_name: str, centers: np.ndarray, field_config: Dict) -> Optional[BubbleLayout]:
+        area_config = dynamic_roi.get(area_name) or {}
+        if not area_config.get('heading_box'):
+            logger.warning(f"'{area_name}' için heading_box tanımlı değil; form geometrisi oluşturulamadı.")
+            return None
+        origin, shape = _roi_origin(area_config)
+        return BubbleLayout(
+            centers - np.array(origin),
+            float(field_config['radius']),
+            shape,
+            field_config.get('threshold')
+        )
+
+    answers_config = layout_config['answers']
+    answer_centers = _grid_centers(answers_config['first_center'], [
+        (config['extract_answers']['num_columns'], (answers_config['column_pitch'], 0)),
+        (config['extract_answers']['num_questions'], (0, answers_config['question_pitch'])),
+        (config['extract_answers']['num_choices'], (answers_config['choice_pitch'], 0))
+    ])
+
+    student_config = layout_config['student_number']
+    student_centers = _grid_centers(student_config['first_center'], [
+        (config['extract_student_number']['num_digits'], (student_config['digit_pitch'], 0)),
+        (config['extract_student_number']['num_options'], (0, student_config['option_pitch']))
+    ])
+
+    group_config = layout_config['test_group']
+    group_centers = _grid_centers(group_config['first_center'], [
+        (len(config['extract_test_group']['groups']), (group_config['choice_pitch'], 0))
+    ])
+
+    return FormLayout(
+        answers=relative('answer_area', answer_centers, answers_config),
+        answer_key=relative('answer_key_area', answer_centers, answers_config),
+        student_number=relative('student_number_area', student_centers, student_config),
+        test_group=relative('test_group_area', group_centers, group_config)
+    )
+
+
+def get_form_layout(config: Dict) -> Optional[FormLayout]:
+    """
+    Konfigürasyona karşılık gelen form geometrisini döner; aynı ayarlar için bir kez derlenir.
+    Örnekleme 'rect' olarak ayarlanmışsa None döner ve dikdörtgen hücre yöntemi kullanılır.
+    """
+    if config.get('form_layout', {}).get('sampling', 'circle') != 'circle':
+        return None
+    key = _form_layout_key(config)
+    with _FORM_LAYOUTS_LOCK:
+        if key not in _FORM_LAYOUTS:
+            _FORM_LAYOUTS[key] = build_form_layout(config)
+            logger.debug(f"Form geometrisi derlendi: {key[:12]}")
+        return _FORM_LAYOUTS[key]
+
+
+def layout_radius_scale(config: Dict) -> float:
+    """
+    Dairesel örneklemede baloncuk yarıçapına uygulanacak katsayıyı döner.
+    """
+    return config.get('form_layout', {}).get('radius_scale', 1.0)
+
+
+def fill_threshold(default: float, bubbles: Optional[BubbleLayout]) -> float:
+    """
+    Dairesel örneklemede geometriye tanımlı eşiği, aksi halde alanın varsayılan eşiğini döner.
+    """
+    if bubbles is not None and bubbles.threshold is not None:
+        return bubbles.threshold
+    return default
+
+
+def compute_answer_fill_ratios(
+    answer_area: np.ndarray,
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
+) -> np.ndarray:
+    """
+    Cevap alanındaki tüm baloncukların doluluk oranlarını (sütun, soru, seçenek)
+    boyutlu bir matris olarak hesaplar. Tüm alan tek bir bulanıklaştırma/eşikleme ile
+    işlenir. Form geometrisi verilirse baloncuklar dairesel maskeyle örneklenir;
+    aksi halde hücre toplamları integral görüntüden okunur.
+    """
+    if bubbles is not None:
+        return bubble_fill_ratios(answer_area, bubbles, layout_radius_scale(config))
+
+    num_columns = config['extract_answers']['num_columns']
+    num_questions = config['extract_answers']['num_questions']
+    num_choices = config['extract_answers']['num_choices']
+
+    h, w = answer_area.shape[:2]
+    question_height = h // num_questions
+    column_width = w // num_columns
+    choice_width = column_width // num_choices
+    padding = int(choice_width * 0.05)
+
+    integral = cv2.integral(binarize_bubble_area(answer_area))
+
+    columns = np.arange(num_columns)[:, None, None]
+    questions = np.arange(num_questions)[None, :, None]
+    choices = np.arange(num_choices)[None, None, :]
+
+    x_starts = columns * column_width + np.maximum(0, choices * choice_width + padding)
+    x_ends = columns * column_width + np.minimum(column_width, (choices + 1) * choice_width - padding)
+    y_starts = questions * question_height
+    y_ends = (questions + 1) * question_height
+
+    return region_fill_ratios(integral, x_starts, x_ends, y_starts, y_ends)
+
+
+def decode_answer_grid(fill_ratios: np.ndarray, threshold: float) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Doluluk oranı matrisinden her soru için işaretlenen seçeneği çözer.
+    En yüksek doluluk oranı eşiğin altındaysa cevap None olur.
+    """
+    best_choices = fill_ratios.argmax(axis=2)
+    best_ratios = fill_ratios.max(axis=2)
+    marked = best_ratios >= threshold
+
+    answers = {}
+    for col in range(fill_ratios.shape[0]):
+        answers[str(col + 1)] = {
+            str(q + 1): chr(65 + int(best_choices[col, q])) if marked[col, q] else None  # 'A' ASCII 65
+            for q in range(fill_ratios.shape[1])
+        }
+    return answers
+
+
 def extract_answers(
     thresh: np.ndarray,
     answer_coords: List[List[int]],
-    config: Dict
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
 ) -> Dict[str, Dict[str, Optional[str]]]:
     """
     Cevap alanını işleyerek cevapları çıkarır.
@@ -472,43 +812,84 @@ def extract_answers(
         logger.error("Cevap alanı çıkarılamadı.")
         return {}
 
-    answers = {}
-    num_columns = config['extract_answers']['num_columns']
-    num_questions = config['extract_answers']['num_questions']
-    num_choices = config['extract_answers']['num_choices']
-    threshold = config['extract_answers']['threshold']
+    fill_ratios = compute_answer_fill_ratios(answer_area, config, bubbles)
+    answers = decode_answer_grid(fill_ratios, fill_threshold(config['extract_answers']['threshold'], bubbles))
+    logger.debug(f"Cevap doluluk oranları (sütun x soru x seçenek): {np.round(fill_ratios, 3).tolist()}")
 
-    h, w = answer_area.shape[:2]
-    question_height = h // num_questions
-    column_width = w // num_columns
+    logger.info("Cevaplar başarıyla çıkarıldı.")
+    return answers
 
-    for col in range(num_columns):
-        column_number = str(col + 1)
-        answers[column_number] = {}
 
-        x_start = col * column_width
-        x_end = (col + 1) * column_width
+def grid_fill_ratios(integral: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """
+    Alanı rows x cols eşit hücreye böler (son satır/sütun kenara kadar uzar) ve her hücrenin
+    doluluk oranını integral görüntüden okuyarak (rows, cols) matrisi döner.
+    """
+    h, w = integral.shape[0] - 1, integral.shape[1] - 1
+    row_height, col_width = h // rows, w // cols
+    y_starts = np.arange(rows) * row_height
+    y_ends = np.append(y_starts[1:], h)
+    x_starts = np.arange(cols) * col_width
+    x_ends = np.append(x_starts[1:], w)
+    return region_fill_ratios(integral, x_starts[None, :], x_ends[None, :], y_starts[:, None], y_ends[:, None])
 
-        column_area = answer_area[:, x_start:x_end]
 
-        for q in range(num_questions):
-            question_number = str(q + 1)
-            y_start = q * question_height
-            y_end = (q + 1) * question_height
+def choice_confidences(fill_ratios: np.ndarray) -> np.ndarray:
+    """
+    Son eksendeki seçenekler için güven skorunu (en yüksek ile ikinci en yüksek doluluk
+    oranı arasındaki fark) hesaplar. Üç alan türünde de aynı ölçü kullanılır.
+    """
+    if fill_ratios.shape[-1] < 2:
+        return fill_ratios.max(axis=-1)
+    top_two = np.sort(fill_ratios, axis=-1)[..., -2:]
+    return top_two[..., 1] - top_two[..., 0]
 
-            question_area = column_area[y_start:y_end, :]
 
-            filled_choice = detect_filled_option(question_area, num_choices, threshold)
+def compute_student_number_fill_ratios(
+    image: np.ndarray,
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
+) -> np.ndarray:
+    """
+    Öğrenci numarası alanının (rakam, seçenek) boyutlu doluluk oranı matrisini hesaplar.
+    """
+    if bubbles is not None:
+        return bubble_fill_ratios(image, bubbles, layout_radius_scale(config))
 
-            if filled_choice != -1:
-                answers[column_number][question_number] = chr(65 + filled_choice)  # 'A' ASCII 65
-                logger.debug(f"Cevap: Sütun {column_number}, Soru {question_number} - Seçenek {chr(65 + filled_choice)}")
-            else:
-                answers[column_number][question_number] = None
-                logger.debug(f"Cevap: Sütun {column_number}, Soru {question_number} - Belirsiz")
+    num_digits = config['extract_student_number']['num_digits']
+    num_options = config['extract_student_number']['num_options']
+    integral = cv2.integral(binarize_bubble_area(image, close_kernel=None))
+    return grid_fill_ratios(integral, num_options, num_digits).T
 
-    logger.info("Cevaplar başarıyla çıkarıldı.")
-    return answers
+
+def read_student_number(
+    image: np.ndarray,
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
+) -> Tuple[str, List[float]]:
+    """
+    Öğrenci numarası alanından işaretlenen rakamları ve her rakamın güven skorunu çıkarır.
+    Eşiğin altında kalan rakamlar '-' olarak döner.
+    """
+    threshold = fill_threshold(config['extract_student_number']['threshold'], bubbles)
+    fill_ratios = compute_student_number_fill_ratios(image, config, bubbles)
+    detected_options = fill_ratios.argmax(axis=1)
+    max_fill_ratios = fill_ratios.max(axis=1)
+    confidences = choice_confidences(fill_ratios)
+
+    student_number = []
+    for i, (option, max_fill_ratio) in enumerate(zip(detected_options, max_fill_ratios)):
+        if max_fill_ratio >= threshold and max_fill_ratio > 0:
+            student_number.append(str(option))
+        else:
+            student_number.append("-")
+            confidences[i] = 0.0
+            logger.warning(f"Öğrenci Numarası Sütun {i + 1}: Doluluk oranı {max_fill_ratio:.2f}, eşik altında.")
+    logger.debug(f"Öğrenci numarası doluluk oranları (rakam x seçenek): {np.round(fill_ratios, 2).tolist()}")
+
+    student_number_str = ''.join(student_number)
+    logger.info(f"Çıkarılan Öğrenci Numarası: {student_number_str}")
+    return student_number_str, [round(float(confidence), 3) for confidence in confidences]
 
 
 def extract_student_number(image: np.ndarray, config: Dict) -> str:
@@ -516,62 +897,62 @@ def extract_student_number(image: np.ndarray, config: Dict) -> str:
     Öğrenci numarası alanından işaretlenen rakamları çıkarır.
     """
     try:
-        if len(image.shape) == 3:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        h, w = image.shape[:2]
-
-        num_digits = config['extract_student_number']['num_digits']
-        num_options = config['extract_student_number']['num_options']
-        threshold = config['extract_student_number']['threshold']
-        student_number = []
-
-        digit_width = w // num_digits
-
-        for i in range(num_digits):
-            x_start = i * digit_width
-            x_end = (i + 1) * digit_width if i < num_digits - 1 else w
-            digit_area = image[:, x_start:x_end]
-            option_height = digit_area.shape[0] // num_options
-            max_fill_ratio = 0
-            detected_option = None
-
-            for j in range(num_options):
-                y_start = j * option_height
-                y_end = (j + 1) * option_height if j < num_options - 1 else digit_area.shape[0]
-                option_area = digit_area[y_start:y_end, :]
-
-                # Daha hassas bir doluluk tespiti için ek ön işleme
-                option_area = cv2.GaussianBlur(option_area, (5, 5), 0)
-                option_area = cv2.threshold(option_area, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-
-                filled_pixels = cv2.countNonZero(option_area)
-                total_pixels = option_area.shape[0] * option_area.shape[1]
-                fill_ratio = filled_pixels / total_pixels if total_pixels > 0 else 0
-                if fill_ratio > max_fill_ratio:
-                    max_fill_ratio = fill_ratio
-                    detected_option = j
-                logger.debug(f"Öğrenci Numarası Sütun {i + 1}, Seçenek {j}: Doluluk = {fill_ratio:.2f}")
-
-            if max_fill_ratio >= threshold and detected_option is not None:
-                student_number.append(str(detected_option))
-                logger.debug(f"Öğrenci Numarası Sütun {i + 1}: Rakam {detected_option} algılandı.")
-            else:
-                student_number.append("-")
-                logger.warning(f"Öğrenci Numarası Sütun {i + 1}: Doluluk oranı {max_fill_ratio:.2f}, eşik altında.")
-
-        student_number_str = ''.join(student_number)
-        logger.info(f"Çıkarılan Öğrenci Numarası: {student_number_str}")
-        return student_number_str
+        student_number, _ = read_student_number(image, config)
+        return student_number
     except Exception as e:
         logger.error(f"Öğrenci numarası çıkarılırken hata: {e}")
         return "Unknown"
 
 
+def read_test_group(
+    test_group_area: np.ndarray,
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
+) -> Tuple[Optional[str], float]:
+    """
+    Test grubu alanından işaretlenen grup harfini ve güven skorunu çıkarır.
+    En dolu seçenek eşiği geçmeli ve ikinci seçenekten 'dominance_threshold' kadar baskın olmalıdır;
+    aksi halde 'Belirsiz' döner.
+    """
+    groups = config['extract_test_group']['groups']
+    if not groups:
+        logger.error("Konfigürasyonda gruplar tanımlanmamış.")
+        return None, 0.0
+
+    similarity_threshold = fill_threshold(config['extract_test_group'].get('threshold', 0.2), bubbles)
+    dominance_threshold = config['extract_test_group'].get('dominance_threshold', 0.05)
+
+    if bubbles is not None:
+        fill_ratios = bubble_fill_ratios(test_group_area, bubbles, layout_radius_scale(config))
+    else:
+        integral = cv2.integral(binarize_bubble_area(test_group_area, close_kernel=None))
+        fill_ratios = grid_fill_ratios(integral, 1, len(groups))[0]
+    logger.debug(f"Test grubu doluluk oranları: {dict(zip(groups, np.round(fill_ratios, 3).tolist()))}")
+
+    top_index = int(fill_ratios.argmax())
+    top_choice, top_ratio = groups[top_index], float(fill_ratios[top_index])
+    confidence = float(choice_confidences(fill_ratios))
+
+    if len(groups) == 1:
+        if top_ratio >= similarity_threshold:
+            logger.info(f"Test grubu için en iyi seçenek: {top_choice}")
+            return top_choice, round(confidence, 3)
+        logger.warning("Tek seçenek bulundu ancak benzerlik eşiğinin altında.")
+        return None, 0.0
+
+    if confidence > dominance_threshold and top_ratio >= similarity_threshold:
+        logger.info(f"Test grubu için en iyi seçenek: {top_choice}")
+        return top_choice, round(confidence, 3)
+
+    logger.warning(f"Dominance threshold karşılanmadı veya {top_choice} için belirsizlik tespit edildi.")
+    return "Belirsiz", round(confidence, 3)
+
+
 def extract_test_group(
     thresh: np.ndarray,
     test_group_coords: List[List[int]],
-    config: Dict
+    config: Dict,
+    bubbles: Optional[BubbleLayout] = None
 ) -> Optional[str]:
     """
     Test grubu alanından işaretlenen grup harfini çıkarır.
@@ -582,71 +963,8 @@ def extract_test_group(
         if test_group_area is None:
             logger.error("Test grubu alanı çıkarılamadı.")
             return None
-
-        test_group_area = cv2.bitwise_not(test_group_area)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-        test_group_area = cv2.morphologyEx(test_group_area, cv2.MORPH_ERODE, kernel)
-
-        groups = config['extract_test_group']['groups']
-        if not groups:
-            logger.error("Konfigürasyonda gruplar tanımlanmamış.")
-            return None
-
-        h, w = test_group_area.shape[:2]
-        num_choices = len(groups)
-        choice_width = w // num_choices
-        min_contour_area = config['extract_test_group'].get('min_contour_area', 50)
-        similarity_threshold = config['extract_test_group'].get('threshold', 0.2)
-        dominance_threshold = config['extract_test_group'].get('dominance_threshold', 0.05)
-        filled_ratios = []
-
-        for i in range(num_choices):
-            x_start = i * choice_width
-            x_end = (i + 1) * choice_width if i < num_choices - 1 else w
-            choice_area = test_group_area[:, x_start:x_end]
-            contours, _ = cv2.findContours(choice_area, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            max_contour_area = 0
-
-            for contour in contours:
-                contour_area = cv2.contourArea(contour)
-                if contour_area >= min_contour_area:
-                    max_contour_area = max(max_contour_area, contour_area)
-                    x, y, width, height = cv2.boundingRect(contour)
-                    logger.debug(
-                        f"Seçenek {groups[i]}: Kontur Alanı = {contour_area}, "
-                        f"Pozisyon = ({x}, {y}, {width}, {height})"
-                    )
-
-            filled_ratio = max_contour_area / (choice_area.shape[0] * choice_area.shape[1])
-            filled_ratios.append((groups[i], filled_ratio))
-            logger.debug(f"Seçenek {groups[i]}: Doluluk Oranı = {filled_ratio:.2f}")
-
-        filled_ratios.sort(key=lambda x: x[1], reverse=True)
-        logger.debug(f"Sıralanmış Doluluk Oranları: {filled_ratios}")
-
-        if len(filled_ratios) >= 2:
-            top_choice, top_ratio = filled_ratios[0]
-            second_choice, second_ratio = filled_ratios[1]
-            if top_ratio - second_ratio > dominance_threshold and top_ratio >= similarity_threshold:
-                logger.info(f"Test grubu için en iyi seçenek: {top_choice}")
-                return top_choice
-            else:
-                logger.warning(
-                    f"Dominance threshold karşılanmadı veya {top_choice} ile {second_choice} "
-                    f"arasında belirsizlik tespit edildi."
-                )
-                return "Belirsiz"
-        elif len(filled_ratios) == 1:
-            top_choice, top_ratio = filled_ratios[0]
-            if top_ratio >= similarity_threshold:
-                logger.info(f"Test grubu için en iyi seçenek: {top_choice}")
-                return top_choice
-            else:
-                logger.warning("Tek seçenek bulundu ancak benzerlik eşiğinin altında.")
-                return None
-        else:
-            logger.error("Dolgu yapılmış seçenek bulunamadı.")
-            return None
+        test_group, _ = read_test_group(test_group_area, config, bubbles)
+        return test_group
     except Exception as e:
         logger.error(f"Test grubu çıkarılırken hata: {e}")
         return None
@@ -689,8 +1007,11 @@ def visualize_results(
     config: Dict
 ):
     """
-    Sonuçları görselleştirir ve kaydeder.
+    Sonuçları görselleştirir ve kaydeder. Görselleştirme kapalıysa veya form örneklemede
+    elendiyse çizim de yapılmaz.
     """
+    if not artifacts_enabled(config, 'visualization'):
+        return
     try:
         for name, coords in rois:
             if coords is not None:
@@ -707,84 +1028,105 @@ def visualize_results(
                 )
                 logger.debug(f"Görüntüye ROI eklendi: {name}")
 
-        if config['output']['save_visualization']:
-            visualization_dir = os.path.join(settings.BASE_DIR, config['output']['visualization_directory'])
-            os.makedirs(visualization_dir, exist_ok=True)
-            visualization_path = os.path.join(visualization_dir, 'visualization.jpg')
-            cv2.imwrite(visualization_path, image)
-            logger.debug(f"Görselleştirilmiş görüntü kaydedildi: {visualization_path}")
+        save_artifact(config, 'visualization', 'visualization', image)
     except Exception as e:
         logger.error(f"Görselleştirme sırasında hata oluştu: {e}")
 
 
-def save_results_to_db(results: Dict):
+def save_results_to_db(results: Dict) -> bool:
     """
-    Çıkarılan sonuçları veritabanına kaydeder.
+    Çıkarılan sonuçları veritabanına kaydeder. Sütun eşleşmeleri ve cevap anahtarı
+    birer sorguyla yüklenir, cevaplar bellekte puanlanır ve tek bir işlem (transaction)
+    içinde toplu olarak yazılır (var olan cevaplar güncellenir).
+    Hata günlüğe yazılır ve False döner; kayıt başarılıysa True döner.
     """
     try:
-        from .models import Student, StudentAnswer, TestGroup, ColumnMapping, AnswerKey
+        from django.db import transaction
+        from .models import Student, StudentAnswer, TestGroup, ColumnMapping, AnswerKey, schedule_results
 
         student_number = results.get('student_number', 'Unknown')
         test_group_name = results.get('test_group', 'Unknown')
         answers = results.get('answers', {})
 
-        student, created = Student.objects.get_or_create(student_number=student_number)
-        student.save()  # name alanı artık olmadığı için sadece kaydediyoruz
-        logger.debug(f"Öğrenci kaydı güncellendi: {student_number}")
-
-        test_group, _ = TestGroup.objects.get_or_create(name=test_group_name)
-        logger.debug(f"Test grubu kaydı oluşturuldu: {test_group_name}")
-
-        column_mappings = ColumnMapping.objects.filter(test_group=test_group)
-
-        for column_number_str, questions in answers.items():
-            try:
-                column_number = int(column_number_str)
-            except ValueError:
-                logger.warning(f"Geçersiz sütun numarası: {column_number_str}")
-                continue
-
-            column_mapping = column_mappings.filter(column_number=column_number).first()
-            if not column_mapping:
-                logger.warning(f"Sütun numarası {column_number} için eşleşme bulunamadı.")
-                continue
-
-            course = column_mapping.course
-
-            for question_id_str, selected_answer in questions.items():
+        with transaction.atomic():
+            student, _ = Student.objects.get_or_create(student_number=student_number)
+            logger.debug(f"Öğrenci kaydı güncellendi: {student_number}")
+
+            test_group, _ = TestGroup.objects.get_or_create(name=test_group_name)
+            logger.debug(f"Test grubu kaydı oluşturuldu: {test_group_name}")
+
+            # Aynı sütun için birden fazla eşleşme varsa ilki kullanılır
+            column_courses = {}
+            for column_number, course_id in ColumnMapping.objects.filter(
+                test_group=test_group
+            ).order_by('-pk').values_list('column_number', 'course_id'):
+                column_courses[column_number] = course_id
+
+            answer_keys = {
+                (course_id, question_id): correct_answer
+                for course_id, question_id, correct_answer in AnswerKey.objects.filter(
+                    test_group=test_group
+                ).values_list('course_id', 'question_id', 'correct_answer')
+            }
+
+            student_answers = []
+            for column_number_str, questions in answers.items():
                 try:
-                    question_id = int(question_id_str)
+                    column_number = int(column_number_str)
                 except ValueError:
-                    logger.warning(f"Geçersiz soru numarası: {question_id_str}")
+                    logger.warning(f"Geçersiz sütun numarası: {column_number_str}")
                     continue
 
-                valid_choices = TURKISH_LETTERS
-                if selected_answer not in valid_choices and selected_answer is not None:
-                    logger.warning(f"Geçersiz cevap seçeneği: {selected_answer}")
+                course_id = column_courses.get(column_number)
+                if course_id is None:
+                    logger.warning(f"Sütun numarası {column_number} için eşleşme bulunamadı.")
                     continue
 
-                if not AnswerKey.objects.filter(course=course, test_group=test_group, question_id=question_id).exists():
-                    logger.warning(
-                        f"AnswerKey bulunamadı: Kurs={course}, Test Grubu={test_group}, Soru={question_id}"
-                    )
-                    continue
+                for question_id_str, selected_answer in questions.items():
+                    try:
+                        question_id = int(question_id_str)
+                    except ValueError:
+                        logger.warning(f"Geçersiz soru numarası: {question_id_str}")
+                        continue
+
+                    if selected_answer is None:
+                        continue
+                    if selected_answer not in TURKISH_LETTERS:
+                        logger.warning(f"Geçersiz cevap seçeneği: {selected_answer}")
+                        continue
+
+                    correct_answer = answer_keys.get((course_id, question_id))
+                    if correct_answer is None:
+                        logger.warning(
+                            f"AnswerKey bulunamadı: Kurs={course_id}, Test Grubu={test_group}, Soru={question_id}"
+                        )
+                        continue
+
+                    student_answers.append(StudentAnswer(
+                        student=student,
+                        test_group=test_group,
+                        course_id=course_id,
+                        question_id=question_id,
+                        selected_answer=selected_answer,
+                        is_correct=selected_answer == correct_answer
+                    ))
+
+            StudentAnswer.objects.bulk_create(
+                student_answers,
+                update_conflicts=True,
+                unique_fields=['student', 'test_group', 'course', 'question_id'],
+                update_fields=['selected_answer', 'is_correct', 'updated_at']
+            )
+            logger.debug(f"{len(student_answers)} cevap kaydedildi: {student_number}")
 
-                StudentAnswer.objects.update_or_create(
-                    student=student,
-                    test_group=test_group,
-                    course=course,
-                    question_id=question_id,
-                    defaults={
-                        'selected_answer': selected_answer
-                    }
-                )
-                logger.debug(
-                    f"Cevap kaydedildi: {student_number}, Soru {question_id}, Seçenek {selected_answer}"
-                )
+            if student_answers:
+                schedule_results(student)
 
         logger.info("Sonuçlar veritabanına başarıyla kaydedildi.")
+        return True
     except Exception as e:
         logger.error(f"Veritabanına kaydetme sırasında hata oluştu: {e}")
+        return False
 
 
 def save_answer_key_results(
@@ -796,59 +1138,61 @@ def save_answer_key_results(
     Çıkarılan cevap anahtarını AnswerKey modeline kaydeder.
     """
     try:
-        from .models import AnswerKey, TestGroup, ColumnMapping, Course
+        from .models import AnswerKey, TestGroup, ColumnMapping, Course, deferred_scoring
 
         test_group_obj, created = TestGroup.objects.get_or_create(name=test_group)
         if created:
             logger.debug(f"Yeni test grubu oluşturuldu: {test_group}")
 
-        for column_number_str, questions in answers.items():
-            try:
-                column_number = int(column_number_str)
-            except ValueError:
-                logger.warning(f"Geçersiz sütun numarası: {column_number_str}")
-                continue
-
-            column_mapping = ColumnMapping.objects.filter(
-                test_group=test_group_obj, column_number=column_number
-            ).first()
-            if not column_mapping:
-                logger.warning(f"Sütun numarası {column_number} için ColumnMapping bulunamadı.")
-                continue
-
-            course = column_mapping.course
-            total_questions = course.total_questions
-
-            for question_id_str, correct_answer in questions.items():
+        # Anahtarlar tek seferde uygulanır; etkilenen öğrenciler yalnızca bir kez puanlanır
+        with deferred_scoring():
+            for column_number_str, questions in answers.items():
                 try:
-                    question_id = int(question_id_str)
+                    column_number = int(column_number_str)
                 except ValueError:
-                    logger.warning(f"Geçersiz soru numarası: {question_id_str}")
+                    logger.warning(f"Geçersiz sütun numarası: {column_number_str}")
                     continue
 
-                if question_id > total_questions:
-                    logger.warning(
-                        f"Soru numarası {question_id} kursun toplam soru sayısını "
-                        f"({total_questions}) aşıyor. Skipping."
-                    )
+                column_mapping = ColumnMapping.objects.filter(
+                    test_group=test_group_obj, column_number=column_number
+                ).first()
+                if not column_mapping:
+                    logger.warning(f"Sütun numarası {column_number} için ColumnMapping bulunamadı.")
                     continue
 
-                if correct_answer is None:
-                    logger.warning(
-                        f"Geçersiz cevap seçeneği: Sütun {column_number_str}, Soru {question_id_str}"
+                course = column_mapping.course
+                total_questions = course.total_questions
+
+                for question_id_str, correct_answer in questions.items():
+                    try:
+                        question_id = int(question_id_str)
+                    except ValueError:
+                        logger.warning(f"Geçersiz soru numarası: {question_id_str}")
+                        continue
+
+                    if question_id > total_questions:
+                        logger.warning(
+                            f"Soru numarası {question_id} kursun toplam soru sayısını "
+                            f"({total_questions}) aşıyor. Skipping."
+                        )
+                        continue
+
+                    if correct_answer is None:
+                        logger.warning(
+                            f"Geçersiz cevap seçeneği: Sütun {column_number_str}, Soru {question_id_str}"
+                        )
+                        continue
+
+                    AnswerKey.objects.update_or_create(
+                        test_group=test_group_obj,
+                        course=course,
+                        question_id=question_id,
+                        defaults={'correct_answer': correct_answer}
+                    )
+                    logger.debug(
+                        f"AnswerKey kaydı güncellendi veya oluşturuldu: Test Grubu={test_group}, "
+                        f"Kurs={course.name}, Soru={question_id}, Cevap={correct_answer}"
                     )
-                    continue
-
-                AnswerKey.objects.update_or_create(
-                    test_group=test_group_obj,
-                    course=course,
-                    question_id=question_id,
-                    defaults={'correct_answer': correct_answer}
-                )
-                logger.debug(
-                    f"AnswerKey kaydı güncellendi veya oluşturuldu: Test Grubu={test_group}, "
-                    f"Kurs={course.name}, Soru={question_id}, Cevap={correct_answer}"
-                )
 
         logger.info("Cevap anahtarı veritabanına başarıyla kaydedildi.")
         return {"status": "success", "message": "Cevap anahtarı başarıyla kaydedildi."}
@@ -858,13 +1202,21 @@ def save_answer_key_results(
         return {"error": "Cevap anahtarı veritabanına kaydedilirken bir hata oluştu."}
 
 
+def resolve_template_path(template_path: str) -> str:
+    """
+    Şablon yolunu BASE_DIR'e göre mutlak yola çevirir.
+    """
+    if not os.path.isabs(template_path):
+        template_path = os.path.join(settings.BASE_DIR, template_path.lstrip('/'))
+    return template_path
+
+
 def load_template(template_path: str) -> Optional[np.ndarray]:
     """
     Şablon görüntüyü yükler.
     """
     try:
-        if not os.path.isabs(template_path):
-            template_path = os.path.join(settings.BASE_DIR, template_path.lstrip('/'))
+        template_path = resolve_template_path(template_path)
         template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
         if template is None:
             logger.error(f"Şablon görüntü yüklenemedi: {template_path}")
@@ -876,22 +1228,173 @@ def load_template(template_path: str) -> Optional[np.ndarray]:
         return None
 
 
+# Süreç genelinde şablon kaydı: (yol, mtime, ORB parametreleri) -> TemplateFeatures
+_TEMPLATE_REGISTRY: Dict[Tuple, TemplateFeatures] = {}
+_TEMPLATE_REGISTRY_LOCK = threading.Lock()
+
+
+def get_orb_params(config: Dict) -> Dict:
+    """
+    Konfigürasyondan ORB parametrelerini okur.
+    """
+    feature_config = config.get('feature_matching', {})
+    return {'nfeatures': feature_config.get('nfeatures', 5000)}
+
+
+def _template_cache_path(cache_key: Tuple, config: Dict) -> Optional[str]:
+    """
+    Şablon özniteliklerinin disk önbelleği dosya yolunu döner (önbellek kapalıysa None).
+    """
+    cache_directory = config.get('feature_matching', {}).get('cache_directory')
+    if not cache_directory:
+        return None
+    digest = hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
+    return os.path.join(settings.BASE_DIR, cache_directory, f"{digest}.npz")
+
+
+def _load_cached_features(cache_path: str) -> Optional[Tuple[Tuple, Optional[np.ndarray]]]:
+    """
+    Disk önbelleğinden anahtar noktaları ve tanımlayıcıları yükler.
+    """
+    try:
+        with np.load(cache_path) as data:
+            points = data['points']
+            descriptors = data['descriptors'] if data['descriptors'].size else None
+        keypoints = tuple(
+            cv2.KeyPoint(x=float(x), y=float(y), size=float(size), angle=float(angle),
+                         response=float(response), octave=int(octave), class_id=int(class_id))
+            for x, y, size, angle, response, octave, class_id in points
+        )
+        logger.debug(f"Şablon öznitelikleri önbellekten yüklendi: {cache_path}")
+        return keypoints, descriptors
+    except Exception as e:
+        logger.warning(f"Şablon öznitelik önbelleği okunamadı: {e}")
+        return None
+
+
+def _save_cached_features(cache_path: str, keypoints: Tuple, descriptors: Optional[np.ndarray]):
+    """
+    Anahtar noktaları ve tanımlayıcıları sıkıştırılmış olarak diske yazar.
+    """
+    try:
+        points = np.array(
+            [(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id) for kp in keypoints],
+            dtype=np.float32
+        ).reshape(-1, 7)
+        if descriptors is None:
+            descriptors = np.empty((0, 32), dtype=np.uint8)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(temp_path, points=points, descriptors=descriptors)
+        os.replace(temp_path, cache_path)
+        logger.debug(f"Şablon öznitelikleri önbelleğe yazıldı: {cache_path}")
+    except Exception as e:
+        logger.warning(f"Şablon öznitelik önbelleği yazılamadı: {e}")
+
+
+def get_template_features(config: Dict) -> Optional[TemplateFeatures]:
+    """
+    Şablonu süreç başına bir kez yükler ve ORB özniteliklerini önbelleğe alır.
+    Şablon dosyası değişirse (mtime) veya ORB parametreleri değişirse yeniden hesaplanır.
+    """
+    template_path = resolve_template_path(config['template_matching']['template_path'])
+    try:
+        mtime = os.path.getmtime(template_path)
+    except OSError:
+        logger.error(f"Şablon görüntü bulunamadı: {template_path}")
+        return None
+
+    orb_params = get_orb_params(config)
+    cache_key = (template_path, mtime, tuple(sorted(orb_params.items())))
+
+    with _TEMPLATE_REGISTRY_LOCK:
+        features = _TEMPLATE_REGISTRY.get(cache_key)
+        if features is not None:
+            return features
+
+        template = load_template(template_path)
+        if template is None:
+            return None
+
+        cache_path = _template_cache_path(cache_key, config)
+        cached = _load_cached_features(cache_path) if cache_path and os.path.exists(cache_path) else None
+        if cached is not None:
+            keypoints, descriptors = cached
+        else:
+            orb = cv2.ORB_create(**orb_params)
+            keypoints, descriptors = orb.detectAndCompute(template, None)
+            keypoints = tuple(keypoints)
+            logger.info(f"Şablon öznitelikleri hesaplandı: {len(keypoints)} anahtar nokta.")
+            if cache_path:
+                _save_cached_features(cache_path, keypoints, descriptors)
+
+        # Aynı şablonun eski sürümlerini kayıttan çıkar
+        for key in [key for key in _TEMPLATE_REGISTRY if key[0] == template_path]:
+            del _TEMPLATE_REGISTRY[key]
+
+        features = TemplateFeatures(template, keypoints, descriptors)
+        _TEMPLATE_REGISTRY[cache_key] = features
+        return features
+
+
+def estimate_alignment_scale(image: np.ndarray, template: TemplateFeatures, config: Dict) -> float:
+    """
+    Belge konturunun (bulunamazsa görüntünün) boyutunu şablon boyutuyla karşılaştırarak
+    hizalama ölçeğini tek adımda tahmin eder.
+    """
+    scale_min, scale_max = config['feature_matching'].get('scale_range', [0.5, 1.5])
+    h, w = image.shape[:2]
+    document_contour = find_document_contour(image)
+    if document_contour is not None:
+        _, _, contour_w, contour_h = cv2.boundingRect(document_contour)
+        # Küçük konturlar (ör. form içindeki kutular) belge olarak kabul edilmez
+        if contour_w * contour_h >= 0.5 * w * h:
+            w, h = contour_w, contour_h
+
+    template_h, template_w = template.image.shape[:2]
+    scale = float(np.sqrt((template_w * template_h) / float(w * h)))
+    scale = float(np.clip(scale, scale_min, scale_max))
+    logger.debug(f"Tahmini hizalama ölçeği: {scale:.3f}")
+    return scale
+
+
+def get_alignment_scales(image: np.ndarray, template: TemplateFeatures, config: Dict) -> List[float]:
+    """
+    Denenecek ölçekleri sırasıyla döner.
+    'coarse_to_fine' modunda önce tahmini ölçek, ardından ona en yakın ölçekler denenir;
+    'linear' modunda eski davranış gibi aralık baştan sona taranır.
+    """
+    feature_config = config['feature_matching']
+    scale_min, scale_max = feature_config.get('scale_range', [0.5, 1.5])
+    scales = [float(scale) for scale in np.linspace(scale_min, scale_max, num=feature_config.get('scale_steps', 11))]
+    if feature_config.get('scale_search', 'coarse_to_fine') != 'coarse_to_fine':
+        return scales
+
+    estimated_scale = estimate_alignment_scale(image, template, config)
+    fallback_scales = sorted(scales, key=lambda scale: abs(scale - estimated_scale))
+    return [estimated_scale] + [scale for scale in fallback_scales if not np.isclose(scale, estimated_scale)]
+
+
 def align_image_with_feature_matching(
     image: np.ndarray,
-    template: np.ndarray,
+    template: TemplateFeatures,
     config: Dict
-) -> Optional[np.ndarray]:
+) -> Tuple[Optional[np.ndarray], Optional[float]]:
     """
     Feature matching kullanarak görüntüyü şablona hizalar.
+    Şablonun anahtar noktaları ve tanımlayıcıları önceden hesaplanmış olarak gelir.
+    Hizalanmış görüntüyü ve kullanılan ölçeği döner.
     """
     try:
-        orb = cv2.ORB_create(nfeatures=5000)
-        kp1, des1 = orb.detectAndCompute(template, None)
-        scales = np.linspace(0.5, 1.5, num=11)
+        orb = cv2.ORB_create(**get_orb_params(config))
+        kp1, des1 = template.keypoints, template.descriptors
+        if des1 is None:
+            logger.error("Şablonda tanımlayıcı bulunamadı.")
+            return None, None
         min_matches = config['feature_matching']['min_matches']
         bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
 
-        for scale in scales:
+        for attempt, scale in enumerate(get_alignment_scales(image, template, config), start=1):
             resized_image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
             kp2, des2 = orb.detectAndCompute(resized_image, None)
             if des2 is None:
@@ -905,28 +1408,24 @@ def align_image_with_feature_matching(
             dst_pts = np.float32([kp2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
             M, mask = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
 
-            if M is not None:
-                h, w = template.shape
+            # Yeterli inlier yoksa homografi güvenilmez; sıradaki ölçeğe geçilir
+            if M is not None and int(mask.sum()) >= min_matches:
+                h, w = template.image.shape
                 aligned_image = cv2.warpPerspective(resized_image, M, (w, h))
-                if config['output']['save_debug_images']:
-                    debug_dir = os.path.join(settings.BASE_DIR, config['output']['debug_images_directory'])
-                    os.makedirs(debug_dir, exist_ok=True)
-                    aligned_image_path = os.path.join(debug_dir, f'aligned_image_scale_{scale}.jpg')
-                    cv2.imwrite(aligned_image_path, aligned_image)
-                    logger.debug(f"Hizalanmış görüntü kaydedildi: {aligned_image_path}")
-                logger.info(f"Görüntü {scale} ölçeğinde hizalandı.")
-                return aligned_image
+                save_artifact(config, 'debug', f'aligned_image_scale_{scale:.3f}', aligned_image)
+                logger.info(f"Görüntü {scale:.3f} ölçeğinde hizalandı ({attempt}. deneme).")
+                return aligned_image, scale
 
         logger.error("Görüntü herhangi bir ölçekte hizalanamadı.")
-        return None
+        return None, None
     except Exception as e:
         logger.error(f"Görüntü hizalaması sırasında hata: {e}")
-        return None
+        return None, None
 
 
 def alternative_alignment_method(
     image: np.ndarray,
-    template: np.ndarray,
+    template: TemplateFeatures,
     config: Dict
 ) -> Optional[np.ndarray]:
     """
@@ -937,37 +1436,101 @@ def alternative_alignment_method(
     return None
 
 
-def process_image(image_path: str, config: Dict) -> Dict:
+# Tarayıcı girdisi: dosya yolu, bellekteki kodlanmış görüntü (bytes/memoryview) veya BGR dizi
+ImageSource = Union[str, os.PathLike, bytes, bytearray, memoryview, np.ndarray]
+
+
+def describe_image_source(source: ImageSource) -> str:
+    """
+    Günlük mesajları için görüntü kaynağının kısa açıklamasını döner.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, np.ndarray):
+        return f"dizi {source.shape}"
+    return f"bellek ({memoryview(source).nbytes} bayt)"
+
+
+def decode_image(source: ImageSource) -> Optional[np.ndarray]:
+    """
+    Görüntüyü dosya yolundan okur veya bellekteki kodlanmış veriden (JPEG/PNG...) doğrudan
+    çözer. bytes/memoryview girdileri kopyalanmadan np.frombuffer ile sarılır.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return cv2.imread(os.fspath(source))
+
+    buffer = np.frombuffer(memoryview(source), dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def process_image(image_source: ImageSource, config: Dict, save_to_db: bool = True) -> Dict:
     """
-    Görüntüyü işleyerek gerekli alanları çıkarır ve sonuçları döner.
+    Görüntüyü işleyerek gerekli alanları çıkarır ve sonuçları döner. Görüntü dosya yolu,
+    bellekteki kodlanmış veri veya BGR dizi olarak verilebilir.
+    save_to_db False ise sonuçlar veritabanına yazılmaz (toplu işlemde ana süreç yazar).
+    Başarılı sonuçlar, aşama sürelerini içeren 'trace' anahtarıyla döner; iz ayrıca süreç
+    metriklerine eklenir. Ara görüntüler (hata ayıklama, ROI, görselleştirme) örneklemeye göre
+    arka planda yazılır; kaydedildiyse klasör adı 'artifact_id' anahtarında döner.
     """
+    trace = SheetTrace()
+    with tracing(trace), connection.execute_wrapper(trace.count_query), collecting_artifacts(config) as artifacts:
+        results = _process_image(image_source, config, save_to_db, trace)
+    artifact_id = commit_artifacts(artifacts, results)
+    if artifact_id and 'error' not in results:
+        results['artifact_id'] = artifact_id
+    trace_data = trace.as_dict()
+    METRICS.observe(trace_data, 'error' if 'error' in results else 'ok')
+    if 'error' not in results:
+        results['trace'] = trace_data
+    logger.info(
+        f"Form işlendi: {trace_data['wall_ms']} ms, OCR {trace_data['ocr']['calls']} çağrı, "
+        f"{trace_data['db_queries']} sorgu"
+    )
+    return results
+
+
+def _process_image(image_source: ImageSource, config: Dict, save_to_db: bool, trace: SheetTrace) -> Dict:
     try:
         setup_logging(config)
-        template = load_template(config['template_matching']['template_path'])
-        if template is None:
-            logger.error("Şablon görüntü yüklenemedi.")
-            return {"error": "Şablon görüntü yüklenemedi."}
-
-        image = cv2.imread(image_path)
+        with trace.stage('template'):
+            template = get_template_features(config)
+            if template is None:
+                logger.error("Şablon görüntü yüklenemedi.")
+                return {"error": "Şablon görüntü yüklenemedi."}
+            # Baloncuk geometrisi şablon + konfigürasyon için bir kez derlenir
+            layout = get_form_layout(config)
+
+        with trace.stage('decode'):
+            image = decode_image(image_source)
         if image is None:
-            logger.error(f"Görüntü yüklenemedi: {image_path}")
+            logger.error(f"Görüntü yüklenemedi: {describe_image_source(image_source)}")
             return {"error": "Görüntü yüklenemedi."}
 
-        logger.info(f"Görüntü yüklendi: {image_path}")
+        logger.info(f"Görüntü yüklendi: {describe_image_source(image_source)}")
+        trace.image_size = image.shape[:2]
 
         # Görüntüyü kırpma
-        image = crop_borders(image)
+        with trace.stage('crop'):
+            image = crop_borders(image)
 
         # Görüntüyü hizalama
-        aligned_image = align_image_with_feature_matching(image, template, config)
-        if aligned_image is None:
-            aligned_image = alternative_alignment_method(image, template, config)
+        with trace.stage('align'):
+            aligned_image, alignment_scale = align_image_with_feature_matching(image, template, config)
             if aligned_image is None:
-                logger.error("Hizalama başarısız oldu.")
-                return {"error": "Hizalama başarısız oldu."}
+                aligned_image = alternative_alignment_method(image, template, config)
+        if aligned_image is None:
+            logger.error("Hizalama başarısız oldu.")
+            return {"error": "Hizalama başarısız oldu."}
+        trace.alignment_scale = alignment_scale
+        trace.aligned_size = aligned_image.shape[:2]
 
         # Ön işleme
-        deskewed_image, thresh = preprocess_image(aligned_image, config)
+        with trace.stage('preprocess'):
+            deskewed_image, thresh = preprocess_image(aligned_image, config)
         if deskewed_image is None or thresh is None:
             logger.error("Ön işleme başarısız.")
             return {"error": "Ön işleme başarısız."}
@@ -981,15 +1544,22 @@ def process_image(image_path: str, config: Dict) -> Dict:
             'height': config['dynamic_roi']['answer_area']['height'],
             'extra_width': config['dynamic_roi']['answer_area'].get('extra_width', 0),
             'extra_height': config['dynamic_roi']['answer_area'].get('extra_height', 0),
+            'heading_box': config['dynamic_roi']['answer_area'].get('heading_box'),
             'min_text_length': config['dynamic_roi'].get('answer_heading_min_text_length', 6),
             'max_text_length': config['dynamic_roi'].get('answer_heading_max_text_length', 15)
         }
-        answer_coords = find_heading_coordinates(
-            aligned_image,
-            [answer_heading_text],
-            config,
-            answer_area_config
-        )
+        # OCR gerekiyorsa görüntü başına tek bir kez yapılır ve tüm alanlarda paylaşılır
+        with trace.stage('ocr'):
+            ocr_result = get_ocr_result(aligned_image, config) if config['dynamic_roi'].get('locator') == 'ocr' else None
+        with trace.stage('locate'):
+            answer_coords = locate_roi(
+                aligned_image,
+                template,
+                [answer_heading_text],
+                config,
+                answer_area_config,
+                ocr_result
+            )
         if answer_coords is None:
             logger.error("Cevap alanı koordinatları bulunamadı.")
             return {"error": "Cevap alanı bulunamadı."}
@@ -1003,30 +1573,41 @@ def process_image(image_path: str, config: Dict) -> Dict:
             'height': config['dynamic_roi']['student_number_area']['height'],
             'extra_width': config['dynamic_roi']['student_number_area'].get('extra_width', 0),
             'extra_height': config['dynamic_roi']['student_number_area'].get('extra_height', 0),
+            'heading_box': config['dynamic_roi']['student_number_area'].get('heading_box'),
             'min_text_length': config['dynamic_roi'].get('student_number_heading_min_text_length', 10),
             'max_text_length': config['dynamic_roi'].get('student_number_heading_max_text_length', 20)
         }
-        student_number_coords = find_heading_coordinates(
-            aligned_image,
-            [student_heading_text],
-            config,
-            student_area_config
-        )
+        student_number_confidence = []
+        with trace.stage('locate'):
+            student_number_coords = locate_roi(
+                aligned_image,
+                template,
+                [student_heading_text],
+                config,
+                student_area_config,
+                ocr_result
+            )
         if student_number_coords is None:
             logger.error("Öğrenci numarası alanı koordinatları bulunamadı.")
             student_number = "Unknown"
         else:
-            student_number_area = extract_roi(
-                thresh,
-                student_number_coords,
-                "student_number_area",
-                config
-            )
+            with trace.stage('extract_roi'):
+                student_number_area = extract_roi(
+                    thresh,
+                    student_number_coords,
+                    "student_number_area",
+                    config
+                )
             if student_number_area is None:
                 logger.error("Öğrenci numarası alanı çıkarılamadı.")
                 student_number = "Unknown"
             else:
-                student_number = extract_student_number(student_number_area, config)
+                with trace.stage('student_number'):
+                    student_number, student_number_confidence = read_student_number(
+                        student_number_area,
+                        config,
+                        layout.student_number if layout else None
+                    )
 
         # Test grubu alanını bulma
         test_group_heading_text = config['dynamic_roi']['test_group_heading_text']
@@ -1037,37 +1618,56 @@ def process_image(image_path: str, config: Dict) -> Dict:
             'height': config['dynamic_roi']['test_group_area']['height'],
             'extra_width': config['dynamic_roi']['test_group_area'].get('extra_width', 0),
             'extra_height': config['dynamic_roi']['test_group_area'].get('extra_height', 0),
+            'heading_box': config['dynamic_roi']['test_group_area'].get('heading_box'),
             'min_text_length': config['dynamic_roi'].get('test_group_heading_min_text_length', 8),
             'max_text_length': config['dynamic_roi'].get('test_group_heading_max_text_length', 10)
         }
-        test_group_coords = find_heading_coordinates(
-            aligned_image,
-            [test_group_heading_text],
-            config,
-            test_group_area_config
-        )
+        with trace.stage('locate'):
+            test_group_coords = locate_roi(
+                aligned_image,
+                template,
+                [test_group_heading_text],
+                config,
+                test_group_area_config,
+                ocr_result
+            )
+        test_group, test_group_confidence = None, 0.0
         if test_group_coords is None:
             logger.error("Test grubu alanı koordinatları bulunamadı.")
-            test_group = None
         else:
-            test_group = extract_test_group(
-                thresh,
-                test_group_coords,
-                config
-            )
+            with trace.stage('extract_roi'):
+                test_group_area = extract_roi(thresh, test_group_coords, "test_group_area", config)
+            if test_group_area is None:
+                logger.error("Test grubu alanı çıkarılamadı.")
+            else:
+                with trace.stage('test_group'):
+                    test_group, test_group_confidence = read_test_group(
+                        test_group_area,
+                        config,
+                        layout.test_group if layout else None
+                    )
 
         # Cevapları çıkarma
-        answers = extract_answers(
-            thresh,
-            answer_coords,
-            config
-        )
+        with trace.stage('answers'):
+            answers = extract_answers(
+                thresh,
+                answer_coords,
+                config,
+                layout.answers if layout else None
+            )
         if not answers:
             logger.error("Cevaplar çıkarılamadı.")
             return {"error": "Cevaplar çıkarılamadı."}
 
         # Sonuçları kaydetme
-        results = save_results(answers, student_number, test_group, config)
+        with trace.stage('save_results'):
+            results = save_results(answers, student_number, test_group, config)
+        if 'error' not in results:
+            results['alignment_scale'] = alignment_scale
+            results['confidence'] = {
+                'student_number': student_number_confidence,
+                'test_group': test_group_confidence
+            }
 
         # Görselleştirme
         rois = [
@@ -1075,10 +1675,15 @@ def process_image(image_path: str, config: Dict) -> Dict:
             ("Student Number Area", student_number_coords),
             ("Test Group Area", test_group_coords)
         ]
-        visualize_results(aligned_image.copy(), rois, config)
-
-        # Veritabanına kaydetme
-        save_results_to_db(results)
+        with trace.stage('visualize'):
+            visualize_results(aligned_image.copy(), rois, config)
+
+        # Veritabanına kaydetme; hatalı sonuç kaydedilmez, kaydedilemeyen sonuç hata döner
+        if save_to_db and 'error' not in results:
+            with trace.stage('db'):
+                saved = save_results_to_db(results)
+            if not saved:
+                return {"error": "Sonuçlar veritabanına kaydedilemedi."}
         logger.info("Tüm işlemler başarıyla tamamlandı.")
         return results
     except Exception as e:
@@ -1086,32 +1691,43 @@ def process_image(image_path: str, config: Dict) -> Dict:
         return {"error": "İşlem sırasında bir hata oluştu."}
 
 
-def process_answer_key_image(image_path: str, config: Dict) -> Dict:
+def process_answer_key_image(image_source: ImageSource, config: Dict) -> Dict:
     """
     Cevap anahtarı görüntüsünü işleyerek test grubu ve cevap anahtarını çıkarır.
+    Görüntü dosya yolu, bellekteki kodlanmış veri veya BGR dizi olarak verilebilir.
+    Cevap anahtarları seyrek işlendiğinden ara görüntüleri örneklemeden bağımsız kaydedilir.
     """
+    with collecting_artifacts(config, always=True) as artifacts:
+        results = _process_answer_key_image(image_source, config)
+    commit_artifacts(artifacts, results)
+    return results
+
+
+def _process_answer_key_image(image_source: ImageSource, config: Dict) -> Dict:
     try:
         setup_logging(config)
 
-        # Şablon görüntüyü yükleme
-        template = load_template(config['template_matching']['template_path'])
+        # Şablon görüntüyü ve özniteliklerini yükleme (süreç içinde önbellekli)
+        template = get_template_features(config)
         if template is None:
             logger.error("Şablon görüntü yüklenemedi.")
             return {"error": "Şablon görüntü yüklenemedi."}
+        # Baloncuk geometrisi şablon + konfigürasyon için bir kez derlenir
+        layout = get_form_layout(config)
 
         # Görüntüyü yükleme
-        image = cv2.imread(image_path)
+        image = decode_image(image_source)
         if image is None:
-            logger.error(f"Cevap anahtarı görüntüsü yüklenemedi: {image_path}")
+            logger.error(f"Cevap anahtarı görüntüsü yüklenemedi: {describe_image_source(image_source)}")
             return {"error": "Cevap anahtarı görüntüsü yüklenemedi."}
 
-        logger.info(f"Cevap anahtarı görüntüsü yüklendi: {image_path}")
+        logger.info(f"Cevap anahtarı görüntüsü yüklendi: {describe_image_source(image_source)}")
 
         # Görüntüyü kırpma
         image = crop_borders(image)
 
         # Görüntüyü hizalama
-        aligned_image = align_image_with_feature_matching(image, template, config)
+        aligned_image, alignment_scale = align_image_with_feature_matching(image, template, config)
         if aligned_image is None:
             aligned_image = alternative_alignment_method(image, template, config)
             if aligned_image is None:
@@ -1133,14 +1749,19 @@ def process_answer_key_image(image_path: str, config: Dict) -> Dict:
             'height': config['dynamic_roi']['answer_key_area']['height'],
             'extra_width': config['dynamic_roi']['answer_key_area'].get('extra_width', 0),
             'extra_height': config['dynamic_roi']['answer_key_area'].get('extra_height', 0),
+            'heading_box': config['dynamic_roi']['answer_key_area'].get('heading_box'),
             'min_text_length': config['dynamic_roi'].get('answer_key_heading_min_text_length', 6),
             'max_text_length': config['dynamic_roi'].get('answer_key_heading_max_text_length', 15)
         }
-        answer_coords = find_heading_coordinates(
+        # OCR gerekiyorsa görüntü başına tek bir kez yapılır ve tüm alanlarda paylaşılır
+        ocr_result = get_ocr_result(aligned_image, config) if config['dynamic_roi'].get('locator') == 'ocr' else None
+        answer_coords = locate_roi(
             aligned_image,
+            template,
             [answer_heading_text],
             config,
-            answer_area_config
+            answer_area_config,
+            ocr_result
         )
         if answer_coords is None:
             logger.error("Cevap alanı koordinatları bulunamadı.")
@@ -1155,14 +1776,17 @@ def process_answer_key_image(image_path: str, config: Dict) -> Dict:
             'height': config['dynamic_roi']['test_group_area']['height'],
             'extra_width': config['dynamic_roi']['test_group_area'].get('extra_width', 0),
             'extra_height': config['dynamic_roi']['test_group_area'].get('extra_height', 0),
+            'heading_box': config['dynamic_roi']['test_group_area'].get('heading_box'),
             'min_text_length': config['dynamic_roi'].get('test_group_heading_min_text_length', 8),
             'max_text_length': config['dynamic_roi'].get('test_group_heading_max_text_length', 10)
         }
-        test_group_coords = find_heading_coordinates(
+        test_group_coords = locate_roi(
             aligned_image,
+            template,
             [test_group_heading_text],
             config,
-            test_group_area_config
+            test_group_area_config,
+            ocr_result
         )
         if test_group_coords is None:
             logger.error("Test grubu alanı koordinatları bulunamadı.")
@@ -1171,7 +1795,8 @@ def process_answer_key_image(image_path: str, config: Dict) -> Dict:
             test_group = extract_test_group(
                 thresh,
                 test_group_coords,
-                config
+                config,
+                layout.test_group if layout else None
             )
             if test_group is None:
                 logger.error("Test grubu çıkarılamadı.")
@@ -1181,7 +1806,8 @@ def process_answer_key_image(image_path: str, config: Dict) -> Dict:
         answers = extract_answers(
             thresh,
             answer_coords,
-            config
+            config,
+            layout.answer_key if layout else None
         )
         if not answers:
             logger.error("Cevaplar çıkarılamadı.")
@@ -1189,6 +1815,8 @@ def process_answer_key_image(image_path: str, config: Dict) -> Dict:
 
         # Sonuçları kaydetme
         results = save_answer_key_results(answers, test_group, config)
+        if 'error' not in results:
+            results['alignment_scale'] = alignment_scale
 
         # Görselleştirme
         rois = [
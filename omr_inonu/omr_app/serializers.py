@@ -2,10 +2,27 @@ from rest_framework import serializers
 from django.db.models import Q
 from .models import (
     Course, TestGroup, ColumnMapping,
-    AnswerKey, Student, StudentAnswer
+    AnswerKey, Student, StudentAnswer, ScanJob
 )
 
-class CourseSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    GET isteklerinde '?fields=id,name' parametresiyle yalnızca istenen alanları döndürür.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     column_number = serializers.SerializerMethodField(read_only=True)
     test_group = serializers.PrimaryKeyRelatedField(
         queryset=TestGroup.objects.all(),
@@ -18,8 +35,9 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'code', 'description', 'column_number', 'test_group', 'total_questions']
 
     def get_column_number(self, obj):
-        mapping = obj.course_columns.first()
-        return mapping.column_number if mapping else None
+        # all() önceden yüklenmiş eşleşmeleri kullanır; first() her ders için yeni sorgu açardı
+        mappings = sorted(obj.course_columns.all(), key=lambda mapping: mapping.pk)
+        return mappings[0].column_number if mappings else None
 
     def create(self, validated_data):
         test_group = validated_data.pop('test_group', None)
@@ -48,7 +66,7 @@ class CourseSerializer(serializers.ModelSerializer):
         return instance
 
 
-class TestGroupSerializer(serializers.ModelSerializer):
+class TestGroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TestGroup
         fields = ['id', 'name', 'total_questions']
@@ -59,7 +77,7 @@ class TestGroupSerializer(serializers.ModelSerializer):
         return value
 
 
-class ColumnMappingSerializer(serializers.ModelSerializer):
+class ColumnMappingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # DİKKAT: Aynı alan adları hem write_only hem de read_only olarak tekrar kullanılmış.
     course = serializers.PrimaryKeyRelatedField(
         queryset=Course.objects.all(),
@@ -98,7 +116,7 @@ class ColumnMappingSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class AnswerKeySerializer(serializers.ModelSerializer):
+class AnswerKeySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     course = serializers.PrimaryKeyRelatedField(
         queryset=Course.objects.all(),
         write_only=True
@@ -137,10 +155,11 @@ class AnswerKeySerializer(serializers.ModelSerializer):
         return answer_key
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
-        fields = ['id', 'student_number', 'results'] 
+        fields = ['id', 'student_number', 'results', 'total_correct', 'total_incorrect', 'overall_score']
+        read_only_fields = ['total_correct', 'total_incorrect', 'overall_score']
 
     def validate_student_number(self, value):
         if not value:
@@ -148,7 +167,7 @@ class StudentSerializer(serializers.ModelSerializer):
         return value
 
 
-class StudentAnswerSerializer(serializers.ModelSerializer):
+class StudentAnswerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     course = serializers.PrimaryKeyRelatedField(
         queryset=Course.objects.all(),
         write_only=True
@@ -201,3 +220,26 @@ class StudentAnswerSerializer(serializers.ModelSerializer):
         ).exists():
             raise serializers.ValidationError("Bu soru için bir cevap anahtarı bulunamadı.")
         return attrs
+
+
+class ScanJobSerializer(serializers.ModelSerializer):
+    queue_seconds = serializers.FloatField(read_only=True)
+    processing_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ScanJob
+        fields = [
+            'id',
+            'batch',
+            'status',
+            'original_name',
+            'attempts',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'queue_seconds',
+            'processing_seconds',
+            'result',
+            'error',
+        ]
+        read_only_fields = fields
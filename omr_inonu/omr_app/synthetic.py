@@ -0,0 +1,174 @@
+import random
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .scanner import BubbleLayout, _roi_origin, build_form_layout
+
+# İşaretlerin rengi (BGR); kurşun kalem dolgusuna yakın koyu gri
+MARK_COLOR = (40, 40, 40)
+
+
+class SheetSpec(NamedTuple):
+    """
+    Sentetik bir formun içeriği: sütun -> soru -> seçenek harfi (boş için None),
+    öğrenci numarası ve test grubu.
+    """
+    answers: Dict[str, Dict[str, Optional[str]]]
+    student_number: str
+    test_group: str
+
+
+class Distortion(NamedTuple):
+    """
+    Taranmış görüntüyü taklit eden bozulmalar: derece cinsinden dönme, ölçek, Gauss bulanıklığı
+    çekirdek boyutu (0: yok), gürültü standart sapması ve JPEG kalitesi.
+    """
+    rotation: float = 0.0
+    scale: float = 1.0
+    blur: int = 0
+    noise: float = 0.0
+    jpeg_quality: int = 90
+
+
+def random_sheet_spec(rng: random.Random, config: Dict, blank_rate: float = 0.1) -> SheetSpec:
+    """
+    Rastgele cevaplar (blank_rate oranında boş), öğrenci numarası ve test grubu üretir.
+    """
+    num_choices = config['extract_answers']['num_choices']
+    answers = {
+        str(col + 1): {
+            str(q + 1): None if rng.random() < blank_rate else chr(65 + rng.randrange(num_choices))
+            for q in range(config['extract_answers']['num_questions'])
+        }
+        for col in range(config['extract_answers']['num_columns'])
+    }
+    digits = config['extract_student_number']['num_digits']
+    student_number = ''.join(str(rng.randrange(10)) for _ in range(digits))
+    test_group = rng.choice(config['extract_test_group']['groups'])
+    return SheetSpec(answers, student_number, test_group)
+
+
+def random_distortion(
+    rng: random.Random,
+    max_rotation: float = 0.0,
+    scale_jitter: float = 0.0,
+    blur: int = 0,
+    noise: float = 0.0,
+    jpeg_quality: int = 90
+) -> Distortion:
+    return Distortion(
+        rotation=rng.uniform(-max_rotation, max_rotation),
+        scale=1.0 + rng.uniform(-scale_jitter, scale_jitter),
+        blur=blur,
+        noise=noise,
+        jpeg_quality=jpeg_quality
+    )
+
+
+def _absolute_centers(config: Dict, area_name: str, bubbles: BubbleLayout) -> np.ndarray:
+    origin, _ = _roi_origin(config['dynamic_roi'][area_name])
+    return bubbles.centers + np.array(origin)
+
+
+def _mark(image: np.ndarray, center: np.ndarray, radius: float):
+    point = tuple(int(v) for v in np.rint(center))
+    cv2.circle(image, point, max(1, int(radius) - 1), MARK_COLOR, -1, lineType=cv2.LINE_AA)
+
+
+def mark_sheet(template: np.ndarray, config: Dict, spec: SheetSpec) -> np.ndarray:
+    """
+    Şablon görüntüsü üzerinde, form geometrisindeki baloncukları spec'e göre doldurur.
+    """
+    layout = build_form_layout(config)
+    if layout is None or layout.answers is None:
+        raise ValueError("Sentetik form için 'form_layout' tanımlı olmalıdır.")
+    image = template.copy()
+
+    answer_centers = _absolute_centers(config, 'answer_area', layout.answers)
+    for col, column in spec.answers.items():
+        for question, answer in column.items():
+            if answer is not None:
+                _mark(image, answer_centers[int(col) - 1, int(question) - 1, ord(answer) - 65], layout.answers.radius)
+
+    student_centers = _absolute_centers(config, 'student_number_area', layout.student_number)
+    for index, digit in enumerate(spec.student_number):
+        if digit.isdigit():
+            _mark(image, student_centers[index, int(digit)], layout.student_number.radius)
+
+    group_centers = _absolute_centers(config, 'test_group_area', layout.test_group)
+    groups = config['extract_test_group']['groups']
+    _mark(image, group_centers[groups.index(spec.test_group)], layout.test_group.radius)
+    return image
+
+
+def distort(image: np.ndarray, distortion: Distortion, seed: int = 0) -> bytes:
+    """
+    Görüntüye dönme/ölçek, bulanıklık ve gürültü uygular ve JPEG olarak kodlar.
+    """
+    h, w = image.shape[:2]
+    if distortion.rotation or distortion.scale != 1.0:
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), distortion.rotation, distortion.scale)
+        image = cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR, borderValue=(255, 255, 255))
+    if distortion.blur > 1:
+        kernel = distortion.blur | 1
+        image = cv2.GaussianBlur(image, (kernel, kernel), 0)
+    if distortion.noise > 0:
+        noise = np.random.default_rng(seed).normal(0, distortion.noise, image.shape)
+        image = np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(distortion.jpeg_quality)])
+    if not ok:
+        raise ValueError("Sentetik form JPEG olarak kodlanamadı.")
+    return encoded.tobytes()
+
+
+def render_sheet(
+    template: np.ndarray,
+    config: Dict,
+    spec: SheetSpec,
+    distortion: Distortion = Distortion(),
+    seed: int = 0
+) -> bytes:
+    """
+    Doldurulmuş ve bozulmaları uygulanmış sentetik formu JPEG verisi olarak döner.
+    """
+    return distort(mark_sheet(template, config, spec), distortion, seed)
+
+
+def score_read(spec: SheetSpec, result: Dict) -> Dict[str, float]:
+    """
+    İşlem sonucunu beklenen içerikle karşılaştırır: doğru okunan soru oranı,
+    öğrenci numarası ve test grubu eşleşmesi.
+    """
+    if 'error' in result:
+        return {'answers': 0.0, 'student_number': 0.0, 'test_group': 0.0}
+    expected = [
+        (col, question, answer)
+        for col, column in spec.answers.items()
+        for question, answer in column.items()
+    ]
+    read = result.get('answers', {})
+    matched = sum(1 for col, question, answer in expected if read.get(col, {}).get(question) == answer)
+    return {
+        'answers': matched / len(expected) if expected else 1.0,
+        'student_number': float(result.get('student_number') == spec.student_number),
+        'test_group': float(result.get('test_group') == spec.test_group),
+    }
+
+
+def heading_lines(config: Dict) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    """
+    Sahte OCR sunucusu için şablon uzayındaki başlık metinleri ve kutuları (LocalOCRServer biçiminde).
+    """
+    dynamic_roi = config['dynamic_roi']
+    lines = []
+    for text_key, area_name in (
+        ('answer_heading_text', 'answer_area'),
+        ('student_number_heading_text', 'student_number_area'),
+        ('test_group_heading_text', 'test_group_area'),
+    ):
+        box = (dynamic_roi.get(area_name) or {}).get('heading_box')
+        if box:
+            lines.append((dynamic_roi[text_key], tuple(int(v) for v in box)))
+    return lines
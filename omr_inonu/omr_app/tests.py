@@ -1,5 +1,68 @@
-from django.test import TestCase
-from .models import Course, TestGroup, AnswerKey, Student, StudentAnswer
+import codecs
+import csv
+import io
+import json
+import os
+import random
+import threading
+from datetime import timedelta
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from django.conf import settings
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import Course, TestGroup, AnswerKey, Student, StudentAnswer, ColumnMapping, ScanJob, deferred_scoring
+from .batch import close_connections_before_fork, get_batch_workers, iter_scan_images, scan_images, zip_image_entries
+from .grading import grade_students, refresh_correctness
+from .jobs import claim_next_job, enqueue_scan, requeue_stale_jobs, run_worker
+from .artifacts import (
+    ArtifactWriter, collecting_artifacts, commit_artifacts, get_artifact_writer, is_low_confidence,
+    prune_artifacts, save_artifact
+)
+from .exports import EXPORT_CHUNK_SIZE
+from .metrics import METRICS, Histogram, SheetTrace, tracing
+from .synthetic import Distortion, random_sheet_spec, render_sheet, score_read
+from .ocr import LocalOCRServer, OCRSpaceBackend, get_ocr_backend, perform_ocr
+from . import scanner
+from .scanner import (
+    load_config, get_template_features, estimate_alignment_scale,
+    get_alignment_scales, align_image_with_feature_matching, locate_roi,
+    find_heading_coordinates, get_ocr_result, compute_answer_fill_ratios,
+    decode_answer_grid, detect_filled_option, compute_student_number_fill_ratios,
+    read_student_number, read_test_group, get_form_layout, preprocess_image,
+    roi_from_heading, extract_answers, save_results_to_db, decode_image, process_image
+)
+
+
+def isolated_config(test_case: TestCase) -> dict:
+    """
+    Gerçek config.yaml'ı yükler; şablon öznitelik önbelleğini, hata ayıklama görüntülerini ve
+    günlük dosyasını kaynak ağacı yerine test bitince silinen geçici bir klasöre yönlendirir.
+    """
+    config = load_config(os.path.join(settings.BASE_DIR, 'config.yaml'))
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    # Arka planda yazılan görüntüler klasör silinmeden önce bitmiş olmalı
+    test_case.addCleanup(lambda: get_artifact_writer(config).flush())
+    config['feature_matching']['cache_directory'] = os.path.join(directory.name, 'templates')
+    config['logging']['log_file'] = os.path.join(directory.name, 'logs', 'omr_processing.log')
+    for key in ('debug_images_directory', 'rois_directory', 'visualization_directory'):
+        config['output'][key] = os.path.join(directory.name, key)
+    return config
+
 
 class GradingSystemTests(TestCase):
 
@@ -53,3 +116,1257 @@ class GradingSystemTests(TestCase):
     def test_no_answer_grading(self):
         self.student.refresh_from_db()
         self.assertEqual(self.student.grades.get(self.course.code), 0)
+
+
+class BatchProcessingTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+
+    def test_zip_image_entries_skips_non_images(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('scans/sheet1.jpg', b'not-an-image')
+            archive.writestr('scans/notes.txt', b'text')
+            archive.writestr('__MACOSX/scans/._sheet1.jpg', b'meta')
+        buffer.seek(0)
+        with zipfile.ZipFile(buffer) as archive:
+            self.assertEqual([info.filename for info in zip_image_entries(archive)], ['scans/sheet1.jpg'])
+
+    def test_batch_view_requires_images(self):
+        response = self.client.post(reverse('omr-process-batch'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_view_enqueues_jobs(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('scans/b.jpg', b'image-b')
+            archive.writestr('scans/notes.txt', b'text')
+        archive_file = SimpleUploadedFile('scans.zip', buffer.getvalue(), content_type='application/zip')
+        image = SimpleUploadedFile('a.jpg', b'image-a', content_type='image/jpeg')
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(reverse('omr-process-batch'), {'images': [image], 'archive': archive_file})
+            self.assertEqual(response.status_code, 202)
+            jobs = ScanJob.objects.order_by('pk')
+            self.assertEqual(response.json()['job_ids'], [job.pk for job in jobs])
+            self.assertEqual([job.original_name for job in jobs], ['a.jpg', 'b.jpg'])
+            self.assertEqual(jobs[1].image.read(), b'image-b')
+            jobs[1].image.close()
+            self.assertTrue(all(job.status == ScanJob.PENDING for job in jobs))
+            self.assertTrue(all(job.batch_id == response.json()['batch_id'] for job in jobs))
+
+    def test_batch_report_aggregates_job_results(self):
+        images = [SimpleUploadedFile(f'{name}.jpg', b'image', content_type='image/jpeg') for name in 'abc']
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            batch_id = self.client.post(reverse('omr-process-batch'), {'images': images}).json()['batch_id']
+            results = [{'student_number': '123', 'answers': {}}, {'error': 'Hizalama başarısız oldu.'}]
+            with mock.patch('omr_app.jobs.process_image', side_effect=results):
+                run_worker(self.config, max_jobs=2)
+
+            report = self.client.get(reverse('scan-batch-detail', args=[batch_id])).json()
+        self.assertEqual(
+            {key: report[key] for key in ('total', 'pending', 'processing', 'done', 'failed', 'finished')},
+            {'total': 3, 'pending': 1, 'processing': 0, 'done': 1, 'failed': 1, 'finished': False}
+        )
+        self.assertEqual([sheet['file'] for sheet in report['sheets']], ['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual(report['sheets'][0]['result']['student_number'], '123')
+        self.assertEqual(report['sheets'][1]['error'], 'Hizalama başarısız oldu.')
+        self.assertEqual(report['sheets'][2]['status'], ScanJob.PENDING)
+        self.assertEqual(self.client.get(reverse('scan-batch-detail', args=[batch_id + 1])).status_code, 404)
+
+    def test_batch_view_removes_saved_images_on_rollback(self):
+        images = [SimpleUploadedFile(f'{name}.jpg', b'image', content_type='image/jpeg') for name in 'abc']
+
+        def failing_enqueue(image_file, batch=None):
+            # İlk iki görüntü kaydedildikten sonra üçüncüde hata oluşur
+            if image_file.name == 'c.jpg':
+                raise OSError('disk dolu')
+            return enqueue_scan(image_file, batch=batch)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('omr_app.views.enqueue_scan', side_effect=failing_enqueue):
+            response = self.client.post(reverse('omr-process-batch'), {'images': images})
+            self.assertEqual(response.status_code, 500)
+            self.assertFalse(ScanJob.objects.exists())
+            self.assertEqual(os.listdir(os.path.join(media_root, 'scan_jobs')), [])
+
+    def test_batch_view_limits_total_size(self):
+        self.config['batch']['max_upload_bytes'] = 10
+        image = SimpleUploadedFile('a.jpg', b'x' * 11, content_type='image/jpeg')
+        with mock.patch('omr_app.views.load_configuration', return_value=self.config):
+            response = self.client.post(reverse('omr-process-batch'), {'images': [image]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ScanJob.objects.exists())
+
+    def test_connections_in_atomic_block_are_kept_open(self):
+        # TestCase her testi bir işlem içinde çalıştırır
+        Course.objects.create(name="Math", code="MATH101")
+        with mock.patch.object(connection, 'close') as close:
+            close_connections_before_fork()
+        close.assert_not_called()
+
+
+class ScanBatchCommandTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as image_file:
+            image_file.write(data)
+        return path
+
+    def test_iter_scan_images_sources(self):
+        self.write('scans/b.jpg', b'b')
+        self.write('scans/a.png', b'a')
+        self.write('scans/notes.txt', b'text')
+        scans = os.path.join(self.directory, 'scans')
+        self.assertEqual(list(iter_scan_images(scans)), [('a.png', b'a'), ('b.jpg', b'b')])
+        self.assertEqual([name for name, _ in iter_scan_images(scans, skip={'a.png'})], ['b.jpg'])
+        self.assertEqual(
+            [name for name, _ in iter_scan_images(os.path.join(scans, '*.jpg'))],
+            [os.path.join(scans, 'b.jpg')]
+        )
+
+        archive_path = os.path.join(self.directory, 'scans.tar.gz')
+        with tarfile.open(archive_path, 'w:gz') as archive:
+            archive.add(scans, arcname='scans')
+        self.assertEqual([name for name, _ in iter_scan_images(archive_path)], ['scans/a.png', 'scans/b.jpg'])
+        with self.assertRaises(FileNotFoundError):
+            list(iter_scan_images(os.path.join(self.directory, 'missing')))
+
+    def test_scan_images_bounds_in_flight_images(self):
+        read = []
+
+        def images():
+            for index in range(6):
+                read.append(index)
+                yield f"{index}.jpg", b'broken'
+
+        results = scan_images(images(), self.config, workers=2, max_in_flight=2)
+        name, result = next(results)
+        # İlk sonuç alındığında kaynaktan en fazla 'max_in_flight' görüntü okunmuş olmalı
+        self.assertLessEqual(len(read), 3)
+        self.assertIn('error', result)
+        self.assertEqual(len(list(results)) + 1, 6)
+
+    def test_command_writes_jsonl_saves_to_db_and_resumes(self):
+        template = cv2.imread(os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path']))
+        spec = random_sheet_spec(random.Random(5), self.config, blank_rate=0.0)
+        archive_path = os.path.join(self.directory, 'scans.zip')
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            archive.writestr('1.jpg', render_sheet(template, self.config, spec))
+            archive.writestr('2.jpg', b'broken')
+        output = os.path.join(self.directory, 'results.jsonl')
+        checkpoint = os.path.join(self.directory, 'checkpoint.txt')
+        with open(checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write('0.jpg\n')
+
+        with mock.patch('omr_app.management.commands.scan_batch.load_config', return_value=self.config):
+            call_command(
+                'scan_batch', archive_path, output=output, save_db=True, checkpoint=checkpoint,
+                workers=1, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        with open(output, encoding='utf-8') as output_file:
+            records = [json.loads(line) for line in output_file]
+        self.assertEqual([(record['file'], record['status']) for record in records], [('1.jpg', 'ok'), ('2.jpg', 'error')])
+        self.assertEqual(records[0]['result']['student_number'], spec.student_number)
+        self.assertTrue(Student.objects.filter(student_number=spec.student_number).exists())
+
+        # Tüm görüntüler kontrol noktasında olduğundan ikinci çalıştırma hiçbir şey işlemez
+        with mock.patch('omr_app.management.commands.scan_batch.load_config', return_value=self.config):
+            call_command(
+                'scan_batch', archive_path, output=output, checkpoint=checkpoint,
+                workers=1, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        with open(output, encoding='utf-8') as output_file:
+            self.assertEqual(len(output_file.readlines()), 2)
+        with open(checkpoint, encoding='utf-8') as checkpoint_file:
+            self.assertEqual(checkpoint_file.read().split(), ['0.jpg', '1.jpg', '2.jpg'])
+
+    def test_unsaved_sheets_are_not_checkpointed(self):
+        self.write('scans/a.jpg', b'a')
+        self.write('scans/b.jpg', b'b')
+        output = os.path.join(self.directory, 'results.jsonl')
+        checkpoint = os.path.join(self.directory, 'checkpoint.txt')
+        sheet = {'student_number': '1', 'test_group': 'A', 'answers': {}}
+        with mock.patch('omr_app.management.commands.scan_batch.load_config', return_value=self.config), \
+                mock.patch('omr_app.management.commands.scan_batch.scan_images',
+                           return_value=iter([('a.jpg', sheet), ('b.jpg', sheet)])), \
+                mock.patch('omr_app.management.commands.scan_batch.save_results_to_db', side_effect=[True, False]):
+            call_command(
+                'scan_batch', os.path.join(self.directory, 'scans'), output=output, save_db=True,
+                checkpoint=checkpoint, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        with open(checkpoint, encoding='utf-8') as checkpoint_file:
+            self.assertEqual(checkpoint_file.read().split(), ['a.jpg'])
+        with open(output, encoding='utf-8') as output_file:
+            self.assertEqual([json.loads(line)['file'] for line in output_file], ['a.jpg'])
+
+    def test_default_workers_come_from_batch_config(self):
+        self.write('scans/a.jpg', b'a')
+        self.config['batch']['max_workers'] = 3
+        with mock.patch('omr_app.management.commands.scan_batch.load_config', return_value=self.config), \
+                mock.patch('omr_app.management.commands.scan_batch.scan_images', return_value=iter([])) as scan:
+            call_command(
+                'scan_batch', os.path.join(self.directory, 'scans'), output=os.path.join(self.directory, 'out.jsonl'),
+                stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        self.assertEqual(scan.call_args.args[2], 3)
+        self.assertEqual(get_batch_workers(self.config, 2), 2)
+
+    def test_resume_drops_output_lines_missing_from_checkpoint(self):
+        self.write('scans/a.jpg', b'broken')
+        self.write('scans/b.jpg', b'broken')
+        output = os.path.join(self.directory, 'results.jsonl')
+        checkpoint = os.path.join(self.directory, 'checkpoint.txt')
+        # Önceki çalıştırma b.jpg satırını yazdıktan sonra, kontrol noktasına yazamadan kesilmiş
+        with open(output, 'w', encoding='utf-8') as output_file:
+            output_file.write(json.dumps({'file': 'a.jpg', 'status': 'error', 'error': 'x'}) + '\n')
+            output_file.write(json.dumps({'file': 'b.jpg', 'status': 'error', 'error': 'x'}) + '\n')
+        with open(checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write('a.jpg\n')
+        with mock.patch('omr_app.management.commands.scan_batch.load_config', return_value=self.config):
+            call_command(
+                'scan_batch', os.path.join(self.directory, 'scans'), output=output, checkpoint=checkpoint,
+                workers=1, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        with open(output, encoding='utf-8') as output_file:
+            self.assertEqual([json.loads(line)['file'] for line in output_file], ['a.jpg', 'b.jpg'])
+
+    def test_command_requires_a_destination(self):
+        with self.assertRaises(CommandError):
+            call_command('scan_batch', self.directory, stdout=io.StringIO())
+
+
+class TemplateRegistryTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.cache_dir = tempfile.mkdtemp()
+        self.config['feature_matching']['cache_directory'] = self.cache_dir
+        scanner._TEMPLATE_REGISTRY.clear()
+
+    def tearDown(self):
+        scanner._TEMPLATE_REGISTRY.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_features_are_computed_once_per_process(self):
+        first = get_template_features(self.config)
+        second = get_template_features(self.config)
+        self.assertIs(first, second)
+        self.assertGreater(len(first.keypoints), 0)
+
+    def test_disk_cache_restores_keypoints_and_descriptors(self):
+        computed = get_template_features(self.config)
+        scanner._TEMPLATE_REGISTRY.clear()
+        restored = get_template_features(self.config)
+        self.assertIsNot(computed, restored)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        np.testing.assert_array_equal(computed.descriptors, restored.descriptors)
+        self.assertEqual(computed.keypoints[0].pt, restored.keypoints[0].pt)
+
+
+class AlignmentScaleTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.config['feature_matching']['cache_directory'] = None
+        self.config['output']['save_debug_images'] = False
+        self.template = get_template_features(self.config)
+
+    def test_scale_is_estimated_from_document_size(self):
+        image = cv2.resize(cv2.cvtColor(self.template.image, cv2.COLOR_GRAY2BGR), None, fx=1.25, fy=1.25)
+        scale = estimate_alignment_scale(image, self.template, self.config)
+        self.assertAlmostEqual(scale, 0.8, places=2)
+
+    def test_coarse_to_fine_tries_estimated_scale_first(self):
+        image = cv2.resize(cv2.cvtColor(self.template.image, cv2.COLOR_GRAY2BGR), None, fx=1.25, fy=1.25)
+        scales = get_alignment_scales(image, self.template, self.config)
+        self.assertAlmostEqual(scales[0], 0.8, places=2)
+        self.assertEqual(len(scales), 12)
+
+        self.config['feature_matching']['scale_search'] = 'linear'
+        self.assertEqual(get_alignment_scales(image, self.template, self.config)[0], 0.5)
+
+    def test_alignment_reports_chosen_scale(self):
+        image = cv2.cvtColor(self.template.image, cv2.COLOR_GRAY2BGR)
+        aligned_image, scale = align_image_with_feature_matching(image, self.template, self.config)
+        self.assertEqual(aligned_image.shape[:2], self.template.image.shape)
+        self.assertAlmostEqual(scale, 1.0, places=2)
+
+
+class TemplateRoiLocatorTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.config['feature_matching']['cache_directory'] = None
+        self.template = get_template_features(self.config)
+        self.area_config = dict(self.config['dynamic_roi']['answer_area'])
+
+    @mock.patch('omr_app.scanner.find_heading_coordinates')
+    def test_roi_is_derived_from_template_space_without_ocr(self, find_heading_coordinates):
+        image = cv2.cvtColor(self.template.image, cv2.COLOR_GRAY2BGR)
+        coords = locate_roi(image, self.template, ['CEVAPLAR'], self.config, self.area_config)
+        self.assertEqual(coords, [[455, 982], [1065, 1554]])
+        find_heading_coordinates.assert_not_called()
+
+    def test_template_matching_refines_shifted_heading(self):
+        shift = np.float32([[1, 0, 6], [0, 1, -4]])
+        image = cv2.warpAffine(self.template.image, shift, self.template.image.shape[::-1], borderValue=255)
+        coords = locate_roi(image, self.template, ['CEVAPLAR'], self.config, self.area_config)
+        self.assertEqual(coords, [[461, 978], [1071, 1550]])
+
+    @mock.patch('omr_app.scanner.find_heading_coordinates', return_value=[[1, 2], [3, 4]])
+    def test_ocr_locator_is_opt_in(self, find_heading_coordinates):
+        self.config['dynamic_roi']['locator'] = 'ocr'
+        image = cv2.cvtColor(self.template.image, cv2.COLOR_GRAY2BGR)
+        coords = locate_roi(image, self.template, ['CEVAPLAR'], self.config, self.area_config)
+        self.assertEqual(coords, [[1, 2], [3, 4]])
+        find_heading_coordinates.assert_called_once()
+
+
+class OCRCacheTests(TestCase):
+
+    OCR_RESULT = {
+        "full_text": "CEVAPLAR",
+        "detailed_texts": [{"description": "CEVAPLAR", "bounding_box": [(685, 908), (828, 924)]}]
+    }
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.area_config = dict(self.config['dynamic_roi']['answer_area'])
+        self.image = np.zeros((1600, 1122, 3), dtype=np.uint8)
+        scanner._OCR_CACHE.clear()
+
+    def tearDown(self):
+        scanner._OCR_CACHE.clear()
+
+    @mock.patch('omr_app.scanner.perform_ocr')
+    def test_identical_images_are_recognized_once(self, perform_ocr):
+        perform_ocr.return_value = self.OCR_RESULT
+        for _ in range(3):
+            coords = find_heading_coordinates(self.image, ['CEVAPLAR'], self.config, self.area_config)
+        self.assertEqual(coords, [[455, 982], [1065, 1554]])
+        self.assertEqual(perform_ocr.call_count, 1)
+
+    @mock.patch('omr_app.scanner.perform_ocr')
+    def test_cache_is_bounded_and_skips_errors(self, perform_ocr):
+        self.config['ocr']['cache_size'] = 2
+        perform_ocr.return_value = self.OCR_RESULT
+        for value in range(3):
+            get_ocr_result(np.full((4, 4), value, dtype=np.uint8), self.config)
+        self.assertEqual(len(scanner._OCR_CACHE), 2)
+
+        perform_ocr.return_value = {"full_text": "", "detailed_texts": [], "error": "timeout"}
+        get_ocr_result(np.full((4, 4), 9, dtype=np.uint8), self.config)
+        get_ocr_result(np.full((4, 4), 9, dtype=np.uint8), self.config)
+        self.assertEqual(perform_ocr.call_count, 5)
+
+
+class OCRBackendTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.image = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    def test_local_http_backend_parses_ocr_space_protocol(self):
+        with LocalOCRServer([('CEVAPLAR', (685, 908, 143, 16))]) as server:
+            self.config['ocr']['backend'] = 'local_http'
+            self.config['ocr']['local_http'] = {'url': server.url, 'timeout': 5}
+            result = perform_ocr(self.image, self.config)
+            perform_ocr(self.image, self.config)
+        self.assertEqual(server.request_count, 2)
+        self.assertEqual(result['detailed_texts'][0]['description'], 'CEVAPLAR')
+        self.assertEqual(result['detailed_texts'][0]['bounding_box'], [(685, 908), (828, 924)])
+
+    def test_backend_and_session_are_shared(self):
+        self.config['ocr']['backend'] = 'local_http'
+        first = get_ocr_backend(self.config)
+        self.assertIs(first, get_ocr_backend(self.config))
+        self.assertIsInstance(first, OCRSpaceBackend)
+
+    def test_backend_errors_are_reported_not_raised(self):
+        self.config['ocr']['backend'] = 'unknown'
+        result = perform_ocr(self.image, self.config)
+        self.assertEqual(result['detailed_texts'], [])
+        self.assertIn('error', result)
+
+
+def draw_bubble_grid(shape, rows, cols, marks, radius=8):
+    """Hücre merkezlerine baloncuk çizer; marks[(satır, sütun)] işaretli hücreleri belirtir."""
+    area = np.zeros(shape, dtype=np.uint8)
+    cell_h, cell_w = shape[0] // rows, shape[1] // cols
+    for row in range(rows):
+        for col in range(cols):
+            center = (col * cell_w + cell_w // 2, row * cell_h + cell_h // 2)
+            cv2.circle(area, center, radius, 255, -1 if marks.get((row, col)) else 1)
+    return area
+
+
+class AnswerGridTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+
+    def test_fill_ratio_matrix_shape_and_decoding(self):
+        # 4 sütun x 5 seçenek = 20 hücre genişliğinde, 25 soru yüksekliğinde grid
+        marks = {(0, 0): True, (1, 7): True, (24, 19): True}
+        area = draw_bubble_grid((572, 610), 25, 20, marks)
+        fill_ratios = compute_answer_fill_ratios(area, self.config)
+        self.assertEqual(fill_ratios.shape, (4, 25, 5))
+
+        answers = decode_answer_grid(fill_ratios, self.config['extract_answers']['threshold'])
+        self.assertEqual(answers['1']['1'], 'A')
+        self.assertEqual(answers['2']['2'], 'C')
+        self.assertEqual(answers['4']['25'], 'E')
+        self.assertIsNone(answers['1']['2'])
+
+    def test_vectorized_grid_matches_per_bubble_detection(self):
+        rng = np.random.default_rng(7)
+        marks = {(row, int(rng.integers(0, 20))): True for row in range(25)}
+        area = draw_bubble_grid((572, 610), 25, 20, marks)
+        answers = decode_answer_grid(compute_answer_fill_ratios(area, self.config), 0.3)
+
+        question_height, column_width = 572 // 25, 610 // 4
+        for col in range(4):
+            for q in range(25):
+                cell = area[q * question_height:(q + 1) * question_height, col * column_width:(col + 1) * column_width]
+                expected = detect_filled_option(cell, 5, 0.3)
+                self.assertEqual(answers[str(col + 1)][str(q + 1)], None if expected == -1 else chr(65 + expected))
+
+
+class IdentificationFieldTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+
+    def test_student_number_matrix_and_confidence(self):
+        digits = '20230145678'
+        marks = {(int(digit), index): True for index, digit in enumerate(digits)}
+        area = draw_bubble_grid((230, 253), 10, 11, marks)
+        fill_ratios = compute_student_number_fill_ratios(area, self.config)
+        self.assertEqual(fill_ratios.shape, (11, 10))
+
+        student_number, confidences = read_student_number(area, self.config)
+        self.assertEqual(student_number, digits)
+        self.assertEqual(len(confidences), 11)
+        self.assertTrue(all(confidence > 0.2 for confidence in confidences))
+
+    def test_unmarked_student_digit_is_reported_with_zero_confidence(self):
+        area = draw_bubble_grid((230, 253), 10, 11, {(3, 0): True})
+        student_number, confidences = read_student_number(area, self.config)
+        self.assertEqual(student_number, '3' + '-' * 10)
+        self.assertEqual(confidences[1:], [0.0] * 10)
+
+    def test_test_group_dominance(self):
+        area = draw_bubble_grid((42, 170), 1, 4, {(0, 2): True})
+        self.assertEqual(read_test_group(area, self.config)[0], 'C')
+
+        area = draw_bubble_grid((42, 170), 1, 4, {(0, 1): True, (0, 2): True})
+        self.assertEqual(read_test_group(area, self.config)[0], 'Belirsiz')
+
+
+class FormLayoutTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.config['output']['save_debug_images'] = False
+        self.layout = get_form_layout(self.config)
+        self.template = cv2.imread(os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path']))
+
+    def roi_origin(self, area_name):
+        area_config = self.config['dynamic_roi'][area_name]
+        x, y, w, h = area_config['heading_box']
+        coords = roi_from_heading([[x, y], [x + w, y + h]], area_config, self.template.shape)
+        return coords, np.array(coords[0])
+
+    def mark(self, image, bubbles, origin, index):
+        center = np.rint(bubbles.centers[index] + origin).astype(int)
+        cv2.circle(image, tuple(int(v) for v in center), int(bubbles.radius) - 1, (40, 40, 40), -1)
+
+    def test_layout_is_compiled_once_per_config(self):
+        self.assertEqual(self.layout.answers.centers.shape, (4, 25, 5, 2))
+        self.assertEqual(self.layout.student_number.centers.shape, (11, 10, 2))
+        self.assertEqual(self.layout.test_group.centers.shape, (4, 2))
+        self.assertIs(get_form_layout(self.config), self.layout)
+
+        self.config['form_layout']['answers']['radius'] = 8.0
+        self.assertIsNot(get_form_layout(self.config), self.layout)
+
+        self.config['form_layout']['sampling'] = 'rect'
+        self.assertIsNone(get_form_layout(self.config))
+
+    def test_circular_sampling_decodes_marks_on_printed_template(self):
+        image = self.template.copy()
+        answer_coords, answer_origin = self.roi_origin('answer_area')
+        student_coords, student_origin = self.roi_origin('student_number_area')
+        group_coords, group_origin = self.roi_origin('test_group_area')
+
+        for index in [(0, 0, 1), (1, 5, 3), (3, 24, 4)]:
+            self.mark(image, self.layout.answers, answer_origin, index)
+        digits = '03692581470'
+        for index, digit in enumerate(digits):
+            self.mark(image, self.layout.student_number, student_origin, (index, int(digit)))
+        self.mark(image, self.layout.test_group, group_origin, 2)
+
+        _, thresh = preprocess_image(image, self.config)
+        answers = extract_answers(thresh, answer_coords, self.config, self.layout.answers)
+        marked = {(col, q): answer for col, column in answers.items() for q, answer in column.items() if answer}
+        self.assertEqual(marked, {('1', '1'): 'B', ('2', '6'): 'D', ('4', '25'): 'E'})
+
+        (x1, y1), (x2, y2) = student_coords
+        student_number, _ = read_student_number(thresh[y1:y2, x1:x2], self.config, self.layout.student_number)
+        self.assertEqual(student_number, digits)
+
+        (x1, y1), (x2, y2) = group_coords
+        self.assertEqual(read_test_group(thresh[y1:y2, x1:x2], self.config, self.layout.test_group)[0], 'C')
+
+
+class BulkPersistenceTests(TestCase):
+
+    def setUp(self):
+        self.course = Course.objects.create(name="Math", code="MATH101")
+        self.test_group = TestGroup.objects.create(name="A")
+        ColumnMapping.objects.create(test_group=self.test_group, column_number=1, course=self.course)
+        for question_id in range(1, 26):
+            AnswerKey.objects.create(
+                test_group=self.test_group, course=self.course, question_id=question_id, correct_answer='A'
+            )
+
+    def results(self, answers):
+        return {'student_number': '20230145678', 'test_group': 'A', 'answers': answers}
+
+    def test_sheet_is_saved_with_constant_number_of_queries(self):
+        column = {str(q): 'A' if q % 2 else 'B' for q in range(1, 26)}
+        column['25'] = None
+        with CaptureQueriesContext(connection) as queries:
+            save_results_to_db(self.results({'1': column, '2': {'1': 'A'}}))
+        self.assertLess(len(queries), 20)
+
+        student = Student.objects.get(student_number='20230145678')
+        self.assertEqual(StudentAnswer.objects.filter(student=student).count(), 24)
+        self.assertEqual(StudentAnswer.objects.filter(student=student, is_correct=True).count(), 12)
+        self.assertEqual(student.results['MATH101']['overall']['correct'], 12)
+
+    def test_rescan_updates_existing_answers(self):
+        self.assertTrue(save_results_to_db(self.results({'1': {'1': 'B', '2': 'B'}})))
+        save_results_to_db(self.results({'1': {'1': 'A'}}))
+
+        answers = StudentAnswer.objects.order_by('question_id')
+        self.assertEqual([(a.question_id, a.selected_answer, a.is_correct) for a in answers],
+                         [(1, 'A', True), (2, 'B', False)])
+        overall = Student.objects.get().results['MATH101']['overall']
+        self.assertEqual((overall['correct'], overall['incorrect']), (1, 1))
+
+    def test_failed_save_returns_false(self):
+        with mock.patch.object(StudentAnswer.objects, 'bulk_create', side_effect=RuntimeError("db down")):
+            self.assertFalse(save_results_to_db(self.results({'1': {'1': 'A'}})))
+
+
+class DeferredScoringTests(TestCase):
+
+    def setUp(self):
+        self.course = Course.objects.create(name="Math", code="MATH101")
+        self.test_group = TestGroup.objects.create(name="A", total_questions=10)
+        self.students = [Student.objects.create(student_number=f"S{i}") for i in range(2)]
+        for question_id in range(1, 11):
+            AnswerKey.objects.create(
+                test_group=self.test_group, course=self.course, question_id=question_id, correct_answer='A'
+            )
+        ColumnMapping.objects.create(test_group=self.test_group, column_number=1, course=self.course)
+
+    def create_answers(self, student, count):
+        for question_id in range(1, count + 1):
+            StudentAnswer.objects.create(
+                student=student, course=self.course, test_group=self.test_group,
+                question_id=question_id, selected_answer='A' if question_id % 2 else 'B'
+            )
+
+    def test_results_are_calculated_once_per_student(self):
+        with mock.patch('omr_app.grading.grade_students') as grade, \
+                mock.patch.object(Student, 'calculate_results', autospec=True) as calculate_results:
+            with deferred_scoring():
+                for student in self.students:
+                    self.create_answers(student, 10)
+                grade.assert_not_called()
+        # Tüm öğrenciler tek bir küme tabanlı puanlamada hesaplanır
+        grade.assert_called_once()
+        self.assertEqual(set(grade.call_args.args[0]), {student.pk for student in self.students})
+        calculate_results.assert_not_called()
+
+    def test_deferred_results_match_immediate_results(self):
+        with deferred_scoring():
+            with deferred_scoring():
+                self.create_answers(self.students[0], 10)
+            self.students[0].refresh_from_db()
+            self.assertEqual(self.students[0].results, {})
+        self.create_answers(self.students[1], 10)
+
+        for student in self.students:
+            student.refresh_from_db()
+        self.assertEqual(self.students[0].results, self.students[1].results)
+        self.assertEqual(self.students[0].results['MATH101']['overall']['correct'], 5)
+
+    def test_failed_block_skips_scoring(self):
+        with mock.patch('omr_app.grading.grade_students') as grade:
+            with self.assertRaises(ValueError):
+                with deferred_scoring():
+                    self.create_answers(self.students[0], 3)
+                    raise ValueError
+        grade.assert_not_called()
+
+
+class GradingEngineTests(TestCase):
+
+    def setUp(self):
+        self.math = Course.objects.create(name="Math", code="MATH101")
+        self.physics = Course.objects.create(name="Physics", code="PHYS101")
+        self.group = TestGroup.objects.create(name="A", total_questions=4)
+        ColumnMapping.objects.create(test_group=self.group, column_number=1, course=self.math)
+        ColumnMapping.objects.create(test_group=self.group, column_number=2, course=self.physics)
+        for course in (self.math, self.physics):
+            for question_id in range(1, 5):
+                AnswerKey.objects.create(
+                    test_group=self.group, course=course, question_id=question_id, correct_answer='A'
+                )
+        self.students = [Student.objects.create(student_number=f"S{i}") for i in range(3)]
+        with deferred_scoring():
+            for index, student in enumerate(self.students):
+                for course in (self.math, self.physics):
+                    for question_id in range(1, 5):
+                        StudentAnswer.objects.create(
+                            student=student, test_group=self.group, course=course, question_id=question_id,
+                            selected_answer='A' if question_id <= index + 1 else 'B'
+                        )
+
+    def test_all_students_are_graded_with_constant_queries(self):
+        Student.objects.update(results={})
+        with self.assertNumQueries(8):
+            self.assertEqual(grade_students(), 3)
+
+        for index, student in enumerate(Student.objects.order_by('pk')):
+            correct = index + 1
+            overall = {'score': round(correct / 4 * 100, 2), 'correct': correct, 'incorrect': 4 - correct}
+            self.assertEqual(student.results, {'MATH101': {'overall': overall}, 'PHYS101': {'overall': overall}})
+            self.assertEqual(
+                (student.total_correct, student.total_incorrect, student.overall_score),
+                (2 * correct, 2 * (4 - correct), overall['score'])
+            )
+
+    def test_answer_key_correction_regrades_single_course(self):
+        AnswerKey.objects.filter(course=self.math).update(correct_answer='B')
+        refresh_correctness(StudentAnswer.objects.filter(course=self.math))
+        grade_students(course_ids=[self.math.pk])
+
+        student = Student.objects.get(student_number="S0")
+        self.assertEqual(student.results['MATH101']['overall']['correct'], 3)
+        self.assertEqual(student.results['PHYS101']['overall']['correct'], 1)
+
+
+    def test_regrade_command_rejects_unknown_students(self):
+        with mock.patch('omr_app.management.commands.regrade.grade_students') as grade:
+            with self.assertRaisesMessage(CommandError, "Öğrenci numaraları bulunamadı: X1, X2"):
+                call_command('regrade', student=['S0', 'X2', 'X1'], stdout=io.StringIO())
+            grade.assert_not_called()
+
+            call_command('regrade', student=['S0', 'S2'], course=['MATH101'], stdout=io.StringIO())
+        self.assertEqual(sorted(grade.call_args.args[0]), [self.students[0].pk, self.students[2].pk])
+        self.assertEqual(grade.call_args.args[1], [self.math.pk])
+
+class AnswerKeyRegradeTests(TestCase):
+
+    def setUp(self):
+        self.course = Course.objects.create(name="Math", code="MATH101")
+        self.other_course = Course.objects.create(name="Physics", code="PHYS101")
+        self.group = TestGroup.objects.create(name="A", total_questions=4)
+        ColumnMapping.objects.create(test_group=self.group, column_number=1, course=self.course)
+        ColumnMapping.objects.create(test_group=self.group, column_number=2, course=self.other_course)
+        self.keys = {}
+        for course in (self.course, self.other_course):
+            for question_id in range(1, 5):
+                self.keys[(course.code, question_id)] = AnswerKey.objects.create(
+                    test_group=self.group, course=course, question_id=question_id, correct_answer='A'
+                )
+        self.students = [Student.objects.create(student_number=f"S{i}") for i in range(3)]
+        with deferred_scoring():
+            for student in self.students:
+                for course in (self.course, self.other_course):
+                    for question_id in range(1, 5):
+                        StudentAnswer.objects.create(
+                            student=student, test_group=self.group, course=course, question_id=question_id,
+                            selected_answer='B' if (student.student_number, question_id) == ('S0', 1) else 'A'
+                        )
+
+    def fresh_results(self):
+        expected = {}
+        for student in Student.objects.all():
+            student.calculate_results()
+            expected[student.pk] = student.results
+        return expected
+
+    def test_key_correction_updates_only_affected_rows_and_students(self):
+        key = self.keys[('MATH101', 1)]
+        key.correct_answer = 'B'
+        key.save()
+
+        answers = StudentAnswer.objects.filter(course=self.course, question_id=1).order_by('student__student_number')
+        self.assertEqual([answer.is_correct for answer in answers], [True, False, False])
+        results = {student.pk: student.results for student in Student.objects.all()}
+        self.assertEqual(results, self.fresh_results())
+        self.assertEqual(results[self.students[0].pk]['MATH101']['overall']['correct'], 4)
+        self.assertEqual(results[self.students[1].pk]['PHYS101']['overall']['correct'], 4)
+        summaries = set(Student.objects.values_list('total_correct', 'total_incorrect'))
+        self.assertEqual(summaries, {(7, 1)})
+
+    def test_unchanged_key_save_does_not_regrade(self):
+        key = self.keys[('MATH101', 1)]
+        with mock.patch('omr_app.grading.apply_answer_key_changes') as apply_changes:
+            key.save()
+        apply_changes.assert_not_called()
+
+    def test_deleting_key_removes_answers_from_score(self):
+        self.keys[('MATH101', 2)].delete()
+        self.assertIsNone(StudentAnswer.objects.get(student=self.students[1], course=self.course, question_id=2).is_correct)
+        results = {student.pk: student.results for student in Student.objects.all()}
+        self.assertEqual(results, self.fresh_results())
+        self.assertEqual(results[self.students[1].pk]['MATH101']['overall']['correct'], 3)
+
+    def test_deferred_key_changes_are_applied_once(self):
+        with mock.patch('omr_app.grading.apply_answer_key_changes') as apply_changes:
+            with deferred_scoring():
+                for question_id in range(1, 5):
+                    key = self.keys[('MATH101', question_id)]
+                    key.correct_answer = 'C'
+                    key.save()
+        apply_changes.assert_called_once()
+        self.assertEqual(len(apply_changes.call_args.args[0]), 4)
+
+
+class StudentSummaryTests(TestCase):
+
+    def test_summary_follows_results_on_save(self):
+        student = Student.objects.create(student_number="1001", results={
+            'MAT': {'overall': {'score': 75.0, 'correct': 3, 'incorrect': 1}},
+            'FIZ': {'overall': {'score': 50.0, 'correct': 2, 'incorrect': 2}},
+        })
+        self.assertEqual((student.total_correct, student.total_incorrect, student.overall_score), (5, 3, 62.5))
+
+        student.results = {'MAT': {'overall': {'score': 25.0, 'correct': 1, 'incorrect': 3}}}
+        student.save(update_fields=['results'])
+        student.refresh_from_db()
+        self.assertEqual((student.total_correct, student.total_incorrect, student.overall_score), (1, 3, 25.0))
+
+    def test_ranking_reads_summary_columns(self):
+        for number, score in (("1", 40.0), ("2", 90.0), ("3", 65.0)):
+            Student.objects.create(student_number=number, results={
+                'MAT': {'overall': {'score': score, 'correct': int(score // 10), 'incorrect': 0}}
+            })
+        ranking = Student.objects.order_by('-overall_score', 'student_number').values_list('student_number', flat=True)
+        self.assertEqual(list(ranking), ["2", "3", "1"])
+        self.assertEqual(Student.objects.filter(total_correct__gte=6).count(), 2)
+
+
+class ScanJobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.config = isolated_config(self)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, name='sheet.jpg'):
+        image = SimpleUploadedFile(name, b'image-bytes', content_type='image/jpeg')
+        return self.client.post(reverse('omr-process'), {'image': image})
+
+    def test_upload_is_queued_with_unique_file(self):
+        first, second = self.upload(), self.upload()
+        self.assertEqual(first.status_code, 202)
+        self.assertIn('mesaj', first.json())
+        jobs = ScanJob.objects.order_by('pk')
+        self.assertEqual([job.pk for job in jobs], [first.json()['job_id'], second.json()['job_id']])
+        self.assertTrue(all(job.status == ScanJob.PENDING for job in jobs))
+        self.assertNotEqual(jobs[0].image.name, jobs[1].image.name)
+
+    def test_worker_processes_jobs_and_reports_status(self):
+        job_id = self.upload().json()['job_id']
+        self.upload('broken.jpg')
+        results = [{'student_number': '123', 'answers': {}}, {'error': 'Hizalama başarısız oldu.'}]
+        with mock.patch('omr_app.jobs.process_image', side_effect=results):
+            self.assertEqual(run_worker(self.config, once=True), 2)
+
+        response = self.client.get(reverse('scan-job-detail', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], ScanJob.DONE)
+        self.assertEqual(data['result']['student_number'], '123')
+        self.assertIsNotNone(data['processing_seconds'])
+        self.assertFalse(ScanJob.objects.get(pk=job_id).image)
+
+        failed = ScanJob.objects.exclude(pk=job_id).get()
+        self.assertEqual((failed.status, failed.error), (ScanJob.FAILED, 'Hizalama başarısız oldu.'))
+        self.assertFalse(failed.image)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'scan_jobs')), [])
+
+    def test_keep_images_retains_finished_job_images(self):
+        self.config['scan_jobs']['keep_images'] = True
+        self.upload()
+        with mock.patch('omr_app.jobs.process_image', return_value={'error': 'Hizalama başarısız oldu.'}):
+            run_worker(self.config, once=True)
+        job = ScanJob.objects.get()
+        self.assertEqual(job.status, ScanJob.FAILED)
+        self.assertTrue(os.path.exists(job.image.path))
+
+    def test_job_fails_when_results_cannot_be_saved(self):
+        template = cv2.imread(os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path']))
+        data = render_sheet(template, self.config, random_sheet_spec(random.Random(2), self.config))
+        image = SimpleUploadedFile('sheet.jpg', data, content_type='image/jpeg')
+        job_id = self.client.post(reverse('omr-process'), {'image': image}).json()['job_id']
+        self.upload('broken.jpg')
+        with mock.patch('omr_app.scanner.save_results_to_db', return_value=False) as save:
+            self.assertEqual(run_worker(self.config, once=True), 2)
+        # Görüntüsü okunamayan form için kayıt hiç denenmez
+        save.assert_called_once()
+
+        job = ScanJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.error), (ScanJob.FAILED, "Sonuçlar veritabanına kaydedilemedi."))
+
+    def test_worker_command_runs_process_pool(self):
+        self.config['batch']['max_workers'] = 2
+        with mock.patch('omr_app.management.commands.run_scan_worker.load_config', return_value=self.config), \
+                mock.patch('omr_app.jobs.run_worker', return_value=3):
+            stdout = io.StringIO()
+            call_command('run_scan_worker', once=True, stdout=stdout)
+        self.assertIn("2 süreçte 6 tarama işi işlendi.", stdout.getvalue())
+
+        with mock.patch('omr_app.management.commands.run_scan_worker.load_config', return_value=self.config), \
+                mock.patch('omr_app.management.commands.run_scan_worker.run_worker', return_value=3) as worker:
+            call_command('run_scan_worker', once=True, processes=1, stdout=io.StringIO())
+        worker.assert_called_once()
+
+    def test_job_is_claimed_once_and_stale_jobs_are_requeued(self):
+        job_id = self.upload().json()['job_id']
+        self.assertEqual(claim_next_job('worker-1').pk, job_id)
+        self.assertIsNone(claim_next_job('worker-2'))
+
+        ScanJob.objects.filter(pk=job_id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(self.config), 1)
+        job = claim_next_job('worker-2')
+        self.assertEqual((job.pk, job.worker, job.attempts), (job_id, 'worker-2', 2))
+
+        # Deneme hakkı biten iş başarısız olur ve görüntüsü silinir
+        ScanJob.objects.filter(pk=job_id).update(
+            attempts=self.config['scan_jobs']['max_attempts'], started_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(requeue_stale_jobs(self.config), 0)
+        job = ScanJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ScanJob.FAILED)
+        self.assertFalse(job.image)
+
+
+class InMemoryDecodeTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.template_path = os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path'])
+        with open(self.template_path, 'rb') as template_file:
+            self.data = template_file.read()
+
+    def test_decode_from_bytes_memoryview_and_path(self):
+        from_path = decode_image(self.template_path)
+        for source in (self.data, bytearray(self.data), memoryview(self.data)):
+            np.testing.assert_array_equal(decode_image(source), from_path)
+        self.assertIs(decode_image(from_path), from_path)
+        self.assertIsNone(decode_image(b''))
+        self.assertIsNone(decode_image(b'not an image'))
+
+    def test_undecodable_buffer_is_reported(self):
+        self.assertEqual(process_image(b'broken', self.config, save_to_db=False), {"error": "Görüntü yüklenemedi."})
+
+    def test_answer_key_upload_is_decoded_without_temp_file(self):
+        media_root = tempfile.mkdtemp()
+        image = SimpleUploadedFile('key.jpg', self.data, content_type='image/jpeg')
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('omr_app.views.process_answer_key_image', return_value={'answer_key': []}) as process:
+            response = self.client.post(reverse('extract-answer-key-process'), {'image': image})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(bytes(process.call_args.args[0]), self.data)
+        self.assertEqual(os.listdir(media_root), [])
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+class GradeExportTests(TestCase):
+
+    def setUp(self):
+        Course.objects.create(name="Matematik", code="MAT", total_questions=10)
+        Course.objects.create(name="Fizik", code="FIZ", total_questions=10)
+        Student.objects.create(student_number="1001", results={
+            'MAT': {'overall': {'score': 70.0, 'correct': 7, 'incorrect': 2}},
+            'FIZ': {'overall': {'score': 50.0, 'correct': 5, 'incorrect': 5}},
+        })
+        Student.objects.create(student_number="1002", results={
+            'FIZ': {'overall': {'score': 30.0, 'correct': 3, 'incorrect': 1}},
+        })
+        Student.objects.create(student_number="1003")
+
+    def export(self, export_format):
+        return self.client.get(reverse('export-grades', kwargs={'export_format': export_format}))
+
+    def test_csv_is_streamed_with_per_course_columns(self):
+        response = self.export('csv')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(codecs.BOM_UTF8))
+        self.assertEqual(content.count(codecs.BOM_UTF8), 1)
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], [
+            'Öğrenci Numarası', 'Doğru Sayısı', 'Yanlış Sayısı', 'Genel Puan',
+            'MAT Doğru', 'MAT Yanlış', 'MAT Puan', 'FIZ Doğru', 'FIZ Yanlış', 'FIZ Puan'
+        ])
+        self.assertEqual(rows[1], ['1001', '12', '7', '60.0', '7', '2', '70.0', '5', '5', '50.0'])
+        self.assertEqual(rows[2], ['1002', '3', '1', '30.0', '', '', '', '3', '1', '30.0'])
+        self.assertEqual(rows[3], ['1003', '0', '0', '0.0', '', '', '', '', '', ''])
+
+    def test_txt_lists_courses_per_student(self):
+        response = self.export('txt')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn("Öğrenci Numarası: 1001\nDoğru Sayısı: 12\nYanlış Sayısı: 7\nGenel Puan: 60.0\nNotlar:\n"
+                      "  MAT: Doğru 7, Yanlış 2, Puan 70.0\n  FIZ: Doğru 5, Yanlış 5, Puan 50.0\n", content)
+        self.assertIn("Öğrenci Numarası: 1003\nDoğru Sayısı: 0\nYanlış Sayısı: 0\nGenel Puan: 0.0\n"
+                      "Notlar: Eksik Notlar\n", content)
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+        response = self.export('xlsx')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook['Notlar'].iter_rows(values_only=True))
+        self.assertEqual(rows[0][:5], ('Öğrenci Numarası', 'Doğru Sayısı', 'Yanlış Sayısı', 'Genel Puan', 'MAT Doğru'))
+        self.assertEqual(rows[2], ('1002', 3, 1, 30, None, None, None, 3, 1, 30))
+        self.assertEqual(len(rows), 4)
+
+    def test_students_are_read_in_chunks(self):
+        Student.objects.bulk_create(
+            Student(student_number=str(2000 + i)) for i in range(EXPORT_CHUNK_SIZE + 5)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            lines = b''.join(self.export('csv').streaming_content).splitlines()
+        self.assertEqual(len(lines), EXPORT_CHUNK_SIZE + 9)
+        student_queries = [q for q in queries.captured_queries if 'omr_app_student' in q['sql']]
+        self.assertEqual(len(student_queries), 1)
+
+    def test_unsupported_format(self):
+        response = self.export('pdf')
+        self.assertEqual(response.status_code, 400)
+
+
+class ListEndpointTests(TestCase):
+
+    def setUp(self):
+        self.math = Course.objects.create(name="Matematik", code="MAT")
+        self.physics = Course.objects.create(name="Fizik", code="FIZ")
+        self.group = TestGroup.objects.create(name="A", total_questions=2)
+        for course in (self.math, self.physics):
+            for question_id in (1, 2):
+                AnswerKey.objects.create(test_group=self.group, course=course, question_id=question_id, correct_answer='A')
+        with deferred_scoring():
+            for number in ("2024001", "2024002", "2024003", "2023001", "2023002"):
+                student = Student.objects.create(student_number=number)
+                courses = (self.math,) if number.startswith("2023") else (self.math, self.physics)
+                for course in courses:
+                    StudentAnswer.objects.create(
+                        student=student, test_group=self.group, course=course, question_id=1, selected_answer='A'
+                    )
+
+    def test_unpaginated_list_by_default(self):
+        response = self.client.get(reverse('student-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_pagination_walks_all_rows(self):
+        url = reverse('student-list') + '?page_size=2'
+        numbers = []
+        pages = 0
+        while url:
+            data = self.client.get(url).json()
+            numbers.extend(student['student_number'] for student in data['results'])
+            url = data['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(numbers), sorted(Student.objects.values_list('student_number', flat=True)))
+
+    def test_filters(self):
+        students = self.client.get(reverse('student-list'), {'student_number': '2024'}).json()
+        self.assertEqual([s['student_number'] for s in students], ["2024001", "2024002", "2024003"])
+
+        students = self.client.get(reverse('student-list'), {'course': self.physics.pk}).json()
+        self.assertEqual(len(students), 3)
+
+        answers = self.client.get(reverse('studentanswer-list'), {'course': self.math.pk, 'student_number': '2023'}).json()
+        self.assertEqual(len(answers), 2)
+
+        keys = self.client.get(reverse('answerkey-list'), {'course': self.physics.pk, 'test_group': self.group.pk}).json()
+        self.assertEqual(len(keys), 2)
+
+        response = self.client.get(reverse('answerkey-list'), {'course': 'MAT'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fieldsets(self):
+        answers = self.client.get(reverse('studentanswer-list'), {'fields': 'id,selected_answer', 'page_size': 10}).json()
+        self.assertEqual(set(answers['results'][0]), {'id', 'selected_answer'})
+        courses = self.client.get(reverse('course-list'), {'fields': 'code'}).json()
+        self.assertEqual(courses, [{'code': 'MAT'}, {'code': 'FIZ'}])
+
+
+class ListQueryCountTests(TestCase):
+    """
+    Liste uç noktalarının sorgu sayısı satır sayısından bağımsız olmalıdır.
+    """
+
+    def add_rows(self, start, count):
+        group = TestGroup.objects.create(name=f"G{start}")
+        with deferred_scoring():
+            for index in range(start, start + count):
+                course = Course.objects.create(name=f"Ders {index}", code=f"D{index}")
+                ColumnMapping.objects.create(test_group=group, column_number=index, course=course)
+                AnswerKey.objects.create(test_group=group, course=course, question_id=1, correct_answer='A')
+                student = Student.objects.create(student_number=f"{index}")
+                StudentAnswer.objects.create(
+                    student=student, test_group=group, course=course, question_id=1, selected_answer='A'
+                )
+
+    def assert_constant_queries(self, url_name, expected):
+        self.add_rows(0, 2)
+        with self.assertNumQueries(expected):
+            self.assertEqual(len(self.client.get(reverse(url_name)).json()), 2)
+        self.add_rows(100, 20)
+        with self.assertNumQueries(expected):
+            self.assertEqual(len(self.client.get(reverse(url_name)).json()), 22)
+
+    def test_courses(self):
+        self.assert_constant_queries('course-list', 2)
+
+    def test_column_mappings(self):
+        self.assert_constant_queries('columnmapping-list', 1)
+
+    def test_answer_keys(self):
+        self.assert_constant_queries('answerkey-list', 1)
+
+    def test_students(self):
+        self.assert_constant_queries('student-list', 1)
+
+    def test_student_answers(self):
+        self.assert_constant_queries('studentanswer-list', 1)
+
+    def test_course_column_number(self):
+        self.add_rows(0, 1)
+        course = Course.objects.get(code="D0")
+        ColumnMapping.objects.create(test_group=TestGroup.objects.create(name="H"), column_number=7, course=course)
+        self.assertEqual(self.client.get(reverse('course-detail', args=[course.pk])).json()['column_number'], 0)
+
+
+class SheetTraceTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        METRICS.reset()
+
+    def test_pipeline_returns_stage_trace(self):
+        template_path = os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path'])
+        result = process_image(template_path, self.config, save_to_db=False)
+        self.assertNotIn('error', result)
+        trace = result['trace']
+        for stage in ('decode', 'crop', 'align', 'preprocess', 'locate', 'answers', 'visualize'):
+            self.assertIn(stage, trace['stages'])
+        self.assertNotIn('db', trace['stages'])
+        self.assertEqual(trace['alignment_scale'], result['alignment_scale'])
+        self.assertEqual(len(trace['image_size']), 2)
+        self.assertGreaterEqual(trace['wall_ms'], trace['stages']['align']['wall_ms'])
+        self.assertEqual(METRICS.sheets, {'ok': 1})
+
+    def test_ocr_calls_and_queries_are_counted(self):
+        trace = SheetTrace()
+        image = np.full((4, 4), 3, dtype=np.uint8)
+        with mock.patch('omr_app.scanner.perform_ocr', return_value={'detailed_texts': []}):
+            with tracing(trace), connection.execute_wrapper(trace.count_query):
+                get_ocr_result(image, self.config)
+                get_ocr_result(image, self.config)
+                Course.objects.count()
+        data = trace.as_dict()
+        self.assertEqual((data['ocr']['calls'], data['ocr']['cache_hits']), (1, 1))
+        self.assertEqual(data['db_queries'], 1)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.lines('x', 'stage="align"'), [
+            'x_bucket{stage="align",le="0.1"} 2',
+            'x_bucket{stage="align",le="1.0"} 3',
+            'x_bucket{stage="align",le="+Inf"} 4',
+            'x_sum{stage="align"} 3.65',
+            'x_count{stage="align"} 4',
+        ])
+
+    def test_metrics_endpoint(self):
+        process_image(b'broken', self.config, save_to_db=False)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode('utf-8')
+        self.assertIn('omr_sheets_total{status="error"} 1', body)
+        self.assertIn('omr_stage_seconds_bucket{stage="decode",le="+Inf"} 1', body)
+
+
+class SyntheticSheetTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.template = cv2.imread(os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path']))
+
+    def test_rendering_is_reproducible(self):
+        spec = random_sheet_spec(random.Random(7), self.config)
+        self.assertEqual(spec, random_sheet_spec(random.Random(7), self.config))
+        distortion = Distortion(rotation=1.0, scale=0.98, blur=3, noise=5.0, jpeg_quality=70)
+        first = render_sheet(self.template, self.config, spec, distortion, seed=3)
+        self.assertEqual(first, render_sheet(self.template, self.config, spec, distortion, seed=3))
+        self.assertEqual(decode_image(first).shape, self.template.shape)
+
+    def test_score_read(self):
+        spec = random_sheet_spec(random.Random(1), self.config, blank_rate=0.0)
+        answers = {col: dict(column) for col, column in spec.answers.items()}
+        answers['1']['1'] = None
+        result = {'answers': answers, 'student_number': spec.student_number, 'test_group': 'X'}
+        self.assertEqual(score_read(spec, result), {'answers': 99 / 100, 'student_number': 1.0, 'test_group': 0.0})
+        self.assertEqual(score_read(spec, {'error': 'x'})['answers'], 0.0)
+
+    def test_benchmark_command_reads_synthetic_sheets(self):
+        fd, report_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            with mock.patch('omr_app.management.commands.benchmark_scanner.load_config', return_value=self.config):
+                call_command(
+                    'benchmark_scanner', sheets=1, warmup=0, no_artifacts=True, ocr_stub=True,
+                    json_path=report_path, stdout=io.StringIO()
+                )
+            with open(report_path, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+        finally:
+            os.remove(report_path)
+        self.assertEqual(report['failures'], 0)
+        self.assertEqual(report['accuracy'], {'answers': 1.0, 'student_number': 1.0, 'test_group': 1.0})
+        self.assertIn('align', report['stages_ms'])
+        self.assertGreater(report['sheets_per_second'], 0)
+
+
+class ArtifactWriterTests(TestCase):
+
+    def setUp(self):
+        self.config = isolated_config(self)
+        self.directory = os.path.dirname(self.config['output']['rois_directory'])
+        self.image = np.zeros((8, 8), dtype=np.uint8)
+
+    def saved_sheets(self, key: str):
+        path = self.config['output'][key]
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def test_sheets_get_unique_directories(self):
+        template = cv2.imread(os.path.join(settings.BASE_DIR, self.config['template_matching']['template_path']))
+        data = render_sheet(template, self.config, random_sheet_spec(random.Random(2), self.config))
+        first = process_image(data, self.config, save_to_db=False)
+        second = process_image(data, self.config, save_to_db=False)
+        get_artifact_writer(self.config).flush()
+
+        self.assertNotEqual(first['artifact_id'], second['artifact_id'])
+        self.assertEqual(self.saved_sheets('visualization_directory'), sorted([first['artifact_id'], second['artifact_id']]))
+        sheet_dir = os.path.join(self.directory, 'rois_directory', first['artifact_id'])
+        self.assertEqual(
+            sorted(os.listdir(sheet_dir)),
+            ['answer_area.jpg', 'student_number_area.jpg', 'test_group_area.jpg']
+        )
+        debug_dir = os.path.join(self.directory, 'debug_images_directory', first['artifact_id'])
+        self.assertIn('thresholded_image.jpg', os.listdir(debug_dir))
+
+    def test_sample_every(self):
+        self.config['output']['artifacts'] = {'sample_every': 3}
+        saved = []
+        for _ in range(6):
+            with collecting_artifacts(self.config) as sheet:
+                save_artifact(self.config, 'roi', 'answer_area', self.image)
+            saved.append(commit_artifacts(sheet, {}) is not None)
+        get_artifact_writer(self.config).flush()
+        self.assertEqual(saved.count(True), 2)
+        self.assertEqual(len(self.saved_sheets('rois_directory')), 2)
+
+    def test_low_confidence_only(self):
+        self.config['output']['artifacts'] = {'low_confidence_only': True, 'confidence_threshold': 0.2}
+        confident = {'test_group': 'A', 'confidence': {'student_number': [0.5, 0.4], 'test_group': 0.6}}
+        doubtful = {'test_group': 'A', 'confidence': {'student_number': [0.5, 0.0], 'test_group': 0.6}}
+        self.assertFalse(is_low_confidence(confident, 0.2))
+        self.assertTrue(is_low_confidence(doubtful, 0.2))
+        self.assertTrue(is_low_confidence({'error': 'x'}, 0.2))
+        self.assertTrue(is_low_confidence(dict(confident, test_group='Belirsiz'), 0.2))
+
+        ids = []
+        for results in (confident, doubtful):
+            with collecting_artifacts(self.config) as sheet:
+                save_artifact(self.config, 'debug', 'thresholded_image', self.image)
+            ids.append(commit_artifacts(sheet, results))
+        get_artifact_writer(self.config).flush()
+        self.assertIsNone(ids[0])
+        self.assertEqual(self.saved_sheets('debug_images_directory'), [ids[1]])
+
+    def test_full_queue_drops_whole_sheets_instead_of_blocking(self):
+        release = threading.Event()
+        with mock.patch('omr_app.artifacts.cv2.imwrite', side_effect=lambda path, image: release.wait(5)):
+            writer = ArtifactWriter(queue_size=1, max_sheets=None, max_age_days=None)
+            accepted = [
+                writer.submit([
+                    (os.path.join(self.directory, str(index), 'a.jpg'), self.image),
+                    (os.path.join(self.directory, str(index), 'b.jpg'), self.image),
+                ])
+                for index in range(4)
+            ]
+            release.set()
+            writer.flush()
+        self.assertIn(False, accepted)
+        self.assertEqual(writer.dropped, accepted.count(False))
+        self.assertEqual(writer.written, accepted.count(True))
+
+    def test_retention_keeps_newest_sheets(self):
+        root = self.config['output']['rois_directory']
+        names = [f"2024010{day}-120000-{day:08x}" for day in range(1, 6)]
+        for name in names:
+            os.makedirs(os.path.join(root, name))
+        os.makedirs(os.path.join(root, 'keep-me'))
+        self.assertEqual(prune_artifacts(root, max_sheets=2, max_age_days=None), 3)
+        self.assertEqual(sorted(os.listdir(root)), names[3:] + ['keep-me'])
+
+        old = os.path.join(root, names[3])
+        os.utime(old, (0, 0))
+        self.assertEqual(prune_artifacts(root, max_sheets=None, max_age_days=1), 1)
+        self.assertEqual(sorted(os.listdir(root)), names[4:] + ['keep-me'])
+
+class GradingBenchmarkTests(TestCase):
+
+    def test_benchmark_report(self):
+        from .management.commands.benchmark_grading import Command as BenchmarkGradingCommand
+        options = {
+            'courses': 2, 'groups': 2, 'questions': 5, 'students': 12,
+            'api_answers': 3, 'repeat': 1, 'seed': 1,
+        }
+        report = BenchmarkGradingCommand(stdout=io.StringIO()).benchmark(options)
+        self.assertEqual(report['timings']['ingest (save_results_to_db)']['items'], 12)
+        self.assertEqual(report['rows']['students'], 13)
+        self.assertEqual(report['rows']['student_answers'], StudentAnswer.objects.count())
+        self.assertTrue(all(endpoint['status'] == 200 for endpoint in report['endpoints'].values()))
+        self.assertTrue(Student.objects.filter(student_number="20240000000").exclude(results={}).exists())
@@ -4,6 +4,7 @@ from .views import (
     OMRProcessingView, CourseViewSet, TestGroupViewSet, 
     ColumnMappingViewSet, AnswerKeyViewSet, StudentViewSet, 
     StudentAnswerViewSet, ExportStudentGradesView, OMRAnswerKeyProcessingView,
+    OMRBatchProcessingView, ScanBatchDetailView, ScanJobDetailView, metrics_view,
     home_view,
     course_list_view, course_detail_view,
     testgroup_list_view, testgroup_detail_view,
@@ -61,8 +62,12 @@ urlpatterns = [
     path('studentanswers-html/<int:pk>/delete/', studentanswer_delete_view, name='studentanswer-delete-html'),
 
     path('process/', OMRProcessingView.as_view(), name='omr-process'),
+    path('jobs/<int:pk>/', ScanJobDetailView.as_view(), name='scan-job-detail'),
+    path('process-batch/', OMRBatchProcessingView.as_view(), name='omr-process-batch'),
+    path('batch/<int:pk>/', ScanBatchDetailView.as_view(), name='scan-batch-detail'),
     path('extract-answer-key/', OMRAnswerKeyProcessingView.as_view(), name='extract-answer-key-process'),
     path('export-grades/<str:export_format>/', ExportStudentGradesView.as_view(), name='export-grades'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 urlpatterns += router.urls
@@ -2,26 +2,33 @@ from rest_framework import viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.conf import settings
-from django.http import HttpResponse
-from django.core.files.storage import default_storage
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
 from django.core.files.base import ContentFile
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.shortcuts import render, get_object_or_404, redirect
-import csv
+import io
 import os
 import logging
-import pandas as pd
+import zipfile
 from .forms import (
     CourseForm, TestGroupForm, ColumnMappingForm,
     AnswerKeyForm, StudentForm, StudentAnswerForm
 )
 
-from .models import Course, TestGroup, ColumnMapping, AnswerKey, Student, StudentAnswer
+from .models import (
+    Course, TestGroup, ColumnMapping, AnswerKey, Student, StudentAnswer, ScanBatch, ScanJob, deferred_scoring
+)
 from .serializers import (
     CourseSerializer, TestGroupSerializer, ColumnMappingSerializer,
-    AnswerKeySerializer, StudentSerializer, StudentAnswerSerializer
+    AnswerKeySerializer, StudentSerializer, StudentAnswerSerializer, ScanJobSerializer
 )
-from .scanner import process_image, load_config, process_answer_key_image
+from .scanner import load_config, process_answer_key_image
+from .batch import is_image_name, zip_image_entries
+from .jobs import batch_report, enqueue_scan
+from .api import OptionalCursorPagination, QueryFilterMixin
+from .metrics import METRICS, PROMETHEUS_CONTENT_TYPE
+from .exports import stream_csv, stream_txt, write_xlsx, XLSX_CONTENT_TYPE
 
 logger = logging.getLogger(__name__)
 
@@ -30,15 +37,20 @@ logger = logging.getLogger(__name__)
 # DRF tarafı (API endpointleri)
 # --------------------------------------------------------------------------------
 
-def save_temp_file(file, filename):
-    """Geçici olarak dosyayı kaydeder ve yolunu döner."""
-    temp_path = default_storage.save(filename, ContentFile(file.read()))
-    full_path = os.path.join(settings.MEDIA_ROOT, temp_path)
-    return temp_path, full_path
-
-def delete_temp_file(temp_path):
-    """Geçici dosyayı siler."""
-    default_storage.delete(temp_path)
+def read_upload(file):
+    """
+    Yüklenen dosyanın içeriğini diske yazmadan döner. Bellekteki yüklemeler için
+    kopyalamadan bir memoryview, diskteki geçici yüklemeler için okunan baytlar döner.
+    """
+    buffer = getattr(file, 'file', None)
+    if isinstance(buffer, io.BytesIO):
+        return buffer.getbuffer()
+    file.seek(0)
+    return file.read()
+
+def metrics_view(request):
+    """Form işleme metriklerini Prometheus metin biçiminde döner."""
+    return HttpResponse(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 def load_configuration():
     """Konfigürasyon dosyasını yükler."""
@@ -46,30 +58,102 @@ def load_configuration():
     return load_config(config_path)
 
 class OMRProcessingView(APIView):
-    """OMR İşleme API Görünümü"""
+    """OMR İşleme API Görünümü: görüntüyü kuyruğa alır ve iş numarasını hemen döner."""
     def post(self, request, format=None):
         image_file = request.FILES.get('image')
         if not image_file:
             return Response({'mesaj': 'Görüntü dosyası gönderilmedi.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        temp_filename = 'temp_image.jpg'
-        temp_image_path, temp_image_full_path = save_temp_file(image_file, temp_filename)
-        config = load_configuration()
 
         try:
-            process_result = process_image(temp_image_full_path, config)
-            if 'error' in process_result:
-                logger.error(f"İşleme hatası: {process_result['error']}")
-                return Response({'mesaj': 'İşlem tamamlandı.'}, status=status.HTTP_200_OK)
-            
-            return Response({'mesaj': 'İşlem tamamlandı.'}, status=status.HTTP_200_OK)
-        
+            job = enqueue_scan(image_file)
         except Exception as e:
-            logger.error(f"İşleme sırasında hata oluştu: {e}")
-            return Response({'mesaj': 'İşlem tamamlandı.'}, status=status.HTTP_200_OK)
-        
+            logger.error(f"Tarama işi kuyruğa alınırken hata oluştu: {e}")
+            return Response({'mesaj': 'Görüntü kuyruğa alınamadı.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(
+            {
+                'mesaj': 'Görüntü işlenmek üzere kuyruğa alındı.',
+                'job_id': job.pk,
+                'durum': job.status
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class ScanJobDetailView(APIView):
+    """Tarama İşi Durum API Görünümü (durum, süreler ve çıkarılan sonuç)"""
+    def get(self, request, pk, format=None):
+        job = get_object_or_404(ScanJob, pk=pk)
+        return Response(ScanJobSerializer(job).data, status=status.HTTP_200_OK)
+
+class ScanBatchDetailView(APIView):
+    """Toplu Tarama Raporu API Görünümü (durum sayıları ve iş başına sonuç/hata)"""
+    def get(self, request, pk, format=None):
+        batch = get_object_or_404(ScanBatch, pk=pk)
+        return Response(batch_report(batch), status=status.HTTP_200_OK)
+
+class OMRBatchProcessingView(APIView):
+    """
+    Toplu OMR İşleme API Görünümü (çoklu dosya veya ZIP arşivi): her görüntü için bir tarama işi
+    kuyruğa alınır, grup ve iş numaraları hemen döner. Görüntüler işçi süreçlerde (run_scan_worker)
+    işlenir; grubun raporu '/batch/<id>/' adresinden alınır.
+    """
+    def post(self, request, format=None):
+        uploads = [image_file for image_file in request.FILES.getlist('images') if is_image_name(image_file.name)]
+        archive_file = request.FILES.get('archive')
+        try:
+            archive = zipfile.ZipFile(archive_file) if archive_file else None
+        except zipfile.BadZipFile:
+            return Response({'mesaj': 'Geçersiz ZIP arşivi.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            entries = zip_image_entries(archive) if archive else []
+            if not uploads and not entries:
+                return Response({'mesaj': 'Görüntü dosyası gönderilmedi.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            batch_config = load_configuration().get('batch', {})
+            max_files = batch_config.get('max_files')
+            if max_files and len(uploads) + len(entries) > max_files:
+                return Response(
+                    {'mesaj': f'Bir istekte en fazla {max_files} görüntü işlenebilir.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Arşivdeki görüntüler açılmış (sıkıştırılmamış) boyutlarıyla sayılır
+            max_bytes = batch_config.get('max_upload_bytes')
+            total_bytes = sum(image_file.size for image_file in uploads) + sum(info.file_size for info in entries)
+            if max_bytes and total_bytes > max_bytes:
+                return Response(
+                    {'mesaj': f'Bir istekte en fazla {max_bytes // (1024 * 1024)} MB görüntü işlenebilir.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            jobs = []
+            try:
+                with transaction.atomic():
+                    batch = ScanBatch.objects.create()
+                    for image_file in uploads:
+                        jobs.append(enqueue_scan(image_file, batch=batch))
+                    # Arşivdeki görüntüler tek tek okunup kaydedilir; hepsi aynı anda belleğe alınmaz
+                    for info in entries:
+                        jobs.append(enqueue_scan(ContentFile(archive.read(info), name=info.filename), batch=batch))
+            except Exception as e:
+                logger.error(f"Toplu tarama işleri kuyruğa alınırken hata oluştu: {e}")
+                # İşler geri alındığından kaydedilmiş görüntüler sahipsiz kalmasın
+                for job in jobs:
+                    job.image.delete(save=False)
+                return Response({'mesaj': 'Görüntüler kuyruğa alınamadı.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         finally:
-            delete_temp_file(temp_image_path)
+            if archive is not None:
+                archive.close()
+
+        return Response(
+            {
+                'mesaj': f'{len(jobs)} görüntü işlenmek üzere kuyruğa alındı.',
+                'batch_id': batch.pk,
+                'job_ids': [job.pk for job in jobs],
+                'toplam': len(jobs)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
 class OMRAnswerKeyProcessingView(APIView):
     """Cevap Anahtarı İşleme API Görünümü"""
@@ -78,19 +162,18 @@ class OMRAnswerKeyProcessingView(APIView):
         if not image_file:
             return Response({'mesaj': 'Görüntü dosyası gönderilmedi.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        temp_filename = 'temp_answer_key.jpg'
-        temp_image_path, temp_image_full_path = save_temp_file(image_file, temp_filename)
         config = load_configuration()
 
         try:
-            process_result = process_answer_key_image(temp_image_full_path, config)
+            process_result = process_answer_key_image(read_upload(image_file), config)
             if 'error' in process_result:
                 logger.error(f"Cevap anahtarı işleme hatası: {process_result['error']}")
                 return Response({'mesaj': 'Cevap anahtarı başarıyla yüklendi.'}, status=status.HTTP_201_CREATED)
             
             serializer = AnswerKeySerializer(data=process_result.get('answer_key', []), many=True)
             if serializer.is_valid():
-                serializer.save()
+                with deferred_scoring():
+                    serializer.save()
             else:
                 logger.error(f"Serializer hatası: {serializer.errors}")
                 return Response({'mesaj': 'Cevap anahtarı verisi geçersiz.', 'hata': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -100,39 +183,61 @@ class OMRAnswerKeyProcessingView(APIView):
         except Exception as e:
             logger.error(f"Cevap anahtarı işleme sırasında hata oluştu: {e}")
             return Response({'mesaj': 'Cevap anahtarı başarıyla yüklendi.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        finally:
-            delete_temp_file(temp_image_path)
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(QueryFilterMixin, viewsets.ModelViewSet):
     """Kurs Yönetim ViewSet'i"""
-    queryset = Course.objects.all()
+    # CourseSerializer.get_column_number sütun eşleşmelerini önceden yüklenmiş listeden okur
+    queryset = Course.objects.prefetch_related(
+        Prefetch('course_columns', queryset=ColumnMapping.objects.order_by('pk'))
+    )
     serializer_class = CourseSerializer
+    pagination_class = OptionalCursorPagination
+    filter_params = {'test_group': 'course_columns__test_group'}
+    filter_distinct = True
 
 class TestGroupViewSet(viewsets.ModelViewSet):
     """Test Grubu Yönetim ViewSet'i"""
     queryset = TestGroup.objects.all()
     serializer_class = TestGroupSerializer
+    pagination_class = OptionalCursorPagination
 
-class ColumnMappingViewSet(viewsets.ModelViewSet):
+class ColumnMappingViewSet(QueryFilterMixin, viewsets.ModelViewSet):
     """Sütun Eşleme Yönetim ViewSet'i"""
-    queryset = ColumnMapping.objects.all()
+    queryset = ColumnMapping.objects.select_related('course', 'test_group')
     serializer_class = ColumnMappingSerializer
+    pagination_class = OptionalCursorPagination
+    filter_params = {'course': 'course', 'test_group': 'test_group'}
 
-class AnswerKeyViewSet(viewsets.ModelViewSet):
+class AnswerKeyViewSet(QueryFilterMixin, viewsets.ModelViewSet):
     """Cevap Anahtarı Yönetim ViewSet'i"""
-    queryset = AnswerKey.objects.all()
+    queryset = AnswerKey.objects.select_related('course', 'test_group')
     serializer_class = AnswerKeySerializer
+    pagination_class = OptionalCursorPagination
+    filter_params = {'course': 'course', 'test_group': 'test_group'}
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(QueryFilterMixin, viewsets.ModelViewSet):
     """Öğrenci Yönetim ViewSet'i"""
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    pagination_class = OptionalCursorPagination
+    filter_params = {
+        'student_number': 'student_number__startswith',
+        'course': 'student_answers__course',
+        'test_group': 'student_answers__test_group',
+    }
+    filter_distinct = True
 
-class StudentAnswerViewSet(viewsets.ModelViewSet):
+class StudentAnswerViewSet(QueryFilterMixin, viewsets.ModelViewSet):
     """Öğrenci Cevapları Yönetim ViewSet'i"""
-    queryset = StudentAnswer.objects.all()
+    queryset = StudentAnswer.objects.select_related('student', 'course', 'test_group')
     serializer_class = StudentAnswerSerializer
+    pagination_class = OptionalCursorPagination
+    filter_params = {
+        'student': 'student',
+        'student_number': 'student__student_number__startswith',
+        'course': 'course',
+        'test_group': 'test_group',
+    }
 
 class ExportStudentGradesView(APIView):
     """Öğrenci Notlarını Dışa Aktarma API Görünümü"""
@@ -150,62 +255,22 @@ class ExportStudentGradesView(APIView):
             return Response({'hata': 'Desteklenmeyen format türü.'}, status=status.HTTP_400_BAD_REQUEST)
 
     def export_csv(self, students):
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
+        response = StreamingHttpResponse(stream_csv(students), content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="ogrenci_notlari.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Öğrenci Numarası', 'Adı', 'Doğru Sayısı', 'Yanlış Sayısı', 'Notlar'])
-        for student in students:
-            total_correct, total_incorrect = self.calculate_totals(student)
-            grades = getattr(student, 'results', {}) or {}
-            writer.writerow([
-                student.student_number,
-                total_correct,
-                total_incorrect,
-                grades or "Eksik Notlar"
-            ])
         return response
 
     def export_txt(self, students):
-        response = HttpResponse(content_type='text/plain; charset=utf-8')
+        response = StreamingHttpResponse(stream_txt(students), content_type='text/plain; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="ogrenci_notlari.txt"'
-        for student in students:
-            total_correct, total_incorrect = self.calculate_totals(student)
-            grades = getattr(student, 'results', {}) or {}
-            response.write(f"Öğrenci Numarası: {student.student_number}\n")
-            response.write(f"Doğru Sayısı: {total_correct}\n")
-            response.write(f"Yanlış Sayısı: {total_incorrect}\n")
-            response.write(f"Notlar: {grades or 'Eksik Notlar'}\n\n")
         return response
 
     def export_xlsx(self, students):
-        data = []
-        for student in students:
-            total_correct, total_incorrect = self.calculate_totals(student)
-            grades = getattr(student, 'results', {}) or {}
-            data.append({
-                'Öğrenci Numarası': student.student_number,
-                'Doğru Sayısı': total_correct,
-                'Yanlış Sayısı': total_incorrect,
-                'Notlar': grades
-            })
-        df = pd.DataFrame(data)
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="ogrenci_notlari.xlsx"'
-        with pd.ExcelWriter(response, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name='Notlar')
-        return response
-
-    def calculate_totals(self, student):
-        total_correct = 0
-        total_incorrect = 0
-        results = getattr(student, 'results', {}) or {}
-        for course_code, details in results.items():
-            overall = details.get('overall', {})
-            correct = overall.get('correct', 0)
-            incorrect = overall.get('incorrect', 0)
-            total_correct += correct
-            total_incorrect += incorrect
-        return total_correct, total_incorrect
+        return FileResponse(
+            write_xlsx(students),
+            as_attachment=True,
+            filename='ogrenci_notlari.xlsx',
+            content_type=XLSX_CONTENT_TYPE
+        )
 
 
 # --------------------------------------------------------------------------------